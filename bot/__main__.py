@@ -0,0 +1,11 @@
+"""
+Ponto de entrada do bot: `python -m bot`.
+
+Preferível a `python bot/main.py`: com spawn, os processos de extração não
+reimportam um `__main__` executado via `-m`, então não carregam o bot.
+"""
+
+from bot.main import main
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ from discord.ext import commands, tasks
 import logging
 from datetime import time
 from db.database import db
-from config.settings import SYNC_MEMBERS_HOUR, SYNC_MEMBERS_MINUTE
+from config.settings import SYNC_MEMBERS_HOUR, SYNC_MEMBERS_MINUTE, SYNC_MEMBERS_CHUNK_SIZE
 
 
 class ActivityTracker(commands.Cog):
@@ -54,6 +54,63 @@ class ActivityTracker(commands.Cog):
                 logging.info(f"Atividade finalizada: {name} por {after.name}")
                 await db.end_activity_session(str(after.id), name)
 
+    @staticmethod
+    async def _iter_members(guild: discord.Guild):
+        """Itera pelos membros do servidor sem materializar a lista completa"""
+        # Para servidores com mais de 75 membros, o cache pode estar incompleto
+        # Nesses casos usamos fetch_members() para garantir que todos sejam carregados
+        if guild.member_count > 75 or len(guild.members) < guild.member_count:
+            logging.info("Servidor grande detectado ou cache incompleto. Buscando todos os membros via API...")
+            async for member in guild.fetch_members(limit=None):
+                yield member
+        else:
+            logging.info("Servidor pequeno. Usando cache local...")
+            for member in guild.members:
+                yield member
+
+    async def _sync_guild_members(self, guild: discord.Guild):
+        """Sincroniza um servidor em blocos: cada bloco vai direto para o banco"""
+        fetched = bot_count = valid = created = updated = 0
+        chunk = []
+
+        async def flush_chunk():
+            nonlocal created, updated
+            counts = await db.sync_member_profiles(chunk, chunk_size=SYNC_MEMBERS_CHUNK_SIZE)
+            created += counts["created"]
+            updated += counts["updated"]
+            chunk.clear()
+            logging.debug(
+                f"Progresso '{guild.name}': {fetched} membros lidos, {valid} sincronizados "
+                f"({created} novos, {updated} atualizados, {bot_count} bots ignorados)"
+            )
+
+        async for member in self._iter_members(guild):
+            fetched += 1
+            if member.bot:
+                bot_count += 1
+                continue
+            valid += 1
+            chunk.append({
+                "id": str(member.id),
+                "name": member.name,
+                "display_name": member.display_name
+            })
+            if len(chunk) >= SYNC_MEMBERS_CHUNK_SIZE:
+                await flush_chunk()
+
+        if chunk:
+            await flush_chunk()
+
+        if fetched < guild.member_count:
+            logging.warning(f"⚠️ ATENÇÃO: Foram lidos {fetched} membros, mas o servidor tem {guild.member_count}!")
+            logging.warning("⚠️ Verifique se o bot tem permissões corretas e o intent 'members' está habilitado.")
+
+        if valid:
+            logging.info(f"✅ Sincronizados {valid} membros do servidor '{guild.name}' ({created} novos, {updated} atualizados, {bot_count} bots ignorados)")
+        else:
+            logging.warning(f"⚠️ Nenhum membro válido encontrado no servidor '{guild.name}'")
+            logging.warning("Verifique se o bot tem o intent 'members' habilitado no Discord Developer Portal")
+
     @tasks.loop(time=time(hour=SYNC_MEMBERS_HOUR, minute=SYNC_MEMBERS_MINUTE))
     async def sync_members_task(self):
         """Sincroniza periodicamente os membros do servidor com o banco de dados"""
@@ -64,73 +121,16 @@ class ActivityTracker(commands.Cog):
         logging.info("Iniciando sincronização de membros...")
         try:
             for guild in self.bot.guilds:
-                logging.info(f"Processando servidor: '{guild.name}' (ID: {guild.id})")
-                logging.info(f"Total de membros reportado pelo servidor: {guild.member_count}")
-
-                # Verifica se guild.members está populado
-                total_members_cache = len(guild.members)
-                logging.info(f"Membros no cache (guild.members): {total_members_cache}")
-
-                members_data = []
-                bot_count = 0
-
-                # Para servidores com mais de 75 membros, o cache pode estar incompleto
-                # Sempre usamos fetch_members() para garantir que todos sejam carregados
-                if guild.member_count > 75 or total_members_cache < guild.member_count:
-                    logging.info(f"Servidor grande detectado ou cache incompleto. Buscando todos os membros via API...")
-                    try:
-                        # Usa async for para iterar pelos membros (SEM LIMITE)
-                        member_count = 0
-                        async for member in guild.fetch_members(limit=None):
-                            member_count += 1
-                            if member.bot:
-                                bot_count += 1
-                                logging.debug(f"  [BOT IGNORADO] {member.display_name} (ID: {member.id})")
-                            else:
-                                members_data.append({
-                                    "id": str(member.id),
-                                    "name": member.name,
-                                    "display_name": member.display_name
-                                })
-                                logging.info(f"  [PROCESSANDO] Membro: {member.display_name} (@{member.name}) (ID: {member.id})")
-
-                        logging.info(f"Total de membros buscados via API: {member_count} (esperado: {guild.member_count})")
-
-                        if member_count < guild.member_count:
-                            logging.warning(f"⚠️ ATENÇÃO: Foram buscados {member_count} membros, mas o servidor tem {guild.member_count}!")
-                            logging.warning(f"⚠️ Verifique se o bot tem permissões corretas e o intent 'members' está habilitado.")
-                    except discord.Forbidden:
-                        logging.error(f"❌ Sem permissão para buscar membros do servidor '{guild.name}'")
-                        logging.error(f"Verifique se o bot tem a permissão 'View Server Members'")
-                        continue
-                    except Exception as e:
-                        logging.error(f"❌ Erro ao buscar membros via API: {str(e)}")
-                        import traceback
-                        logging.error(traceback.format_exc())
-                        continue
-                else:
-                    # Servidor pequeno (<= 75 membros), usa o cache
-                    logging.info(f"Servidor pequeno. Usando cache local...")
-                    for member in guild.members:
-                        if member.bot:
-                            bot_count += 1
-                            logging.debug(f"  [BOT IGNORADO] {member.display_name} (ID: {member.id})")
-                        else:
-                            members_data.append({
-                                "id": str(member.id),
-                                "name": member.name,
-                                "display_name": member.display_name
-                            })
-                            logging.info(f"  [PROCESSANDO] Membro: {member.display_name} (@{member.name}) (ID: {member.id})")
-
-                logging.info(f"Resumo: {len(members_data)} membros válidos, {bot_count} bots ignorados")
-
-                if members_data:
-                    count = await db.sync_member_profiles(members_data)
-                    logging.info(f"✅ Sincronizados {len(members_data)} membros do servidor '{guild.name}' ({count} novos)")
-                else:
-                    logging.warning(f"⚠️ Nenhum membro válido encontrado no servidor '{guild.name}'")
-                    logging.warning(f"Verifique se o bot tem o intent 'members' habilitado no Discord Developer Portal")
+                logging.info(f"Processando servidor: '{guild.name}' (ID: {guild.id}, {guild.member_count} membros)")
+                try:
+                    await self._sync_guild_members(guild)
+                except discord.Forbidden:
+                    logging.error(f"❌ Sem permissão para buscar membros do servidor '{guild.name}'")
+                    logging.error("Verifique se o bot tem a permissão 'View Server Members'")
+                except Exception as e:
+                    logging.error(f"❌ Erro ao sincronizar membros do servidor '{guild.name}': {str(e)}")
+                    import traceback
+                    logging.error(traceback.format_exc())
         except Exception as e:
             logging.error(f"❌ Erro na task de sincronização de membros: {str(e)}")
             import traceback
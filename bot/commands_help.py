@@ -18,7 +18,7 @@ class HelpCommands(commands.Cog):
         embed.add_field(
             name="Comandos de Música",
             value="""
-                `!play <url> [autoplay]` - Toca uma música do YouTube ou adiciona à fila
+                `!play <url> [preset] [autoplay]` - Toca uma música do YouTube ou adiciona à fila
                 `!skip` - Pula para a próxima música
                 `!stop` - Para a música e limpa a fila
                 `!leave` - Faz o bot sair do canal de voz
@@ -39,6 +39,7 @@ class HelpCommands(commands.Cog):
                 `!monitorar_twitch <canal>` - Monitora um canal da Twitch
                 `!remover_monitoramento <plataforma> <nome_do_canal>` - Para de monitorar um canal (ou remove sua inscrição)
                 `!listar_monitoramento` - Lista os canais que você está monitorando
+                `!cota_api` - Mostra o consumo de cota das APIs do YouTube e da Twitch
             """,
             inline=False
         )
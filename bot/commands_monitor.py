@@ -4,15 +4,17 @@ from discord.ext import commands
 from config.settings import NOTIFICATION_CHANNEL_ID
 from db.database import db
 from .monitor import ChannelMonitor
+from .notifications import NotificationDispatcher
+from .quota import quota_ledger
 from db.models import MonitoredChannel
 
 
 class MonitorCommands(commands.Cog):
-    def __init__(self, bot):
+    def __init__(self, bot, monitor: ChannelMonitor, notifier: NotificationDispatcher):
         self.bot = bot
-        self.monitor = ChannelMonitor()
-        # Inicializar o monitor de forma assíncrona quando o Cog é carregado
-        bot.loop.create_task(self._initialize_monitor())
+        # Monitor compartilhado com o scheduler (já inicializado em bot/main.py)
+        self.monitor = monitor
+        self.notifier = notifier
 
     async def _ensure_user_profile(self, author: discord.User):
         """Garante que um perfil de usuário exista no banco de dados."""
@@ -22,11 +24,6 @@ class MonitorCommands(commands.Cog):
             await db.create_user_profile(user_id, author.name)
             logging.info(f"Perfil de usuário criado para {user_id} ({author.name})")
 
-    async def _initialize_monitor(self):
-        """Inicializa o monitor"""
-        await self.monitor.initialize()
-        logging.info("Monitor inicializado com sucesso!")
-
     def cog_unload(self):
         """Chamado quando o Cog é descarregado"""
         logging.info("Monitor descarregado")
@@ -39,21 +36,16 @@ class MonitorCommands(commands.Cog):
             # Garante que o perfil do usuário existe
             await self._ensure_user_profile(ctx.author)
 
-            channel_id = self.monitor.extract_youtube_channel_id(channel_input)
-            if not channel_id:
+            # ID e título em uma única resolução (cacheada no banco)
+            resolved = await self.monitor.resolve_youtube_channel(channel_input)
+            if not resolved:
                 await ctx.send("❌ Canal não encontrado! Verifique o link ou ID fornecido.")
                 return
 
-            # Busca informações do canal
-            channel_info = self.monitor.youtube.channels().list(
-                part="snippet",
-                id=channel_id
-            ).execute()['items'][0]
-
             channel = MonitoredChannel(
                 platform='youtube',
-                channel_id=channel_id,
-                channel_name=channel_info['snippet']['title'],
+                channel_id=resolved['channel_id'],
+                channel_name=resolved['title'],
                 added_by=str(ctx.author.id)
             )
 
@@ -115,8 +107,7 @@ class MonitorCommands(commands.Cog):
         try:
             user_id = str(ctx.author.id)
             # Busca na coleção monitored_channels todos os documentos onde o usuário é subscriber
-            cursor = db.monitored_channels.find({'subscribers': user_id})
-            channels = [MonitoredChannel.from_dict(doc) for doc in cursor]
+            channels = await db.get_user_monitored_channels(user_id)
 
             if not channels:
                 await ctx.send("Você não está monitorando nenhum canal!")
@@ -166,3 +157,62 @@ class MonitorCommands(commands.Cog):
         except Exception as e:
             logging.error(f"Erro ao remover canal do monitoramento: {str(e)}")
             await ctx.send("❌ Ocorreu um erro ao remover o canal do monitoramento.")
+
+    @commands.command(name='cota_api')
+    async def api_quota(self, ctx):
+        """Mostra o consumo de cota das APIs, a latência das verificações e a fila de notificações"""
+        try:
+            state = quota_ledger.snapshot()
+            youtube, twitch = state['youtube'], state['twitch']
+
+            embed = discord.Embed(title="📊 Cota das APIs de Monitoramento", color=0x00ff00)
+
+            reset_h, reset_m = divmod(youtube['resets_in'] // 60, 60)
+            youtube_text = (
+                f"Usado: **{youtube['used']}** / {youtube['daily_quota']} unidades\n"
+                f"Restante: **{youtube['remaining']}** (reserva: {youtube['reserve']})\n"
+                f"Renova em: {reset_h}h{reset_m:02d}m"
+            )
+            if youtube['exhausted']:
+                youtube_text += "\n⚠️ Cota esgotada: verificações suspensas até a renovação"
+            elif youtube['stretch'] > 1:
+                youtube_text += f"\nIntervalos esticados em {youtube['stretch']}x"
+            embed.add_field(name="YouTube 🎥", value=youtube_text, inline=False)
+
+            if twitch['limit'] is None:
+                twitch_text = "Nenhuma requisição feita ainda"
+            else:
+                twitch_text = (
+                    f"Pontos restantes: **{twitch['remaining']}** / {twitch['limit']}\n"
+                    f"Requisições: {twitch['requests']}"
+                )
+                if twitch['stretch'] > 1:
+                    twitch_text += f"\nIntervalos esticados em {twitch['stretch']}x"
+            embed.add_field(name="Twitch 🔴", value=twitch_text, inline=False)
+
+            latency = self.monitor.latency_snapshot()
+            if latency:
+                latency_text = "\n".join(
+                    f"{kind}: última {stats['last_ms']:.0f} ms · média {stats['avg_ms']:.0f} ms"
+                    f" · máx. {stats['max_ms']:.0f} ms ({stats['count']} verificações)"
+                    for kind, stats in sorted(latency.items())
+                )
+                embed.add_field(name="Latência das verificações ⏱️", value=latency_text, inline=False)
+
+            delivery = self.notifier.stats()
+            embed.add_field(
+                name="Entrega de notificações 📨",
+                value=(
+                    f"Na fila: **{delivery['queue_depth']}** ({delivery['routes']} destinos)\n"
+                    f"Entregues: {delivery['delivered']} em {delivery['messages_sent']} mensagens"
+                    f" · falhas: {delivery['failed']}\n"
+                    f"Latência: média {delivery['avg_latency_ms']:.0f} ms · máx. {delivery['max_latency_ms']:.0f} ms"
+                ),
+                inline=False,
+            )
+
+            await ctx.send(embed=embed)
+
+        except Exception as e:
+            logging.error(f"Erro ao consultar cota das APIs: {str(e)}")
+            await ctx.send("❌ Ocorreu um erro ao consultar a cota das APIs.")
@@ -1,17 +1,24 @@
 import logging
 import discord
 from discord.ext import commands
-import yt_dlp
 import asyncio
 from collections import deque
 
+from config.settings import EQUALIZER_PRESETS
 from db.database import db
-from .utils import clean_youtube_url, is_youtube_url, stream_musica
+from .utils import clean_youtube_url, is_youtube_url, stream_musica, cache_stream
 from .commands_utils import validar_canal, play_queue, last_played_info, autoplay_enabled
+from .prefetch import prefetcher
+from .extraction import extraction_service, PRIORITY_INTERACTIVE
+from .playlist import PlaylistCursor, fetch_playlist_page, materialize, page_with_cursor
 
 
 async def tocar_proxima_musica(vc, guild_id, ctx):
     """Toca a próxima música da fila ou busca uma recomendada se auto-play estiver ativo."""
+    if guild_id in play_queue:
+        # Páginas de playlist que vão tocar (ou ser pré-carregadas) em seguida
+        await materialize(play_queue[guild_id], prefetcher.depth + 1)
+
     if guild_id not in play_queue or not play_queue[guild_id]:
         if autoplay_enabled.get(guild_id, False):
             if guild_id in last_played_info and 'related_videos' in last_played_info[guild_id]:
@@ -29,25 +36,31 @@ async def tocar_proxima_musica(vc, guild_id, ctx):
                     play_queue[guild_id].append((next_url, "padrao"))
                 else:
                     await ctx.send("Nenhuma música recomendada encontrada. A reprodução parou.")
+                    prefetcher.clear(guild_id)
                     await vc.disconnect()
                     return
             else:
                 await ctx.send("A fila de músicas está vazia e não há recomendações. A reprodução parou.")
+                prefetcher.clear(guild_id)
                 await vc.disconnect()
                 return
         else:
             await ctx.send("A fila de músicas está vazia. Desconectando do canal de voz.")
+            prefetcher.clear(guild_id)
             await vc.disconnect()
             return
 
     url, preset_name = play_queue[guild_id].popleft()
-    source, stream_title, info = await stream_musica(url, preset_name)
+    # Fonte já aberta pelo pré-carregamento; senão resolve agora (provavelmente via cache)
+    prepared = prefetcher.take(guild_id, (url, preset_name))
+    source, stream_title, info = prepared or await stream_musica(url, preset_name)
 
     if source:
         last_played_info[guild_id] = info
         try:
             vc.play(source, after=lambda e: asyncio.run_coroutine_threadsafe(
                 tocar_proxima_musica(vc, guild_id, ctx), ctx.bot.loop))
+            prefetcher.track_started(guild_id, info.get('duration'))
             await ctx.send(f'Transmitindo agora: **{stream_title}** com preset `{preset_name}`')
         except Exception as e:
             logging.error(f"Erro ao transmitir `{stream_title}`: {str(e)}")
@@ -65,7 +78,7 @@ class MusicCommands(commands.Cog):
     @commands.command(name='play')
     async def play(self, ctx, url: str = None, *args):
         """Toca uma música ou adiciona à fila
-        Uso: !play <url> [autoplay]"""
+        Uso: !play <url> [preset] [autoplay]"""
         # 1. Validar canal correto
         if not validar_canal(ctx):
             await ctx.send("O Animal, Use o canal JUKEBOX para comandos de música.")
@@ -73,7 +86,7 @@ class MusicCommands(commands.Cog):
 
         # 2. Validar se a URL foi fornecida
         if not url:
-            await ctx.send("Ei! Você precisa me dar uma URL do YouTube. Uso correto: `!play <url> [autoplay]`")
+            await ctx.send("Ei! Você precisa me dar uma URL do YouTube. Uso correto: `!play <url> [preset] [autoplay]`")
             return
 
         # 3. Validar se está em um canal de voz
@@ -81,9 +94,26 @@ class MusicCommands(commands.Cog):
             await ctx.send("Quer que eu adivinhe o canal para tocar musica ?, conecte-se a um canal de voz primeiro.")
             return
 
+        # 4. Validar os argumentos antes de conectar (um erro não deixa o bot parado na call)
+        preset_name = "padrao"
+        autoplay = 'autoplay' in args
+        args = [a for a in args if a != 'autoplay']
+        if args:
+            if args[0].lower() not in EQUALIZER_PRESETS:
+                await ctx.send(f"Preset desconhecido. Opções: {', '.join(f'`{p}`' for p in EQUALIZER_PRESETS)}")
+                return
+            preset_name = args[0].lower()
+
+        cleaned_url = clean_youtube_url(url)
+        if not is_youtube_url(cleaned_url):
+            await ctx.send("URL inválida. Use uma URL do YouTube.")
+            return
+
         guild_id = ctx.guild.id
         if guild_id not in play_queue:
             play_queue[guild_id] = deque()
+        if autoplay:
+            autoplay_enabled[guild_id] = True
 
         if not ctx.guild.voice_client:
             try:
@@ -95,32 +125,23 @@ class MusicCommands(commands.Cog):
         else:
             vc = ctx.guild.voice_client
 
-        preset_name = "padrao"
-        if 'autoplay' in args:
-            autoplay_enabled[guild_id] = True
-            args = [a for a in args if a != 'autoplay']
-
-        cleaned_url = clean_youtube_url(url)
-        if not is_youtube_url(cleaned_url):
-            await ctx.send("URL inválida. Use uma URL do YouTube.")
-            return
-
         try:
             async with ctx.typing():
-                with yt_dlp.YoutubeDL({'extract_flat': 'True', 'quiet': True}) as ydl:
-                    info = await asyncio.to_thread(ydl.extract_info, cleaned_url, download=False)
+                # Mesmo formato do stream_musica: um vídeo avulso já sai daqui com a URL de áudio.
+                # De uma playlist, só a primeira página; o restante vem conforme a fila anda
+                info, playlist_urls = await fetch_playlist_page(cleaned_url, 1)
 
             if 'entries' in info:
                 title = info.get('title', 'Playlist')
-                playlist_urls = [entry['url'] for entry in info['entries']]
                 await db.create_user_profile(str(ctx.author.id), ctx.author.name)
 
-                for playlist_url in playlist_urls:
-                    play_queue[guild_id].append((playlist_url, preset_name))
+                play_queue[guild_id].extend(page_with_cursor(cleaned_url, preset_name, info, playlist_urls))
 
-                await ctx.send(f'Adicionando **{len(playlist_urls)}** músicas da playlist **{title}** à fila.')
+                total = info.get('playlist_count') or len(playlist_urls)
+                await ctx.send(f'Adicionando **{total}** músicas da playlist **{title}** à fila.')
             else:
                 title = info.get('title', 'Desconhecido')
+                cache_stream(cleaned_url, info)  # a reprodução não precisa extrair de novo
                 play_queue[guild_id].append((cleaned_url, preset_name))
 
                 await db.create_user_profile(str(ctx.author.id), ctx.author.name)
@@ -133,6 +154,8 @@ class MusicCommands(commands.Cog):
 
             if not vc.is_playing() and not vc.is_paused():
                 await tocar_proxima_musica(vc, guild_id, ctx)
+            else:
+                prefetcher.refresh(guild_id)
 
         except Exception as e:
             logging.error(f'Erro ao processar música: {e}')
@@ -163,6 +186,7 @@ class MusicCommands(commands.Cog):
             guild_id = ctx.guild.id
             if guild_id in play_queue:
                 play_queue[guild_id].clear()
+            prefetcher.clear(guild_id)
             await ctx.guild.voice_client.disconnect()
             await ctx.send("Desconectado do canal de voz.")
         else:
@@ -219,35 +243,28 @@ class MusicCommands(commands.Cog):
         search_terms = " OR ".join([f"\"{pref.name}\"" for pref in top_prefs])
 
         try:
-            with yt_dlp.YoutubeDL({
-                'quiet': True,
-                'extract_flat': True,
-                'default_search': 'ytsearch5'
-            }) as ydl:
-                result = await asyncio.to_thread(
-                    ydl.extract_info,
-                    f"ytsearch5:{search_terms.replace('&', 'and')}",
-                    download=False
+            result = await extraction_service.extract(
+                'search', f"ytsearch5:{search_terms.replace('&', 'and')}", PRIORITY_INTERACTIVE
+            )
+
+            if result and 'entries' in result:
+                embed = discord.Embed(
+                    title="🎵 Recomendações Musicais",
+                    description=f"Com base em: {', '.join([p.name for p in top_prefs])}",
+                    color=0x00ff00
                 )
 
-                if result and 'entries' in result:
-                    embed = discord.Embed(
-                        title="🎵 Recomendações Musicais",
-                        description=f"Com base em: {', '.join([p.name for p in top_prefs])}",
-                        color=0x00ff00
-                    )
-
-                    for entry in result['entries'][:5]:
-                        if entry:
-                            embed.add_field(
-                                name=entry.get('title', 'Sem título'),
-                                value=f"[Tocar no YouTube]({entry.get('url', '')})",
-                                inline=False
-                            )
-
-                    await ctx.send(embed=embed)
-                else:
-                    await ctx.send("Não foi possível encontrar recomendações.")
+                for entry in result['entries'][:5]:
+                    if entry:
+                        embed.add_field(
+                            name=entry.get('title', 'Sem título'),
+                            value=f"[Tocar no YouTube]({entry.get('url', '')})",
+                            inline=False
+                        )
+
+                await ctx.send(embed=embed)
+            else:
+                await ctx.send("Não foi possível encontrar recomendações.")
         except Exception as e:
             logging.error(f"Erro ao buscar recomendações: {str(e)}")
             await ctx.send("Erro ao buscar recomendações. Tente novamente.")
@@ -301,12 +318,12 @@ class MusicCommands(commands.Cog):
         songs = user_profile.music_history[-count:]
 
         # Construir lista de URLs candidatas (respeitando ordem)
-        existing_urls = set()
-        for entry in play_queue[guild_id]:
-            try:
-                existing_urls.add(clean_youtube_url(entry[0]))
-            except Exception:
-                pass
+        # Cursores de playlist ainda não expandidos não têm URL de música para comparar
+        existing_urls = {
+            clean_youtube_url(entry[0])
+            for entry in play_queue[guild_id]
+            if not isinstance(entry, PlaylistCursor)
+        }
 
         candidates = []  # list of (url, title)
         added_urls = set()
@@ -328,9 +345,7 @@ class MusicCommands(commands.Cog):
             # Fallback: buscar por título usando yt_dlp (opcional)
             if not chosen_url and fallback_search and title:
                 try:
-                    with yt_dlp.YoutubeDL(
-                            {'quiet': True, 'extract_flat': 'True', 'default_search': 'ytsearch1'}) as ydl:
-                        info = await asyncio.to_thread(ydl.extract_info, f"ytsearch1:{title}", download=False)
+                    info = await extraction_service.extract('search', f"ytsearch1:{title}", PRIORITY_INTERACTIVE)
                     if info and 'entries' in info and info['entries']:
                         entry = info['entries'][0]
                         # Try common fields that may contain a usable url/id
@@ -402,3 +417,5 @@ class MusicCommands(commands.Cog):
         # Se não está tocando nada, inicia a reprodução
         if not vc.is_playing() and not vc.is_paused():
             await tocar_proxima_musica(vc, guild_id, ctx)
+        else:
+            prefetcher.refresh(guild_id)  # a ordem da fila mudou
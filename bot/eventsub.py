@@ -0,0 +1,171 @@
+"""
+Notificações de live da Twitch via EventSub (transporte webhook).
+
+Em vez de consultar `get_streams` periodicamente, o bot assina
+`stream.online`/`stream.offline` de cada canal monitorado e a Twitch avisa em
+segundos. O recebimento (verificação HMAC das mensagens, desafio de
+confirmação e deduplicação) é feito pelo `EventSubWebhook` do twitchAPI.
+
+O transporte WebSocket exige token de usuário; como o monitor usa apenas o
+token de app, o modo push usa webhook, que precisa de uma URL HTTPS pública
+(ex.: proxy reverso apontando para TWITCH_EVENTSUB_PORT).
+
+Canais cuja assinatura falhar (ou for revogada) continuam sendo verificados
+por polling normalmente.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from twitchAPI.eventsub.webhook import EventSubWebhook
+from twitchAPI.object.eventsub import StreamOfflineEvent, StreamOnlineEvent
+
+from config.settings import (
+    TWITCH_EVENTSUB_CALLBACK_URL,
+    TWITCH_EVENTSUB_PORT,
+    TWITCH_EVENTSUB_SECRET,
+    TWITCH_EVENTSUB_SUBSCRIPTION_URL,
+)
+
+# Recebe (channel_id, update) no mesmo formato de ChannelMonitor.check_twitch_batch
+UpdateHandler = Callable[[str, dict], Awaitable[None]]
+
+
+class TwitchEventSub:
+    """Mantém as assinaturas EventSub alinhadas com os canais monitorados da Twitch"""
+
+    def __init__(self, monitor, on_update: UpdateHandler):
+        self.monitor = monitor
+        self.on_update = on_update
+        self.webhook: Optional[EventSubWebhook] = None
+        self.subscriptions: Dict[str, Tuple[str, str]] = {}  # channel_id -> (online_id, offline_id)
+        self.failed = set()  # canais que ficam no polling até a próxima tentativa
+        self._sync_lock = asyncio.Lock()
+        self.events_received = 0
+
+    @property
+    def running(self) -> bool:
+        return self.webhook is not None
+
+    def covers(self, channel_id: str) -> bool:
+        """O canal está recebendo notificações push?"""
+        return self.running and channel_id in self.subscriptions
+
+    async def start(self) -> bool:
+        """Sobe o receptor do webhook. Retorna False se não for possível (fica no polling)."""
+        if not TWITCH_EVENTSUB_CALLBACK_URL:
+            logging.error("TWITCH_EVENTSUB_CALLBACK_URL não configurada; usando polling para a Twitch.")
+            return False
+        if not await self.monitor.ensure_twitch_authenticated():
+            logging.error("Twitch não autenticada; EventSub indisponível, usando polling.")
+            return False
+        try:
+            webhook = EventSubWebhook(
+                TWITCH_EVENTSUB_CALLBACK_URL,
+                TWITCH_EVENTSUB_PORT,
+                self.monitor.twitch,
+                subscription_url=TWITCH_EVENTSUB_SUBSCRIPTION_URL,
+                callback_loop=asyncio.get_running_loop(),
+                revocation_handler=self._on_revocation,
+            )
+            if TWITCH_EVENTSUB_SECRET:
+                webhook.secret = TWITCH_EVENTSUB_SECRET
+            # Com um servidor alternativo (twitch-cli/fake) as assinaturas não existem na Twitch real
+            webhook.unsubscribe_on_stop = TWITCH_EVENTSUB_SUBSCRIPTION_URL is None
+            # start() bloqueia até o servidor HTTP subir em sua própria thread
+            await asyncio.to_thread(webhook.start)
+            if TWITCH_EVENTSUB_SUBSCRIPTION_URL is None:
+                # Assinaturas órfãs de execuções anteriores apontariam para um segredo antigo
+                await webhook.unsubscribe_all()
+        except Exception as e:
+            logging.error(f"Falha ao iniciar EventSub da Twitch: {e}. Usando polling.")
+            return False
+        self.webhook = webhook
+        logging.info(f"EventSub da Twitch escutando na porta {TWITCH_EVENTSUB_PORT}")
+        return True
+
+    async def stop(self):
+        if self.webhook is None:
+            return
+        try:
+            await self.webhook.stop()
+        except Exception as e:
+            logging.error(f"Erro ao parar EventSub da Twitch: {e}")
+        self.webhook = None
+        self.subscriptions.clear()
+
+    async def sync(self, channel_ids: Iterable[str], retry_failed: bool = False):
+        """Assina canais novos e cancela os que deixaram de ser monitorados"""
+        if not self.running or self._sync_lock.locked():
+            return
+        async with self._sync_lock:
+            wanted = set(channel_ids)
+            for channel_id in list(self.subscriptions.keys() - wanted):
+                await self._unsubscribe(channel_id)
+            self.failed &= wanted
+            pending = wanted - self.subscriptions.keys()
+            if not retry_failed:
+                pending -= self.failed
+            for channel_id in pending:
+                await self._subscribe(channel_id)
+
+    async def _subscribe(self, channel_id: str):
+        try:
+            online_id = await self.webhook.listen_stream_online(channel_id, self._on_online)
+            offline_id = await self.webhook.listen_stream_offline(channel_id, self._on_offline)
+        except Exception as e:
+            self.failed.add(channel_id)
+            logging.warning(f"Assinatura EventSub falhou para o canal {channel_id}: {e}. Mantendo polling.")
+            return
+        self.failed.discard(channel_id)
+        self.subscriptions[channel_id] = (online_id, offline_id)
+        logging.info(f"EventSub assinado para o canal Twitch {channel_id}")
+
+    async def _unsubscribe(self, channel_id: str):
+        for sub_id in self.subscriptions.pop(channel_id, ()):
+            try:
+                await self.webhook.unsubscribe_topic(sub_id)
+            except Exception as e:
+                logging.warning(f"Erro ao cancelar assinatura EventSub {sub_id}: {e}")
+
+    async def _on_online(self, data: StreamOnlineEvent):
+        self.events_received += 1
+        event = data.event
+        # O evento não traz título/thumbnail: uma consulta pontual completa a notificação
+        update = await self.monitor.get_live_update(event.broadcaster_user_id)
+        if update is None:
+            update = {
+                'type': 'live',
+                'title': f"{event.broadcaster_user_name} iniciou uma live",
+                'url': f'https://twitch.tv/{event.broadcaster_user_login}',
+                'thumbnail': '',
+                'stream_id': event.id,
+            }
+        await self.on_update(event.broadcaster_user_id, update)
+
+    async def _on_offline(self, data: StreamOfflineEvent):
+        self.events_received += 1
+        await self.on_update(data.event.broadcaster_user_id, {'type': 'offline', 'stream_id': None})
+
+    async def _on_revocation(self, data: dict):
+        subscription = data.get('subscription', {})
+        channel_id = subscription.get('condition', {}).get('broadcaster_user_id')
+        if channel_id and channel_id in self.subscriptions:
+            # Perde a cobertura push: cancela a assinatura irmã e volta ao polling
+            for sub_id in self.subscriptions.pop(channel_id):
+                if sub_id != subscription.get('id'):
+                    try:
+                        await self.webhook.unsubscribe_topic(sub_id)
+                    except Exception as e:
+                        logging.warning(f"Erro ao cancelar assinatura EventSub {sub_id}: {e}")
+            self.failed.add(channel_id)
+        logging.warning(f"Assinatura EventSub revogada para o canal {channel_id}")
+
+    def stats(self) -> dict:
+        return {
+            'running': self.running,
+            'subscribed': len(self.subscriptions),
+            'failed': len(self.failed),
+            'events_received': self.events_received,
+        }
@@ -0,0 +1,209 @@
+"""
+Servidor EventSub falso para testar o modo push da Twitch localmente.
+
+Emula os endpoints `/eventsub/subscriptions` da Helix (criar, listar e
+remover assinaturas) e entrega mensagens assinadas com HMAC-SHA256 ao
+receptor do bot, exatamente como a Twitch: desafio de confirmação,
+notificações e revogações.
+
+Uso:
+    python -m bot.eventsub_fake --port 8081 --deliver-to http://127.0.0.1:8080
+
+e no `.env` do bot:
+    TWITCH_MONITOR_MODE=eventsub
+    TWITCH_EVENTSUB_CALLBACK_URL=https://exemplo.local
+    TWITCH_EVENTSUB_SUBSCRIPTION_URL=http://127.0.0.1:8081/
+
+Para disparar eventos:
+    curl -X POST "http://127.0.0.1:8081/_trigger?type=stream.online&broadcaster_user_id=123"
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import uuid
+from datetime import datetime, UTC
+from typing import Dict, List, Optional
+
+import aiohttp
+from aiohttp import web
+
+
+def sign(secret: str, message_id: str, timestamp: str, body: str) -> str:
+    """Assinatura `Twitch-Eventsub-Message-Signature` de uma mensagem"""
+    digest = hmac.new(
+        secret.encode('utf-8'), (message_id + timestamp + body).encode('utf-8'), hashlib.sha256
+    ).hexdigest()
+    return f'sha256={digest}'
+
+
+def _now() -> str:
+    return datetime.now(UTC).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+class FakeEventSubServer:
+    """Twitch de mentira: guarda assinaturas e entrega eventos ao webhook do bot"""
+
+    def __init__(self, deliver_to: Optional[str] = None):
+        # Se definido, ignora o host do callback (HTTPS público) e entrega localmente
+        self.deliver_to = deliver_to.rstrip('/') if deliver_to else None
+        self.subscriptions: Dict[str, dict] = {}
+        self.delivered: List[dict] = []  # histórico de mensagens entregues (inspeção em testes)
+        self._runner: Optional[web.AppRunner] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes([
+            web.post('/eventsub/subscriptions', self._create),
+            web.get('/eventsub/subscriptions', self._list),
+            web.delete('/eventsub/subscriptions', self._delete),
+            web.post('/_trigger', self._trigger),
+        ])
+        return app
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8081):
+        self._session = aiohttp.ClientSession()
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        logging.info(f"EventSub falso escutando em http://{host}:{port}")
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+        if self._session:
+            await self._session.close()
+
+    def _callback_url(self, subscription: dict) -> str:
+        callback = subscription['transport']['callback']
+        if self.deliver_to:
+            return self.deliver_to + '/' + callback.split('/', 3)[-1]
+        return callback
+
+    async def _deliver(self, subscription: dict, message_type: str, payload: dict) -> int:
+        """Envia uma mensagem assinada ao callback da assinatura; retorna o status HTTP"""
+        body = json.dumps(payload)
+        message_id = str(uuid.uuid4())
+        timestamp = _now()
+        headers = {
+            'Content-Type': 'application/json',
+            'Twitch-Eventsub-Message-Id': message_id,
+            'Twitch-Eventsub-Message-Timestamp': timestamp,
+            'Twitch-Eventsub-Message-Signature': sign(
+                subscription['transport']['secret'], message_id, timestamp, body
+            ),
+            'Twitch-Eventsub-Message-Type': message_type,
+            'Twitch-Eventsub-Subscription-Type': subscription['type'],
+            'Twitch-Eventsub-Subscription-Version': subscription['version'],
+        }
+        async with self._session.post(self._callback_url(subscription), data=body, headers=headers) as response:
+            text = await response.text()
+            self.delivered.append({'type': message_type, 'payload': payload, 'status': response.status})
+            if message_type == 'webhook_callback_verification':
+                ok = response.status == 200 and text == payload['challenge']
+                subscription['status'] = 'enabled' if ok else 'webhook_callback_verification_failed'
+            return response.status
+
+    @staticmethod
+    def _public(subscription: dict) -> dict:
+        """Assinatura como a Helix devolve (sem o segredo)"""
+        transport = {k: v for k, v in subscription['transport'].items() if k != 'secret'}
+        return {**subscription, 'transport': transport}
+
+    async def _create(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        subscription = {
+            'id': str(uuid.uuid4()),
+            'status': 'webhook_callback_verification_pending',
+            'type': data['type'],
+            'version': data['version'],
+            'condition': data['condition'],
+            'transport': data['transport'],
+            'created_at': _now(),
+            'cost': 0,
+        }
+        self.subscriptions[subscription['id']] = subscription
+        # A Twitch responde 202 e só depois envia o desafio de confirmação
+        asyncio.get_running_loop().call_later(
+            0.05,
+            lambda: asyncio.ensure_future(self._deliver(
+                subscription,
+                'webhook_callback_verification',
+                {'challenge': uuid.uuid4().hex, 'subscription': self._public(subscription)},
+            )),
+        )
+        return web.json_response(
+            {'data': [self._public(subscription)], 'total': len(self.subscriptions), 'total_cost': 0, 'max_total_cost': 10000},
+            status=202,
+        )
+
+    async def _list(self, request: web.Request) -> web.Response:
+        data = [self._public(s) for s in self.subscriptions.values()]
+        return web.json_response({'data': data, 'total': len(data), 'total_cost': 0, 'max_total_cost': 10000, 'pagination': {}})
+
+    async def _delete(self, request: web.Request) -> web.Response:
+        if self.subscriptions.pop(request.query.get('id', ''), None) is None:
+            return web.json_response({'error': 'Not Found', 'status': 404, 'message': 'subscription not found'}, status=404)
+        return web.Response(status=204)
+
+    async def trigger(self, event_type: str, broadcaster_user_id: str, login: Optional[str] = None) -> int:
+        """Entrega `stream.online`/`stream.offline` a todas as assinaturas do canal"""
+        login = login or f'user{broadcaster_user_id}'
+        event = {
+            'broadcaster_user_id': broadcaster_user_id,
+            'broadcaster_user_login': login,
+            'broadcaster_user_name': login,
+        }
+        if event_type == 'stream.online':
+            event.update({'id': str(uuid.uuid4().int)[:11], 'type': 'live', 'started_at': _now()})
+        delivered = 0
+        for subscription in list(self.subscriptions.values()):
+            if (
+                subscription['type'] == event_type
+                and subscription['status'] == 'enabled'
+                and subscription['condition'].get('broadcaster_user_id') == broadcaster_user_id
+            ):
+                await self._deliver(subscription, 'notification', {'subscription': self._public(subscription), 'event': event})
+                delivered += 1
+        return delivered
+
+    async def revoke(self, subscription_id: str, reason: str = 'authorization_revoked') -> int:
+        subscription = self.subscriptions.pop(subscription_id)
+        subscription['status'] = reason
+        return await self._deliver(subscription, 'revocation', {'subscription': self._public(subscription)})
+
+    async def _trigger(self, request: web.Request) -> web.Response:
+        if request.query.get('type') == 'revocation':
+            status = await self.revoke(request.query['id'])
+            return web.json_response({'status': status})
+        delivered = await self.trigger(
+            request.query.get('type', 'stream.online'),
+            request.query['broadcaster_user_id'],
+            request.query.get('login'),
+        )
+        return web.json_response({'delivered': delivered})
+
+
+async def _main(args):
+    server = FakeEventSubServer(deliver_to=args.deliver_to)
+    await server.start(args.host, args.port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Servidor EventSub falso da Twitch')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--deliver-to', help='URL base do receptor do bot (ex.: http://127.0.0.1:8080)')
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
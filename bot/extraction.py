@@ -0,0 +1,166 @@
+"""
+Serviço de extração do yt-dlp em processos dedicados.
+
+Criar um `YoutubeDL` a cada chamada reinicializa todos os extratores, e rodar
+a extração em `asyncio.to_thread` disputa o GIL com o resto do bot. Aqui um
+pool fixo de processos (EXTRACTION_WORKERS) mantém uma instância pronta de
+`YoutubeDL` por perfil de opções, e as requisições passam por uma fila de
+prioridade: tocar agora vem antes de buscas, que vêm antes do pré-carregamento.
+
+O código que roda nos workers fica em `bot/extraction_worker.py`.
+
+Cada requisição tem timeout próprio. Uma requisição cancelada (ou expirada)
+ainda na fila é descartada sem ocupar um worker; se já estiver rodando, o
+resultado é ignorado quando chegar.
+"""
+
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from config.settings import EXTRACTION_TIMEOUT, EXTRACTION_WORKERS
+from .extraction_worker import ExtractionError, extract, warm_worker
+
+# Prioridades (menor sai primeiro)
+PRIORITY_PLAY = 0         # música que vai tocar agora / comando !play
+PRIORITY_INTERACTIVE = 1  # buscas e recomendações pedidas por um usuário
+PRIORITY_PREFETCH = 2     # pré-carregamento das próximas da fila
+
+
+@dataclass(order=True)
+class _Job:
+    priority: int
+    seq: int
+    profile: str = field(compare=False)
+    url: str = field(compare=False)
+    options: Optional[Dict[str, Any]] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(compare=False, default_factory=time.monotonic)
+
+
+class ExtractionService:
+    """Fila de prioridade na frente de um pool fixo de processos com YoutubeDL aquecido"""
+
+    def __init__(self, workers: int = EXTRACTION_WORKERS, timeout: float = EXTRACTION_TIMEOUT):
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._dispatchers: List[asyncio.Task] = []
+        self._seq = itertools.count()
+
+        # Métricas
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.cancelled = 0
+        self.max_wait_ms = 0.0
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # spawn: não herda threads/sockets do bot (fork com threads ativas é inseguro)
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=warm_worker,
+        )
+
+    def start(self):
+        """Cria o pool e os despachantes (chamado automaticamente na primeira extração)"""
+        if self._pool is not None:
+            return
+        self._pool = self._new_pool()
+        self._queue = asyncio.PriorityQueue()
+        # Um despachante por worker: a fila de prioridade decide quem entra no pool
+        self._dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+        logging.info(f"Serviço de extração iniciado com {self.workers} processos")
+
+    async def extract(
+        self,
+        profile: str,
+        url: str,
+        priority: int = PRIORITY_INTERACTIVE,
+        timeout: Optional[float] = None,
+        options: Optional[Dict[str, Any]] = None,
+    ) -> Optional[dict]:
+        """Executa `extract_info` no pool. Levanta asyncio.TimeoutError ou ExtractionError.
+
+        `options` sobrescreve parâmetros do perfil apenas nesta requisição.
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_Job(priority, next(self._seq), profile, url, options, future))
+        try:
+            # Cancelar o future (timeout ou cancelamento de quem pediu) descarta o job
+            return await asyncio.wait_for(future, timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            logging.warning(f"Extração expirou após {timeout or self.timeout}s: {url}")
+            raise
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            if job.future.done():
+                self.cancelled += 1
+                continue
+            self.max_wait_ms = max(self.max_wait_ms, (time.monotonic() - job.enqueued_at) * 1000)
+            pool = self._pool
+            try:
+                result = await loop.run_in_executor(pool, extract, job.profile, job.url, job.options)
+            except BrokenProcessPool as e:
+                # Um worker morreu (ex.: falta de memória): recria o pool para os próximos jobs
+                if self._pool is pool:
+                    logging.error("Pool de extração quebrado; recriando os processos.")
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    self._pool = self._new_pool()
+                self._finish(job, exception=e)
+            except Exception as e:
+                self._finish(job, exception=e)
+            else:
+                self._finish(job, result=result)
+
+    def _finish(self, job: _Job, result: Optional[dict] = None, exception: Optional[BaseException] = None):
+        if job.future.done():
+            return
+        if exception is not None:
+            self.failed += 1
+            job.future.set_exception(exception)
+        else:
+            self.completed += 1
+            job.future.set_result(result)
+
+    async def close(self):
+        for task in self._dispatchers:
+            task.cancel()
+        if self._dispatchers:
+            await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        self._dispatchers = []
+        if self._queue is not None:
+            while not self._queue.empty():
+                job = self._queue.get_nowait()
+                if not job.future.done():
+                    job.future.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> dict:
+        return {
+            'workers': self.workers,
+            'queued': self._queue.qsize() if self._queue else 0,
+            'completed': self.completed,
+            'failed': self.failed,
+            'timed_out': self.timed_out,
+            'cancelled': self.cancelled,
+            'max_wait_ms': round(self.max_wait_ms, 1),
+        }
+
+
+extraction_service = ExtractionService()
@@ -0,0 +1,78 @@
+"""
+Lado do worker do serviço de extração (ver `bot/extraction.py`).
+
+Roda dentro dos processos do pool, criados com spawn: cada um importa só este
+módulo (e o `bot/__init__.py`, mantido vazio), sem discord, banco ou settings.
+"""
+
+from typing import Any, Dict, Optional
+
+import yt_dlp
+
+# Perfis de opções; cada worker mantém um YoutubeDL aquecido por perfil
+PROFILES = {
+    # URL direta do áudio de um vídeo
+    'stream': {
+        'format': 'bestaudio/best',
+        'quiet': True,
+        'ignoreerrors': True,
+        'no_check_certificate': True,
+        'extract_flat': 'auto',
+        'socket_timeout': 15,
+    },
+    # Consulta do !play: playlist sem expandir as entradas, vídeo avulso já com o áudio
+    'probe': {
+        # Só 'in_playlist' (ou True) achata; a string 'True' extrairia cada entrada
+        'extract_flat': 'in_playlist',
+        'quiet': True,
+        'format': 'bestaudio/best',
+        'socket_timeout': 15,
+    },
+    # Buscas `ytsearchN:` (só título/URL dos resultados)
+    'search': {
+        'quiet': True,
+        'extract_flat': True,
+        'socket_timeout': 15,
+    },
+}
+
+
+class ExtractionError(Exception):
+    """Falha do yt-dlp no worker (as exceções originais nem sempre são serializáveis)"""
+
+
+_instances: Dict[str, yt_dlp.YoutubeDL] = {}
+
+
+def _ydl(profile: str) -> yt_dlp.YoutubeDL:
+    instance = _instances.get(profile)
+    if instance is None:
+        instance = _instances[profile] = yt_dlp.YoutubeDL(PROFILES[profile])
+    return instance
+
+
+def warm_worker():
+    """Inicializador do processo: cria as instâncias antes da primeira requisição"""
+    for profile in PROFILES:
+        _ydl(profile)
+
+
+def extract(profile: str, url: str, options: Optional[Dict[str, Any]] = None) -> Optional[dict]:
+    ydl = _ydl(profile)
+    # Opções pontuais (ex.: playlist_items) valem só para esta chamada; o worker
+    # processa uma requisição por vez, então alterar params da instância é seguro
+    missing = object()
+    saved = {key: ydl.params.get(key, missing) for key in (options or {})}
+    ydl.params.update(options or {})
+    try:
+        info = ydl.extract_info(url, download=False)
+        # sanitize_info troca geradores e objetos internos por tipos serializáveis
+        return ydl.sanitize_info(info) if info else None
+    except Exception as e:
+        raise ExtractionError(f"{type(e).__name__}: {e}") from None
+    finally:
+        for key, value in saved.items():
+            if value is missing:
+                ydl.params.pop(key, None)
+            else:
+                ydl.params[key] = value
@@ -3,127 +3,167 @@ import logging
 from datetime import datetime
 from discord.ext import commands
 
-from config.settings import DISCORD_TOKEN, REBOOT_CHANNEL_ID
+from config.settings import DISCORD_TOKEN, REBOOT_CHANNEL_ID, OUTBOX_WORKER_ENABLED
 from db.database import db
 from bot.commands import MusicCommands, HelpCommands
 from bot.commands_monitor import MonitorCommands
+from bot.extraction import extraction_service
+from bot.monitor import ChannelMonitor
+from bot.notifications import NotificationDispatcher
+from bot.outbox import OutboxWorker
 from bot.commands_ranking import RankingCommands
 from bot.scheduler import MonitorScheduler
 from bot.cogs_activity import ActivityTracker
 
+# Nada roda na importação: os processos de extração (spawn) reimportam este
+# módulo como `__mp_main__` e não devem abrir o log, validar o .env nem criar o bot
+
+
 # --- CONFIGURAÇÃO DE LOGGING ---
-log_filename = datetime.now().strftime("bot_log_%Y-%m-%d.log")
-logging.basicConfig(
-    level=logging.INFO,
-    format="[%(asctime)s] [%(levelname)s] %(message)s",
-    handlers=[
-        logging.FileHandler(log_filename, encoding="utf-8"),
-        logging.StreamHandler(),
-    ],
-)
-
-if not DISCORD_TOKEN:
-    logging.error("Token do bot não encontrado no arquivo .env")
-    raise ValueError("Token do bot não encontrado no arquivo .env")
-if not REBOOT_CHANNEL_ID:
-    logging.error("ID do canal de reboot não encontrado no arquivo .env")
-    raise ValueError("ID do canal de reboot não encontrado no arquivo .env")
-
-# --- CONFIGURAÇÃO DAS INTENTS E BOT ---
-intents = discord.Intents.default()
-intents.message_content = True
-intents.voice_states = True
-intents.presences = True
-intents.members = True  # Necessário para acessar guild.members
-bot = commands.Bot(
-    command_prefix="!", intents=intents, heartbeat_timeout=60.0, help_command=None
-)
-
-# Criar instância do scheduler
-scheduler = MonitorScheduler(bot)
+def setup_logging():
+    log_filename = datetime.now().strftime("bot_log_%Y-%m-%d.log")
+    logging.basicConfig(
+        level=logging.INFO,
+        format="[%(asctime)s] [%(levelname)s] %(message)s",
+        handlers=[
+            logging.FileHandler(log_filename, encoding="utf-8"),
+            logging.StreamHandler(),
+        ],
+    )
+
+
+def check_settings():
+    if not DISCORD_TOKEN:
+        logging.error("Token do bot não encontrado no arquivo .env")
+        raise ValueError("Token do bot não encontrado no arquivo .env")
+    if not REBOOT_CHANNEL_ID:
+        logging.error("ID do canal de reboot não encontrado no arquivo .env")
+        raise ValueError("ID do canal de reboot não encontrado no arquivo .env")
 
 
 # --- INICIALIZAÇÃO DO BANCO DE DADOS ---
-def setup_database():
+async def setup_database():
     """Inicializa a conexão com o banco de dados"""
     try:
-        db.connect()
-        db.initialize_collections()  # Inicializa as coleções e índices
+        await db.connect()
+        await db.initialize_collections()  # Inicializa as coleções e índices
         logging.info("Banco de dados inicializado com sucesso!")
     except Exception as e:
         logging.error(f"Erro ao inicializar banco de dados: {e}")
         raise e
 
 
-# --- REGISTRAR OS COGS ---
-async def setup_cogs():
-    """Configura os Cogs do bot"""
-    # Garante que o banco de dados está conectado antes de registrar os Cogs
-    setup_database()
-
-    await bot.add_cog(MusicCommands(bot))
-    await bot.add_cog(MonitorCommands(bot))
-    await bot.add_cog(RankingCommands(bot))
-    await bot.add_cog(HelpCommands(bot))
-    await bot.add_cog(ActivityTracker(bot))
-
-    # Iniciar o scheduler de monitoramento
-    await scheduler.start()
-
-    logging.info("Cogs registrados com sucesso!")
-
-
-@bot.event
-async def on_ready():
-    """Evento disparado quando o bot está pronto e conectado"""
-    await setup_cogs()  # Registra os Cogs quando o bot iniciar
-    logging.info(f"Bot conectado como {bot.user.name}")
-
-    try:
-        # Reconectar ao canal de voz se o bot reiniciar
-        reboot_channel = bot.get_channel(REBOOT_CHANNEL_ID)
-        if reboot_channel:
-            await reboot_channel.send("🔄 Bot reiniciado e pronto para uso!")
-    except Exception as e:
-        logging.error(f"Erro ao enviar mensagem de reboot: {e}")
-
-
-@bot.event
-async def on_command_error(ctx, error):
-    """Trata erros de comando."""
-    if isinstance(error, commands.CommandNotFound):
-        await ctx.send(
-            f"🤔 Comando não encontrado. Digite `!ajuda` para ver a lista de comandos disponíveis."
+class NoobSquadBot(commands.Bot):
+    def __init__(self):
+        # --- CONFIGURAÇÃO DAS INTENTS E BOT ---
+        intents = discord.Intents.default()
+        intents.message_content = True
+        intents.voice_states = True
+        intents.presences = True
+        intents.members = True  # Necessário para acessar guild.members
+        super().__init__(
+            command_prefix="!", intents=intents, heartbeat_timeout=60.0, help_command=None
         )
-    else:
-        # Para outros erros, loga e informa o usuário
-        logging.error(f"Ocorreu um erro no comando '{ctx.command}': {error}")
-        await ctx.send(
-            "❌ Ocorreu um erro ao processar o comando. Por favor, tente novamente."
-        )
-
-
-@bot.event
-async def on_error(event, *args, **kwargs):
-    """Tratamento global de erros"""
-    logging.error(f"Erro no evento {event}: ", exc_info=True)
-
 
-# Cleanup quando o bot for desligado
-def cleanup():
-    """Limpa recursos ao desligar o bot"""
+        # Clientes do YouTube/Twitch: uma única instância compartilhada por comandos e scheduler
+        self.monitor = ChannelMonitor()
+
+        # Fila de entrega das notificações do monitor
+        self.notifier = NotificationDispatcher(self)
+
+        # Worker do outbox embutido; desative para entregar com `python -m bot.outbox` em outro processo
+        self.outbox_worker = OutboxWorker(self.notifier) if OUTBOX_WORKER_ENABLED else None
+
+        # Criar instância do scheduler
+        self.scheduler = MonitorScheduler(self, self.monitor, self.notifier, self.outbox_worker)
+
+    async def close(self):
+        """Libera recursos assíncronos enquanto o event loop ainda está ativo"""
+        try:
+            await self.scheduler.close()  # Para as tasks de monitoramento
+            if self.outbox_worker:
+                await self.outbox_worker.close()  # Para de reservar notificações do outbox
+            await self.notifier.close()  # Entrega as notificações ainda na fila
+            await self.monitor.close()  # Fecha as conexões com YouTube/Twitch
+            await extraction_service.close()  # Encerra os processos do yt-dlp
+            await db.close()
+        except Exception as e:
+            logging.error(f"Erro ao liberar recursos assíncronos: {e}")
+        await super().close()
+
+    # --- REGISTRAR OS COGS ---
+    async def setup_cogs(self):
+        """Configura os Cogs do bot"""
+        # Garante que o banco de dados está conectado antes de registrar os Cogs
+        await setup_database()
+
+        # Autentica as plataformas uma única vez antes de registrar quem usa o monitor
+        await self.monitor.initialize()
+
+        await self.add_cog(MusicCommands(self))
+        await self.add_cog(MonitorCommands(self, self.monitor, self.notifier))
+        await self.add_cog(RankingCommands(self))
+        await self.add_cog(HelpCommands(self))
+        await self.add_cog(ActivityTracker(self))
+
+        # Iniciar o scheduler de monitoramento e a entrega das notificações
+        await self.scheduler.start()
+        if self.outbox_worker:
+            self.outbox_worker.start()
+
+        logging.info("Cogs registrados com sucesso!")
+
+    async def on_ready(self):
+        """Evento disparado quando o bot está pronto e conectado"""
+        await self.setup_cogs()  # Registra os Cogs quando o bot iniciar
+        logging.info(f"Bot conectado como {self.user.name}")
+
+        try:
+            # Reconectar ao canal de voz se o bot reiniciar
+            reboot_channel = self.get_channel(REBOOT_CHANNEL_ID)
+            if reboot_channel:
+                await reboot_channel.send("🔄 Bot reiniciado e pronto para uso!")
+        except Exception as e:
+            logging.error(f"Erro ao enviar mensagem de reboot: {e}")
+
+    async def on_command_error(self, ctx, error):
+        """Trata erros de comando."""
+        if isinstance(error, commands.CommandNotFound):
+            await ctx.send(
+                f"🤔 Comando não encontrado. Digite `!ajuda` para ver a lista de comandos disponíveis."
+            )
+        else:
+            # Para outros erros, loga e informa o usuário
+            logging.error(f"Ocorreu um erro no comando '{ctx.command}': {error}")
+            await ctx.send(
+                "❌ Ocorreu um erro ao processar o comando. Por favor, tente novamente."
+            )
+
+    async def on_error(self, event, *args, **kwargs):
+        """Tratamento global de erros"""
+        logging.error(f"Erro no evento {event}: ", exc_info=True)
+
+    # Cleanup quando o bot for desligado
+    def cleanup(self):
+        """Limpa recursos ao desligar o bot"""
+        try:
+            self.scheduler.stop()  # Garante que as tasks parem mesmo se close() não rodou
+            logging.info("Recursos do bot liberados com sucesso.")
+        except Exception as e:
+            logging.error(f"Erro ao liberar recursos: {e}")
+
+
+def main():
+    setup_logging()
+    check_settings()
+    bot = NoobSquadBot()
     try:
-        scheduler.stop()  # Para as tasks de monitoramento
-        db.close()
-        logging.info("Recursos do bot liberados com sucesso.")
+        bot.run(DISCORD_TOKEN)
     except Exception as e:
-        logging.error(f"Erro ao liberar recursos: {e}")
+        logging.error(f"Erro ao iniciar o bot: {e}")
+    finally:
+        bot.cleanup()
 
 
-# Iniciar o bot
-try:
-    bot.run(DISCORD_TOKEN)
-except Exception as e:
-    logging.error(f"Erro ao iniciar o bot: {e}")
-finally:
-    cleanup()
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,206 @@
 import logging
-from typing import Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional, Tuple
 import asyncio
+import aiohttp
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
+from twitchAPI.oauth import validate_token
 from twitchAPI.twitch import Twitch
 from config.settings import (
     YOUTUBE_API_KEY,
     TWITCH_CLIENT_ID,
     TWITCH_CLIENT_SECRET,
+    MONITOR_MAX_CONCURRENCY,
+    MONITOR_API_THREADS,
+    TWITCH_TOKEN_REFRESH_MARGIN,
 )
+from db.database import db
 from db.models import MonitoredChannel
+from .quota import quota_ledger
+
+# Limite de logins/IDs por requisição da API Helix
+TWITCH_BATCH_SIZE = 100
+# Limite de IDs por requisição de videos.list na YouTube Data API
+YOUTUBE_BATCH_SIZE = 50
+# A Twitch pede que tokens sejam validados ao menos a cada hora
+TWITCH_VALIDATE_INTERVAL = 3600
+HELIX_URL = 'https://api.twitch.tv/helix'
 
 class ChannelMonitor:
+    """Clientes das plataformas (YouTube e Twitch), compartilhados pelo bot inteiro.
+
+    Criado uma única vez em `bot/main.py` e injetado nos comandos e no
+    agendador: o cliente do YouTube, o token de app da Twitch e a sessão HTTP
+    são inicializados e renovados em um só lugar.
+    """
+
     def __init__(self):
         self.youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY) if YOUTUBE_API_KEY else None
+        self._youtube_etags = {}  # channel_id -> ETag da última resposta de playlistItems
+        # ETags de respostas com vídeo novo: só valem depois que a mudança for gravada,
+        # senão o próximo 304 esconderia um upload que nunca foi notificado
+        self._pending_etags = {}
+        # googleapiclient/httplib2 é bloqueante: roda em um pool de threads dedicado,
+        # com uma conexão httplib2 por thread (httplib2.Http não é thread-safe)
+        self._executor = ThreadPoolExecutor(
+            max_workers=MONITOR_API_THREADS, thread_name_prefix="monitor-api"
+        )
+        self._thread_local = threading.local()
+        # Limita quantas verificações de canal rodam em paralelo
+        self._semaphore = asyncio.Semaphore(MONITOR_MAX_CONCURRENCY)
+        self.latency = {}  # tipo de verificação -> estatísticas de latência (ms)
+        self.quota = quota_ledger
+        # Sessão HTTP reaproveitada nas chamadas diretas à Helix (lidas com cabeçalhos de rate limit)
+        self._http_session: Optional[aiohttp.ClientSession] = None
         self.twitch = None
         # Inicialização do Twitch será feita de forma assíncrona
         if TWITCH_CLIENT_ID and TWITCH_CLIENT_SECRET:
             self.twitch = Twitch(TWITCH_CLIENT_ID, TWITCH_CLIENT_SECRET)
+        self.twitch_token_expires_at: Optional[float] = None  # timestamp Unix
+        self._auth_lock = asyncio.Lock()
+        self._token_task: Optional[asyncio.Task] = None
+        self._initialized = False
 
     async def initialize(self):
-        """Inicializa as APIs de forma assíncrona"""
+        """Inicializa as APIs de forma assíncrona (apenas na primeira chamada)"""
+        if self._initialized:
+            return
+        self._initialized = True
+        # Retoma o consumo de cota do dia gravado antes de um reinício
+        state = await db.get_youtube_quota(self.quota.period_key)
+        if state:
+            self.quota.restore_youtube(state)
         if self.twitch:
             try:
                 # Agora aguardamos corretamente a autenticação
                 await self.twitch.authenticate_app([])
+                await self._update_token_expiry()
                 logging.info("Twitch API autenticada com sucesso!")
             except Exception as e:
                 logging.error(f"Falha ao autenticar Twitch na inicialização: {e}")
                 self.twitch = None
+        self._token_task = asyncio.create_task(self._token_refresh_loop())
+
+    async def _update_token_expiry(self):
+        """Consulta a validade do token de app atual (`oauth2/validate`)"""
+        result = await validate_token(self.twitch.get_app_token(), session=self._session())
+        expires_in = result.get('expires_in')
+        self.twitch_token_expires_at = time.time() + expires_in if expires_in else None
+
+    def _session(self) -> aiohttp.ClientSession:
+        """Sessão HTTP compartilhada (pool de conexões) para Helix e OAuth da Twitch"""
+        if self._http_session is None or self._http_session.closed:
+            self._http_session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30))
+        return self._http_session
+
+    async def refresh_twitch_token(self) -> bool:
+        """Gera um novo token de app no mesmo cliente (quem guarda a instância continua válido)"""
+        async with self._auth_lock:
+            if self.twitch is None:
+                return await self.ensure_twitch_authenticated()
+            try:
+                await self.twitch.authenticate_app([])
+                await self._update_token_expiry()
+                logging.info("Token de app da Twitch renovado")
+                return True
+            except Exception as e:
+                logging.error(f"Falha ao renovar token da Twitch: {e}")
+                return False
+
+    async def _token_refresh_loop(self):
+        """Renova o token da Twitch antes de expirar, validando-o a cada hora"""
+        while True:
+            delay = TWITCH_VALIDATE_INTERVAL
+            if self.twitch_token_expires_at is not None:
+                delay = min(delay, self.twitch_token_expires_at - time.time() - TWITCH_TOKEN_REFRESH_MARGIN)
+            await asyncio.sleep(max(delay, 60))
+            if not (TWITCH_CLIENT_ID and TWITCH_CLIENT_SECRET):
+                continue
+            try:
+                if self.twitch is not None:
+                    await self._update_token_expiry()
+                expires_in = (
+                    self.twitch_token_expires_at - time.time()
+                    if self.twitch_token_expires_at is not None
+                    else 0
+                )
+                if self.twitch is None or expires_in <= TWITCH_TOKEN_REFRESH_MARGIN:
+                    await self.refresh_twitch_token()
+            except Exception as e:
+                logging.warning(f"Erro ao validar token da Twitch: {e}")
+
+    async def persist_quota(self):
+        """Grava o consumo de cota do YouTube do dia, se mudou"""
+        state = self.quota.take_youtube_changes()
+        if state and not await db.save_youtube_quota(state):
+            self.quota.mark_youtube_unsaved()
+
+    async def close(self):
+        """Libera o pool de threads e as conexões HTTP do monitor"""
+        await self.persist_quota()
+        if self._token_task:
+            self._token_task.cancel()
+            self._token_task = None
+        self._executor.shutdown(wait=False)
+        if self._http_session and not self._http_session.closed:
+            await self._http_session.close()
+
+    def _thread_http(self):
+        """Conexão httplib2 exclusiva da thread atual do pool"""
+        http = getattr(self._thread_local, 'http', None)
+        if http is None:
+            http = self._thread_local.http = build_http()
+        return http
+
+    def _execute(self, request) -> dict:
+        """Executa uma requisição do googleapiclient (chamar apenas dentro do pool)"""
+        self.quota.charge_youtube(request.methodId)
+        try:
+            return request.execute(http=self._thread_http())
+        except HttpError as e:
+            if e.resp.status == 403 and 'quotaExceeded' in str(e.content):
+                self.quota.mark_youtube_exhausted()
+            raise
+
+    async def run_blocking(self, func, *args, **kwargs):
+        """Executa uma função bloqueante no pool de threads do monitor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    def _record_latency(self, kind: str, elapsed_ms: float):
+        stats = self.latency.setdefault(
+            kind, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'last_ms': 0.0}
+        )
+        stats['count'] += 1
+        stats['total_ms'] += elapsed_ms
+        stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+        stats['last_ms'] = elapsed_ms
+
+    def latency_snapshot(self) -> Dict[str, dict]:
+        """Latência por tipo de verificação (última, média e máxima, em ms)"""
+        return {
+            kind: {
+                'count': stats['count'],
+                'last_ms': round(stats['last_ms'], 1),
+                'avg_ms': round(stats['total_ms'] / stats['count'], 1),
+                'max_ms': round(stats['max_ms'], 1),
+            }
+            for kind, stats in self.latency.items()
+        }
+
+    async def _bounded(self, kind: str, coro_func, *args):
+        """Executa uma verificação respeitando o limite de concorrência e medindo a latência"""
+        async with self._semaphore:
+            started = time.perf_counter()
+            try:
+                return await coro_func(*args)
+            finally:
+                self._record_latency(kind, (time.perf_counter() - started) * 1000)
 
     async def ensure_twitch_authenticated(self) -> bool:
         """Garante que self.twitch está autenticado (tenta reautenticar se necessário).
@@ -41,6 +214,7 @@ class ChannelMonitor:
             try:
                 self.twitch = Twitch(TWITCH_CLIENT_ID, TWITCH_CLIENT_SECRET)
                 await self.twitch.authenticate_app([])
+                await self._update_token_expiry()
                 return True
             except Exception as e:
                 logging.error(f"Falha ao (re)autenticar Twitch: {e}")
@@ -50,152 +224,343 @@ class ChannelMonitor:
         # Se já temos uma instância, assumimos que está autenticada; operações terão tratamento de erro
         return True
 
+    @staticmethod
+    def _best_thumbnail(thumbnails: dict) -> str:
+        """Pega a melhor qualidade de thumbnail disponível"""
+        for quality in ('maxres', 'high', 'medium', 'default'):
+            if quality in thumbnails:
+                return thumbnails[quality]['url']
+        return ''
+
+    def _latest_upload_id(self, channel: MonitoredChannel) -> Tuple[Optional[str], Optional[str]]:
+        """Retorna (ID do vídeo mais recente, ETag) da playlist de uploads do canal (roda no pool).
+
+        Usa `playlistItems.list` (1 unidade de cota) com If-None-Match: se a
+        playlist não mudou desde a última consulta, a API responde 304 e o
+        método retorna (None, None) sem baixar nada. A ETag não é guardada
+        aqui; quem chama decide quando ela passa a valer.
+        """
+        # A playlist de uploads de um canal UCxxxx é sempre UUxxxx
+        playlist_id = 'UU' + channel.channel_id[2:]
+        request = self.youtube.playlistItems().list(
+            part="contentDetails",
+            playlistId=playlist_id,
+            maxResults=1
+        )
+        etag = self._youtube_etags.get(channel.channel_id)
+        if etag:
+            request.headers['If-None-Match'] = etag
+        try:
+            response = self._execute(request)
+        except HttpError as e:
+            if e.resp.status == 304:
+                return None, None
+            raise
+
+        if not response.get('items'):
+            return None, response.get('etag')
+        return response['items'][0]['contentDetails']['videoId'], response.get('etag')
+
+    def _fetch_video_details(self, video_ids: List[str]) -> Dict[str, dict]:
+        """Busca título e thumbnails de até 50 vídeos com um `videos.list` (roda no pool)"""
+        response = self._execute(self.youtube.videos().list(
+            part="snippet",
+            id=",".join(video_ids),
+            maxResults=YOUTUBE_BATCH_SIZE
+        ))
+        return {video['id']: video['snippet'] for video in response.get('items', [])}
+
+    async def _check_youtube_channel(self, channel: MonitoredChannel) -> Optional[str]:
+        """Retorna o ID do vídeo novo do canal, se houver"""
+        try:
+            video_id, etag = await self.run_blocking(self._latest_upload_id, channel)
+            if video_id and video_id != channel.last_video_id:
+                if etag:
+                    self._pending_etags[channel.channel_id] = etag
+                return video_id
+            if etag:
+                # Nada a notificar: a ETag já pode ser usada na próxima consulta
+                self._youtube_etags[channel.channel_id] = etag
+        except Exception as e:
+            logging.error(f"Erro ao verificar canal YouTube {channel.channel_name}: {str(e)}")
+        return None
+
+    async def check_youtube_batch(self, channels: List[MonitoredChannel]) -> Dict[str, dict]:
+        """Verifica novos uploads de vários canais do YouTube.
+
+        Cada canal custa uma chamada `playlistItems.list` (ou um 304 se nada
+        mudou); os detalhes dos vídeos novos são buscados em lote depois.
+        Retorna {channel_id: update} apenas para canais com vídeo novo.
+        """
+        if not self.youtube or not channels:
+            return {}
+        if not self.quota.youtube_available():
+            # Sem cota até o reset (meia-noite do Pacífico): não adianta consultar
+            logging.debug(f"Cota do YouTube indisponível; {len(channels)} canais adiados")
+            return {}
+
+        # Canais verificados em paralelo, limitados pelo semáforo do monitor
+        results = await asyncio.gather(*(
+            self._bounded('youtube', self._check_youtube_channel, channel)
+            for channel in channels
+        ))
+        new_videos = {  # channel_id -> video_id
+            channel.channel_id: video_id
+            for channel, video_id in zip(channels, results)
+            if video_id
+        }
+        if not new_videos:
+            return {}
+
+        video_ids = list(new_videos.values())
+        batches = await asyncio.gather(*(
+            self._bounded(
+                'youtube_videos', self.run_blocking, self._fetch_video_details,
+                video_ids[start:start + YOUTUBE_BATCH_SIZE]
+            )
+            for start in range(0, len(video_ids), YOUTUBE_BATCH_SIZE)
+        ), return_exceptions=True)
+        details = {}
+        for batch in batches:
+            if isinstance(batch, Exception):
+                logging.error(f"Erro ao buscar detalhes dos vídeos do YouTube: {str(batch)}")
+                continue
+            details.update(batch)
+
+        updates = {}
+        for channel_id, video_id in new_videos.items():
+            snippet = details.get(video_id)
+            if not snippet:
+                # Sem detalhes não há notificação: a próxima consulta precisa ver o vídeo de novo
+                self._pending_etags.pop(channel_id, None)
+                continue
+            updates[channel_id] = {
+                'type': 'video',
+                'title': snippet['title'],
+                'url': f'https://www.youtube.com/watch?v={video_id}',
+                'thumbnail': self._best_thumbnail(snippet.get('thumbnails', {})),
+                'video_id': video_id
+            }
+        return updates
+
+    def confirm_youtube_updates(self, channel_ids):
+        """Mudanças gravadas: passa a usar as ETags novas desses canais"""
+        for channel_id in channel_ids:
+            etag = self._pending_etags.pop(channel_id, None)
+            if etag:
+                self._youtube_etags[channel_id] = etag
+
+    def discard_youtube_updates(self, channel_ids):
+        """Mudanças não gravadas: mantém a ETag anterior, e a próxima consulta redetecta o vídeo"""
+        for channel_id in channel_ids:
+            self._pending_etags.pop(channel_id, None)
+
     async def check_youtube_updates(self, channel: MonitoredChannel) -> Optional[dict]:
         """Verifica atualizações de um canal do YouTube"""
         try:
-            # Busca os últimos vídeos do canal
-            request = self.youtube.search().list(
-                part="snippet",
-                channelId=channel.channel_id,
-                order="date",
-                maxResults=1,
-                type="video"
-            )
-            response = request.execute()
+            return (await self.check_youtube_batch([channel])).get(channel.channel_id)
+        except Exception as e:
+            logging.error(f"Erro ao verificar canal YouTube {channel.channel_name}: {str(e)}")
+            return None
 
-            if not response['items']:
-                return None
+    async def _helix_get(self, endpoint: str, params) -> dict:
+        """GET na API Helix com o token de app do twitchAPI, registrando o rate limit.
 
-            video = response['items'][0]
-            video_id = video['id']['videoId']
-            thumbnails = video['snippet']['thumbnails']
-
-            # Se é um vídeo novo
-            if video_id != channel.last_video_id:
-                # Pega a melhor qualidade de thumbnail disponível
-                if 'maxres' in thumbnails:
-                    thumbnail_url = thumbnails['maxres']['url']
-                elif 'high' in thumbnails:
-                    thumbnail_url = thumbnails['high']['url']
-                elif 'medium' in thumbnails:
-                    thumbnail_url = thumbnails['medium']['url']
-                else:
-                    thumbnail_url = thumbnails['default']['url']
+        O twitchAPI não expõe os cabeçalhos `Ratelimit-*`, por isso as chamadas
+        de verificação periódica são feitas diretamente.
+        """
+        headers = {
+            'Client-ID': TWITCH_CLIENT_ID,
+            'Authorization': f'Bearer {self.twitch.get_app_token()}',
+        }
+        async with self._session().get(f'{HELIX_URL}/{endpoint}', params=params, headers=headers) as response:
+            self.quota.record_twitch_headers(response.headers)
+            response.raise_for_status()
+            return await response.json()
 
-                return {
-                    'type': 'video',
-                    'title': video['snippet']['title'],
-                    'url': f'https://www.youtube.com/watch?v={video_id}',
-                    'thumbnail': thumbnail_url,
-                    'video_id': video_id
-                }
+    @staticmethod
+    def _live_update(stream: dict) -> dict:
+        """Monta a atualização 'live' a partir de um item de `helix/streams`"""
+        return {
+            'type': 'live',
+            'title': stream['title'],
+            'url': f"https://twitch.tv/{stream['user_login']}",
+            'thumbnail': stream['thumbnail_url'].replace('{width}', '320').replace('{height}', '180'),
+            'stream_id': stream['id']
+        }
+
+    async def get_live_update(self, channel_id: str) -> Optional[dict]:
+        """Atualização 'live' de um único canal (usada ao receber eventos push)"""
+        if not await self.ensure_twitch_authenticated():
             return None
+        try:
+            stream = (await self._fetch_live_streams([channel_id])).get(channel_id)
         except Exception as e:
-            logging.error(f"Erro ao verificar canal YouTube {channel.channel_name}: {str(e)}")
+            logging.error(f"Erro ao buscar live do canal Twitch {channel_id}: {e}")
             return None
+        return self._live_update(stream) if stream else None
 
-    async def check_twitch_updates(self, channel: MonitoredChannel) -> Optional[dict]:
-        """Verifica atualizações de um canal da Twitch"""
+    async def _fetch_live_streams(self, user_ids: List[str]) -> Dict[str, dict]:
+        """Busca as lives ativas de até 100 usuários da Twitch em uma única requisição"""
+        params = [('user_id', user_id) for user_id in user_ids]
+        params.append(('first', str(TWITCH_BATCH_SIZE)))
+        data = await self._helix_get('streams', params)
+        return {stream['user_id']: stream for stream in data.get('data', [])}
+
+    async def check_twitch_batch(self, channels: List[MonitoredChannel]) -> Dict[str, dict]:
+        """Verifica o status de live de vários canais da Twitch de uma vez.
+
+        Usa os `user_id`s estáveis (channel_id) em blocos de até 100 por chamada
+        de `get_streams` e compara com `is_live`/`last_stream_id` salvos.
+        Retorna {channel_id: update} apenas para canais cujo estado mudou:
+        - `type='live'` quando uma nova transmissão começou;
+        - `type='offline'` quando um canal marcado como ao vivo encerrou a live.
+        """
+        if not channels:
+            return {}
+        # Garante autenticação antes de chamar a API
+        if not await self.ensure_twitch_authenticated():
+            logging.error("Twitch não autenticada ao verificar atualizações.")
+            return {}
+
+        batches = [
+            channels[start:start + TWITCH_BATCH_SIZE]
+            for start in range(0, len(channels), TWITCH_BATCH_SIZE)
+        ]
+        results = await asyncio.gather(*(
+            self._bounded('twitch', self._check_twitch_chunk, batch) for batch in batches
+        ))
+        updates = {}
+        for result in results:
+            updates.update(result)
+        return updates
+
+    async def _check_twitch_chunk(self, batch: List[MonitoredChannel]) -> Dict[str, dict]:
+        """Verifica um bloco de até 100 canais da Twitch com uma chamada `get_streams`"""
+        user_ids = [channel.channel_id for channel in batch]
         try:
-            # Garante autenticação antes de chamar a API
-            if not await self.ensure_twitch_authenticated():
-                logging.error("Twitch não autenticada ao verificar atualizações.")
-                return None
-            # Verifica se o canal está ao vivo
+            streams = await self._fetch_live_streams(user_ids)
+        except aiohttp.ClientResponseError as e:
+            if e.status != 401:
+                # Rate limit (429) ou erro do servidor: reautenticar não ajuda
+                logging.warning(f"Erro na chamada Twitch get_streams: {e.status} {e.message}")
+                return {}
+            logging.warning("Token da Twitch rejeitado em get_streams. Tentando reautenticar e repetir.")
+            if not await self.refresh_twitch_token():
+                return {}
             try:
-                streams = self.twitch.get_streams(user_login=[channel.channel_name])['data']
-            except Exception as e:
-                logging.warning(f"Erro na chamada Twitch get_streams: {e}. Tentando reautenticar e repetir.")
-                # Tenta reautenticar uma vez e repetir
-                if await self.ensure_twitch_authenticated():
-                    try:
-                        streams = self.twitch.get_streams(user_login=[channel.channel_name])['data']
-                    except Exception as e2:
-                        logging.error(f"Falha após reautenticar ao chamar get_streams: {e2}")
-                        return None
-                else:
-                    return None
+                streams = await self._fetch_live_streams(user_ids)
+            except Exception as e2:
+                logging.error(f"Falha após reautenticar ao chamar get_streams: {e2}")
+                return {}
+        except Exception as e:
+            logging.warning(f"Erro na chamada Twitch get_streams: {e}. Tentando reautenticar e repetir.")
+            # Tenta reautenticar uma vez e repetir
+            if not await self.refresh_twitch_token():
+                return {}
+            try:
+                streams = await self._fetch_live_streams(user_ids)
+            except Exception as e2:
+                logging.error(f"Falha após reautenticar ao chamar get_streams: {e2}")
+                return {}
 
-            is_live = bool(streams)
-            stream_id = streams[0]['id'] if streams else None
-
-            # Se o status da live mudou
-            if is_live != channel.is_live or (is_live and stream_id != channel.last_stream_id):
-                if is_live:
-                    stream = streams[0]
-                    return {
-                        'type': 'live',
-                        'title': stream['title'],
-                        'url': f'https://twitch.tv/{channel.channel_name}',
-                        'thumbnail': stream['thumbnail_url'].replace('{width}', '320').replace('{height}', '180'),
-                        'stream_id': stream_id
-                    }
-            return None
+        updates = {}
+        for channel in batch:
+            stream = streams.get(channel.channel_id)
+            if stream and (not channel.is_live or stream['id'] != channel.last_stream_id):
+                updates[channel.channel_id] = self._live_update(stream)
+            elif not stream and channel.is_live:
+                updates[channel.channel_id] = {'type': 'offline', 'stream_id': None}
+        return updates
+
+    async def check_twitch_updates(self, channel: MonitoredChannel) -> Optional[dict]:
+        """Verifica atualizações de um canal da Twitch"""
+        try:
+            update = (await self.check_twitch_batch([channel])).get(channel.channel_id)
+            return update if update and update['type'] == 'live' else None
         except Exception as e:
             logging.error(f"Erro ao verificar canal Twitch {channel.channel_name}: {str(e)}")
             return None
 
-    def extract_youtube_channel_id(self, input_str: str) -> Optional[str]:
-        """Extrai o ID do canal do YouTube de diferentes formatos de URL, incluindo handle (@)"""
-        try:
-            # Se já é um ID válido
-            if input_str.startswith('UC') and len(input_str) == 24:
-                return input_str
-
-            # Se é uma URL do YouTube
-            if 'youtube.com/' in input_str:
-                # Se é URL de canal direto
-                if '/channel/' in input_str:
-                    return input_str.split('/channel/')[-1].split('/')[0]
-                # Se é URL de usuário
-                elif '/user/' in input_str:
-                    username = input_str.split('/user/')[-1].split('/')[0]
-                    request = self.youtube.channels().list(
-                        part="id",
-                        forUsername=username
-                    )
-                    response = request.execute()
-                    if response.get('items'):
-                        return response['items'][0]['id']
-                    return None
-                # Se é URL de handle (@)
-                elif '/@' in input_str:
-                    handle = input_str.split('/@')[-1].split('/')[0]
-                    request = self.youtube.channels().list(
-                        part="id",
-                        forHandle=handle
-                    )
-                    response = request.execute()
-                    if response.get('items'):
-                        return response['items'][0]['id']
-                    return None
+    @staticmethod
+    def _parse_youtube_input(input_str: str) -> Optional[Tuple[str, str]]:
+        """Identifica o formato informado: ('id' | 'handle' | 'username', valor).
 
-            # Se é um @handle puro
-            if input_str.startswith('@'):
-                handle = input_str.lstrip('@').split('/')[0]
-                request = self.youtube.channels().list(
-                    part="id",
-                    forHandle=handle
-                )
-                response = request.execute()
-                if response.get('items'):
-                    return response['items'][0]['id']
-                return None
+        Aceita ID do canal, URLs /channel/, /user/ e /@handle, @handle puro ou
+        nome de usuário legado.
+        """
+        input_str = input_str.strip()
+        # Se já é um ID válido
+        if input_str.startswith('UC') and len(input_str) == 24:
+            return 'id', input_str
 
-            # Se é nome de usuário
-            username = input_str.lstrip('@')
-            request = self.youtube.channels().list(
-                part="id",
-                forUsername=username
-            )
-            response = request.execute()
-            if response.get('items'):
-                return response['items'][0]['id']
+        # Se é uma URL do YouTube
+        if 'youtube.com/' in input_str:
+            if '/channel/' in input_str:
+                return 'id', input_str.split('/channel/')[-1].split('/')[0].split('?')[0]
+            if '/user/' in input_str:
+                return 'username', input_str.split('/user/')[-1].split('/')[0].split('?')[0]
+            if '/@' in input_str:
+                return 'handle', input_str.split('/@')[-1].split('/')[0].split('?')[0]
+            return None
 
+        # Se é um @handle puro
+        if input_str.startswith('@'):
+            return 'handle', input_str.lstrip('@').split('/')[0]
+
+        # Se é nome de usuário
+        return ('username', input_str) if input_str else None
+
+    @staticmethod
+    def _resolution_key(kind: str, value: str) -> str:
+        # Handles e usernames não diferenciam maiúsculas; IDs sim
+        return f"{kind}:{value if kind == 'id' else value.lower()}"
+
+    def _fetch_youtube_channel(self, kind: str, value: str) -> Optional[dict]:
+        """Resolve o canal e obtém o título com um único `channels.list` (roda no pool)"""
+        lookup = {'id': 'id', 'handle': 'forHandle', 'username': 'forUsername'}[kind]
+        response = self._execute(self.youtube.channels().list(part="snippet", **{lookup: value}))
+        if not response.get('items'):
+            return None
+        item = response['items'][0]
+        return {'channel_id': item['id'], 'title': item['snippet']['title']}
+
+    async def resolve_youtube_channel(self, input_str: str) -> Optional[dict]:
+        """Resolve URL/handle/usuário/ID em {'channel_id', 'title'}.
+
+        Ordem: LRU em memória -> coleção `youtube_resolutions` (TTL) -> canais já
+        monitorados -> YouTube Data API (1 unidade). Adicionar de novo um canal
+        conhecido não consome cota.
+        """
+        parsed = self._parse_youtube_input(input_str)
+        if not parsed:
+            return None
+        kind, value = parsed
+        key = self._resolution_key(kind, value)
+
+        resolved = await db.get_youtube_resolution(key)
+        if resolved:
+            return resolved
+
+        if kind == 'id':
+            channel = await db.get_monitored_channel('youtube', value)
+            if channel:
+                resolved = {'channel_id': channel.channel_id, 'title': channel.channel_name}
+                await db.save_youtube_resolution([key], **resolved)
+                return resolved
+
+        if not self.youtube:
             return None
+        try:
+            resolved = await self.run_blocking(self._fetch_youtube_channel, kind, value)
         except Exception as e:
-            logging.error(f"Erro ao extrair ID do canal YouTube: {str(e)}")
+            logging.error(f"Erro ao resolver canal YouTube '{input_str}': {str(e)}")
             return None
+        if resolved:
+            # Guarda também pelo ID, para que URLs /channel/ do mesmo canal não custem cota
+            keys = {key, self._resolution_key('id', resolved['channel_id'])}
+            await db.save_youtube_resolution(keys, **resolved)
+        return resolved
 
     async def validate_twitch_channel(self, channel_name: str) -> Optional[dict]:
         """Valida se um canal da Twitch existe e retorna suas informações"""
@@ -215,7 +580,7 @@ class ChannelMonitor:
                     users.append(user_data)
             except Exception as e:
                 logging.warning(f"Erro na chamada Twitch get_users: {e}. Tentando reautenticar e repetir.")
-                if await self.ensure_twitch_authenticated():
+                if await self.refresh_twitch_token():
                     try:
                         users_generator = self.twitch.get_users(logins=[channel_name])
                         users = []
@@ -229,9 +594,9 @@ class ChannelMonitor:
             if users:
                 user = users[0]
                 return {
-                    'id': user['id'],
-                    'name': user['login'],
-                    'display_name': user['display_name']
+                    'id': user.id,
+                    'name': user.login,
+                    'display_name': user.display_name
                 }
             return None
         except Exception as e:
@@ -0,0 +1,231 @@
+"""
+Fila de entrega das notificações do monitor de canais.
+
+A detecção grava as notificações no outbox (ver `bot/outbox.py`), cujo worker
+as repassa para cá. Cada destino (canal de texto ou DM) tem sua própria fila
+e worker, então um destino lento ou limitado pelo Discord não trava os demais. Notificações pendentes para o
+mesmo destino são agrupadas em uma única mensagem (até 10 embeds, dentro dos
+limites de 2000 caracteres de conteúdo e 6000 de embeds), e cada destino
+respeita seu próprio bucket de envios.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+import discord
+
+from config.settings import (
+    NOTIFICATION_MODE,
+    NOTIFICATION_ROUTE_RATE,
+    NOTIFICATION_ROUTE_PERIOD,
+)
+
+# Limites de uma mensagem do Discord
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_CONTENT_LENGTH = 2000
+MAX_EMBED_CHARS = 6000
+# Limite global de requisições por segundo do bot
+GLOBAL_RATE = 50
+
+Route = Tuple[str, int]  # ('channel' | 'user', id)
+
+
+@dataclass
+class Notification:
+    embed: discord.Embed
+    mentions: List[str] = field(default_factory=list)  # IDs de usuários a mencionar
+    enqueued_at: float = field(default_factory=time.monotonic)
+    # Resolvido com True/False quando a entrega termina
+    result: Optional[asyncio.Future] = None
+
+
+class RouteBucket:
+    """Janela deslizante: no máximo `rate` envios a cada `period` segundos"""
+
+    def __init__(self, rate: int, period: float):
+        self.rate = rate
+        self.period = period
+        self._sent: Deque[float] = deque()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            while self._sent and now - self._sent[0] >= self.period:
+                self._sent.popleft()
+            if len(self._sent) < self.rate:
+                self._sent.append(now)
+                return
+            await asyncio.sleep(self.period - (now - self._sent[0]))
+
+
+def mention_content(user_ids: List[str]) -> Optional[str]:
+    """Menciona os usuários em uma única linha, cortada no limite de conteúdo"""
+    mentions = " ".join(f"<@{user_id}>" for user_id in user_ids)
+    if len(mentions) > MAX_CONTENT_LENGTH:
+        mentions = mentions[:MAX_CONTENT_LENGTH].rsplit(" ", 1)[0]
+    return mentions or None
+
+
+class NotificationDispatcher:
+    """Entrega notificações em segundo plano, agrupadas e com rate limit por destino"""
+
+    def __init__(self, bot, mode: str = NOTIFICATION_MODE):
+        self.bot = bot
+        self.mode = mode  # 'mention' (canal de notificações) ou 'dm'
+        self._queues: Dict[Route, Deque[Notification]] = {}
+        self._wakeups: Dict[Route, asyncio.Event] = {}
+        self._workers: Dict[Route, asyncio.Task] = {}
+        self._buckets: Dict[Route, RouteBucket] = {}
+        self._global_bucket = RouteBucket(GLOBAL_RATE, 1.0)
+        self._closing = False
+
+        # Métricas
+        self.delivered = 0  # notificações entregues
+        self.messages_sent = 0  # mensagens enviadas (cada uma com até 10 embeds)
+        self.failed = 0
+        self.last_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self._total_latency_ms = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def routes(self, notification_channel_id: int, subscribers: List[str]) -> List[Tuple[Route, List[str]]]:
+        """Destinos (e menções) de uma notificação conforme o modo de entrega"""
+        if self.mode == 'dm':
+            return [(('user', int(user_id)), []) for user_id in subscribers]
+        return [(('channel', notification_channel_id), list(subscribers))]
+
+    def submit(self, route: Route, embed: discord.Embed, mentions: List[str]) -> asyncio.Future:
+        """Enfileira uma notificação; o future indica se ela foi entregue"""
+        result = asyncio.get_running_loop().create_future()
+        if self._closing:
+            result.set_result(False)
+            return result
+        self._enqueue(route, Notification(embed, list(mentions), result=result))
+        return result
+
+    def _enqueue(self, route: Route, notification: Notification):
+        self._queues.setdefault(route, deque()).append(notification)
+        self._wakeups.setdefault(route, asyncio.Event()).set()
+        worker = self._workers.get(route)
+        if worker is None or worker.done():
+            self._buckets.setdefault(route, RouteBucket(NOTIFICATION_ROUTE_RATE, NOTIFICATION_ROUTE_PERIOD))
+            self._workers[route] = asyncio.create_task(self._route_worker(route))
+
+    @staticmethod
+    def _take_batch(queue: Deque[Notification]) -> List[Notification]:
+        """Retira da fila o maior grupo que cabe em uma mensagem"""
+        batch = [queue.popleft()]
+        mentions = list(dict.fromkeys(batch[0].mentions))
+        embed_chars = len(batch[0].embed)
+        while queue and len(batch) < MAX_EMBEDS_PER_MESSAGE:
+            candidate = queue[0]
+            merged = list(dict.fromkeys(mentions + candidate.mentions))
+            if len(" ".join(f"<@{m}>" for m in merged)) > MAX_CONTENT_LENGTH:
+                break
+            if embed_chars + len(candidate.embed) > MAX_EMBED_CHARS:
+                break
+            batch.append(queue.popleft())
+            mentions = merged
+            embed_chars += len(candidate.embed)
+        return batch
+
+    async def _route_worker(self, route: Route):
+        queue = self._queues[route]
+        wakeup = self._wakeups[route]
+        while True:
+            if not queue:
+                if self._closing:
+                    return
+                wakeup.clear()
+                await wakeup.wait()
+                continue
+            batch = self._take_batch(queue)
+            await self._buckets[route].acquire()
+            await self._global_bucket.acquire()
+            await self._deliver(route, batch)
+
+    async def _destination(self, route: Route):
+        kind, target_id = route
+        if kind == 'channel':
+            # fetch_channel permite entregar também de um processo sem gateway (worker avulso)
+            return self.bot.get_channel(target_id) or await self.bot.fetch_channel(target_id)
+        return self.bot.get_user(target_id) or await self.bot.fetch_user(target_id)
+
+    async def _deliver(self, route: Route, batch: List[Notification]):
+        mentions = list(dict.fromkeys(m for n in batch for m in n.mentions))
+        content = mention_content(mentions)
+        embeds = [n.embed for n in batch]
+        for attempt in range(2):
+            try:
+                destination = await self._destination(route)
+                if destination is None:
+                    logging.error(f"Destino de notificação {route[0]} {route[1]} não encontrado!")
+                    break
+                # Rate limits (429) são aguardados pelo discord.py dentro do próprio bucket
+                await destination.send(content=content, embeds=embeds)
+                self._record_delivery(batch)
+                return
+            except discord.Forbidden as e:
+                # DMs fechadas ou sem permissão no canal: tentar de novo não adianta
+                logging.warning(f"Sem permissão para notificar {route[0]} {route[1]}: {e}")
+                break
+            except (discord.HTTPException, OSError) as e:
+                if attempt == 0:
+                    await asyncio.sleep(2)
+                    continue
+                logging.error(f"Erro ao entregar notificações para {route[0]} {route[1]}: {e}")
+        self.failed += len(batch)
+        self._resolve(batch, False)
+
+    @staticmethod
+    def _resolve(batch: List[Notification], delivered: bool):
+        for notification in batch:
+            if notification.result is not None and not notification.result.done():
+                notification.result.set_result(delivered)
+
+    def _record_delivery(self, batch: List[Notification]):
+        now = time.monotonic()
+        self.messages_sent += 1
+        for notification in batch:
+            latency_ms = (now - notification.enqueued_at) * 1000
+            self.delivered += 1
+            self.last_latency_ms = latency_ms
+            self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+            self._total_latency_ms += latency_ms
+        self._resolve(batch, True)
+
+    async def close(self, timeout: float = 10.0):
+        """Entrega o que estiver na fila (até `timeout`) e para os workers"""
+        self._closing = True
+        for wakeup in self._wakeups.values():
+            wakeup.set()
+        workers = [w for w in self._workers.values() if not w.done()]
+        if workers:
+            _, pending = await asyncio.wait(workers, timeout=timeout)
+            for worker in pending:
+                worker.cancel()
+            if pending:
+                # Continuam pendentes no outbox e serão entregues após o reinício
+                logging.warning(f"{self.queue_depth} notificações não entregues ao encerrar")
+                for queue in self._queues.values():
+                    self._resolve(list(queue), False)
+
+    def stats(self) -> dict:
+        """Métricas da fila de notificações"""
+        return {
+            'queue_depth': self.queue_depth,
+            'routes': len(self._queues),
+            'delivered': self.delivered,
+            'messages_sent': self.messages_sent,
+            'failed': self.failed,
+            'last_latency_ms': round(self.last_latency_ms, 1),
+            'avg_latency_ms': round(self._total_latency_ms / self.delivered, 1) if self.delivered else 0.0,
+            'max_latency_ms': round(self.max_latency_ms, 1),
+        }
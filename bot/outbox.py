@@ -0,0 +1,153 @@
+"""
+Worker de entrega do outbox de notificações.
+
+A detecção grava cada notificação na coleção `outbox` (com uma chave de
+idempotência no `_id`) antes de atualizar o estado do canal. Este worker
+reserva lotes de pendentes com lease, entrega pelo `NotificationDispatcher`
+e marca o resultado. Reinícios não perdem notificações (continuam pendentes)
+nem as repetem por redetecção (a chave já existe); uma notificação só pode ser
+reenviada se o processo cair entre o envio ao Discord e a confirmação.
+
+O bot roda um worker embutido (OUTBOX_WORKER_ENABLED). Para escalar a entrega
+separadamente, desative-o e rode um ou mais workers avulsos, que usam apenas
+a API REST do Discord (sem conexão ao gateway):
+
+    python -m bot.outbox
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from typing import List, Optional
+
+import discord
+
+from config.settings import (
+    DISCORD_TOKEN,
+    OUTBOX_BATCH_SIZE,
+    OUTBOX_LEASE_SECONDS,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_POLL_INTERVAL,
+)
+from db.database import db
+from .notifications import NotificationDispatcher, Route
+
+
+def outbox_key(platform: str, channel_id: str, item_id: str, route: Route) -> str:
+    """Chave de idempotência: mesma mudança para o mesmo destino gera sempre a mesma chave"""
+    return f"{platform}:{channel_id}:{item_id}:{route[0]}:{route[1]}"
+
+
+def outbox_entries(
+    dispatcher: NotificationDispatcher,
+    notification_channel_id: int,
+    platform: str,
+    channel_id: str,
+    item_id: str,
+    subscribers: List[str],
+    embed: discord.Embed,
+) -> List[dict]:
+    """Documentos do outbox de uma mudança detectada (um por destino)"""
+    return [
+        {
+            "_id": outbox_key(platform, channel_id, item_id, route),
+            "platform": platform,
+            "channel_id": channel_id,
+            "route": list(route),
+            "mentions": mentions,
+            "embed": embed.to_dict(),
+        }
+        for route, mentions in dispatcher.routes(notification_channel_id, subscribers)
+    ]
+
+
+class OutboxWorker:
+    """Drena o outbox em lotes, com lease para permitir vários workers em paralelo"""
+
+    def __init__(self, dispatcher: NotificationDispatcher, owner: Optional[str] = None):
+        self.dispatcher = dispatcher
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.delivered = 0
+        self.failed = 0
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logging.info(f"Worker do outbox iniciado ({self.owner})")
+
+    def wake(self):
+        """Chamado após gravar notificações novas, para não esperar o próximo ciclo"""
+        self._wakeup.set()
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                processed = await self.drain_once()
+            except Exception as e:
+                logging.error(f"Erro no worker do outbox: {str(e)}")
+                processed = 0
+            if processed < OUTBOX_BATCH_SIZE:
+                # Fila vazia (ou quase): espera novas notificações ou o próximo ciclo
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=OUTBOX_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def drain_once(self) -> int:
+        """Reserva, entrega e confirma um lote. Retorna quantas notificações processou."""
+        docs = await db.claim_outbox(self.owner, OUTBOX_BATCH_SIZE, OUTBOX_LEASE_SECONDS)
+        if not docs:
+            return 0
+        # Todas vão para o dispatcher de uma vez, para que ele agrupe por destino
+        results = await asyncio.gather(*(
+            self.dispatcher.submit(
+                tuple(doc["route"]), discord.Embed.from_dict(doc["embed"]), doc.get("mentions", [])
+            )
+            for doc in docs
+        ))
+        delivered = [doc["_id"] for doc, ok in zip(docs, results) if ok]
+        failed = [doc for doc, ok in zip(docs, results) if not ok]
+        await db.complete_outbox(self.owner, delivered)
+        await db.retry_outbox(self.owner, failed, OUTBOX_MAX_ATTEMPTS)
+        self.delivered += len(delivered)
+        self.failed += len(failed)
+        return len(docs)
+
+
+async def _main():
+    """Worker avulso: só REST do Discord, sem gateway, sem comandos"""
+    await db.connect()
+    client = discord.Client(intents=discord.Intents.none())
+    await client.login(DISCORD_TOKEN)
+    dispatcher = NotificationDispatcher(client)
+    worker = OutboxWorker(dispatcher)
+    worker.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await worker.close()
+        await dispatcher.close()
+        await client.close()
+        await db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] [%(levelname)s] %(message)s")
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,110 @@
+"""
+Expansão preguiçosa de playlists na fila de reprodução.
+
+Em vez de extrair a playlist inteira e empilhar milhares de entradas, o `!play`
+busca só a primeira página (PLAYLIST_PAGE_SIZE entradas) e coloca depois dela
+um `PlaylistCursor`, que guarda apenas a URL e a posição da próxima página.
+Quando o cursor se aproxima do início da fila, `materialize` o troca pela
+página seguinte (e por um novo cursor, se ainda houver entradas). A memória da
+fila não depende do tamanho da playlist.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from config.settings import PLAYLIST_PAGE_SIZE
+from .extraction import extraction_service, PRIORITY_PLAY
+
+
+async def fetch_playlist_page(
+    url: str, start: int, size: int = PLAYLIST_PAGE_SIZE, priority: int = PRIORITY_PLAY
+) -> Tuple[dict, List[str]]:
+    """Info da playlist e URLs das entradas `start`..`start + size - 1` (base 1)"""
+    info = await extraction_service.extract(
+        'probe', url, priority, options={'playlist_items': f'{start}-{start + size - 1}'}
+    )
+    if not info:
+        return {}, []
+    entries = [entry_url(entry) for entry in info.get('entries') or [] if entry]
+    return info, [url for url in entries if url]
+
+
+def entry_url(entry: dict) -> Optional[str]:
+    """URL estável de uma entrada: a página do vídeo, não o stream direto (que expira)"""
+    if entry.get('id') and entry.get('ie_key', 'Youtube') == 'Youtube':
+        return f"https://www.youtube.com/watch?v={entry['id']}"
+    return entry.get('webpage_url') or entry.get('url')
+
+
+def has_more(info: dict, start: int) -> bool:
+    """Há entradas depois da página iniciada em `start`?
+
+    Conta as entradas devolvidas pelo yt-dlp, não as URLs aproveitadas: um vídeo
+    removido ou privado na página não pode encerrar a playlist.
+    """
+    total = info.get('playlist_count')
+    if total:
+        return start + PLAYLIST_PAGE_SIZE - 1 < total
+    return len(info.get('entries') or []) == PLAYLIST_PAGE_SIZE
+
+
+@dataclass(eq=False)
+class PlaylistCursor:
+    """Restante de uma playlist ainda não buscado (comparado por identidade na fila)"""
+    url: str
+    preset_name: str
+    start: int  # índice (base 1) da próxima entrada
+    title: str = 'Playlist'
+    _task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    def fetch(self) -> asyncio.Task:
+        """Busca a próxima página uma única vez, mesmo com vários chamadores"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._fetch())
+        return self._task
+
+    async def _fetch(self) -> Tuple[List[Tuple[str, str]], Optional['PlaylistCursor']]:
+        info, urls = await fetch_playlist_page(self.url, self.start)
+        page = [(url, self.preset_name) for url in urls]
+        following = (
+            PlaylistCursor(self.url, self.preset_name, self.start + PLAYLIST_PAGE_SIZE, self.title)
+            if has_more(info, self.start)
+            else None
+        )
+        return page, following
+
+
+def page_with_cursor(
+    url: str, preset_name: str, info: dict, urls: List[str]
+) -> List:
+    """Entradas da primeira página seguidas do cursor para o restante, se houver"""
+    items = [(entry_url, preset_name) for entry_url in urls]
+    if has_more(info, 1):
+        items.append(PlaylistCursor(url, preset_name, PLAYLIST_PAGE_SIZE + 1, info.get('title', 'Playlist')))
+    return items
+
+
+async def materialize(queue: deque, window: int):
+    """Garante que as primeiras `window` posições da fila sejam músicas, não cursores"""
+    index = 0
+    while index < min(window, len(queue)):
+        cursor = queue[index]
+        if not isinstance(cursor, PlaylistCursor):
+            index += 1
+            continue
+        try:
+            page, following = await cursor.fetch()
+        except Exception as e:
+            logging.error(f"Erro ao buscar a próxima página da playlist {cursor.title}: {e}")
+            page, following = [], None
+        # A fila pode ter mudado durante a busca (limpa, reordenada ou já expandida)
+        position = next((i for i, item in enumerate(queue) if item is cursor), None)
+        if position is None:
+            return
+        del queue[position]
+        for offset, item in enumerate(page + ([following] if following else [])):
+            queue.insert(position + offset, item)
+        index = position
@@ -0,0 +1,139 @@
+"""
+Pré-carregamento das próximas músicas da fila de cada servidor.
+
+Enquanto uma música toca, as próximas PREFETCH_DEPTH entradas da fila são
+resolvidas em segundo plano (o resultado fica no cache de streams) e, perto do
+fim da música atual, a fonte FFmpeg da primeira delas é criada. Quando o `after`
+do `vc.play` dispara, `tocar_proxima_musica` recebe a fonte pronta em vez de
+extrair e abrir o stream do zero.
+
+Entradas que saem da janela (puladas, removidas, fila limpa ou reordenada) têm
+o pré-carregamento cancelado e a fonte descartada.
+"""
+
+import asyncio
+import itertools
+import logging
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import PREFETCH_DEPTH, PREFETCH_LEAD_SECONDS
+from .commands_utils import play_queue
+from .extraction import PRIORITY_PREFETCH
+from .utils import resolve_stream, stream_musica
+
+# Uma fonte criada há mais tempo que isso (ex.: música pausada) é recriada na hora
+SOURCE_MAX_AGE = 120
+
+QueueEntry = Tuple[str, str]  # (url, preset)
+
+
+@dataclass
+class PrefetchSlot:
+    entry: QueueEntry
+    head: bool  # primeira da fila: além de resolver, prepara a fonte FFmpeg
+    task: Optional[asyncio.Task] = None
+    prepared: Optional[tuple] = None  # (source, title, info), como stream_musica
+    prepared_at: float = 0.0
+
+    def discard(self):
+        if self.task and not self.task.done():
+            self.task.cancel()
+        if self.prepared:
+            self.prepared[0].cleanup()  # encerra o processo do ffmpeg
+            self.prepared = None
+
+
+class TrackPrefetcher:
+    """Mantém, por servidor, as próximas entradas da fila resolvidas e a seguinte pronta"""
+
+    def __init__(self, depth: int = PREFETCH_DEPTH, lead: float = PREFETCH_LEAD_SECONDS):
+        self.depth = depth
+        self.lead = lead
+        self._slots: Dict[int, List[PrefetchSlot]] = {}
+        self._ends_at: Dict[int, Optional[float]] = {}  # fim previsto da música atual (monotonic)
+        self.hits = 0
+        self.misses = 0
+
+    def track_started(self, guild_id: int, duration: Optional[float]):
+        """Chamado ao iniciar uma música; agenda o pré-carregamento das seguintes"""
+        self._ends_at[guild_id] = time.monotonic() + duration if duration else None
+        self.refresh(guild_id)
+
+    def refresh(self, guild_id: int):
+        """Alinha os slots com o início atual da fila (chamar após qualquer mudança nela)"""
+        if self.depth <= 0:
+            return
+        queue = play_queue.get(guild_id) or ()
+        # Para no primeiro cursor de playlist: ele é expandido antes de chegar ao início
+        wanted = list(itertools.takewhile(
+            lambda entry: isinstance(entry, tuple), itertools.islice(queue, self.depth)
+        ))
+        old = self._slots.get(guild_id, [])
+        slots = []
+        for position, entry in enumerate(wanted):
+            head = position == 0
+            reused = next((s for s in old if s.entry == entry and s.head == head), None)
+            if reused is not None:
+                old.remove(reused)
+                slots.append(reused)
+                continue
+            slot = PrefetchSlot(entry, head)
+            slot.task = asyncio.create_task(self._prepare(guild_id, slot))
+            slots.append(slot)
+        for slot in old:
+            slot.discard()
+        self._slots[guild_id] = slots
+
+    def take(self, guild_id: int, entry: QueueEntry) -> Optional[tuple]:
+        """Fonte pronta para a entrada que acabou de sair da fila, se houver"""
+        slots = self._slots.get(guild_id)
+        if slots and slots[0].head and slots[0].entry == entry:
+            slot = slots.pop(0)
+            if slot.prepared and time.monotonic() - slot.prepared_at <= SOURCE_MAX_AGE:
+                prepared, slot.prepared = slot.prepared, None
+                self.hits += 1
+                return prepared
+            slot.discard()
+        self.misses += 1
+        return None
+
+    def clear(self, guild_id: int):
+        """Descarta tudo do servidor (fila limpa ou bot desconectado)"""
+        for slot in self._slots.pop(guild_id, []):
+            slot.discard()
+        self._ends_at.pop(guild_id, None)
+
+    async def _prepare(self, guild_id: int, slot: PrefetchSlot):
+        url, preset_name = slot.entry
+        try:
+            # Resolver já basta para as demais: a extração fica no cache de streams
+            await resolve_stream(url, PRIORITY_PREFETCH)
+            ends_at = self._ends_at.get(guild_id)
+            if not slot.head or ends_at is None:
+                return
+            # Abrir o ffmpeg cedo demais deixaria a conexão ociosa durante a música inteira
+            await asyncio.sleep(max(0.0, ends_at - self.lead - time.monotonic()))
+            source, title, info = await stream_musica(url, preset_name, PRIORITY_PREFETCH)
+            if source:
+                slot.prepared = (source, title, info)
+                slot.prepared_at = time.monotonic()
+                logging.info(f"Próxima música pré-carregada: {title}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.warning(f"Falha ao pré-carregar {url}: {e}")
+
+    def stats(self) -> dict:
+        taken = self.hits + self.misses
+        return {
+            'guilds': len(self._slots),
+            'slots': sum(len(slots) for slots in self._slots.values()),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / taken, 3) if taken else 0.0,
+        }
+
+
+prefetcher = TrackPrefetcher()
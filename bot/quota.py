@@ -0,0 +1,230 @@
+"""
+Contabilidade de cota das APIs usadas pelo monitor de canais.
+
+- YouTube Data API: cota diária em unidades, zerada à meia-noite do horário
+  do Pacífico. Cada requisição é cobrada pelo custo do seu método.
+- Twitch Helix: bucket de pontos por minuto informado nos cabeçalhos
+  `Ratelimit-Limit`, `Ratelimit-Remaining` e `Ratelimit-Reset`.
+
+O ledger é compartilhado pelo processo inteiro (a cota é da chave de API, não
+de uma instância do monitor) e informa ao agendador quanto esticar os
+intervalos para que o orçamento restante dure até o próximo reset.
+
+O consumo do YouTube no dia é persistido pelo monitor (ver
+`ChannelMonitor.persist_quota`): um reinício no meio do dia retoma a contagem
+em vez de voltar a zero.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from config.settings import YOUTUBE_DAILY_QUOTA, YOUTUBE_QUOTA_RESERVE
+
+PACIFIC = ZoneInfo('America/Los_Angeles')
+
+# Custo em unidades por método da YouTube Data API (demais métodos de leitura custam 1)
+YOUTUBE_METHOD_COSTS = {
+    'youtube.search.list': 100,
+}
+# Só projeta o ritmo de consumo depois de um tempo mínimo de amostragem
+MIN_SAMPLE_SECONDS = 15 * 60
+# Abaixo dessa fração de pontos restantes, as verificações da Twitch desaceleram
+TWITCH_LOW_WATERMARK = 0.1
+
+
+def _next_pacific_midnight(now: datetime) -> datetime:
+    local = now.astimezone(PACIFIC)
+    return (local + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class QuotaLedger:
+    """Registra o consumo de cota do YouTube e o rate limit da Twitch"""
+
+    def __init__(self, youtube_daily_quota: int = YOUTUBE_DAILY_QUOTA, youtube_reserve: int = YOUTUBE_QUOTA_RESERVE):
+        self.youtube_daily_quota = youtube_daily_quota
+        self.youtube_reserve = youtube_reserve
+        # Cobranças acontecem nas threads do pool do monitor
+        self._lock = threading.Lock()
+        self._reset_period()
+
+        self.twitch_limit: Optional[int] = None
+        self.twitch_remaining: Optional[int] = None
+        self.twitch_reset_at: Optional[float] = None  # timestamp Unix
+        self.twitch_requests = 0
+
+    def _reset_period(self):
+        now = datetime.now(PACIFIC)
+        self.period_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        self.period_end = _next_pacific_midnight(now)
+        self.youtube_used = 0
+        self.youtube_calls = {}  # método -> quantidade de chamadas
+        self.youtube_exhausted = False
+        self._youtube_dirty = False  # consumo ainda não persistido
+
+    def _roll_period(self):
+        if datetime.now(PACIFIC) >= self.period_end:
+            logging.info(f"Cota do YouTube renovada ({self.youtube_used} unidades usadas no período anterior)")
+            self._reset_period()
+
+    @property
+    def period_key(self) -> str:
+        """Data (horário do Pacífico) do período de cota atual"""
+        return self.period_start.date().isoformat()
+
+    # --- YouTube ---
+
+    def charge_youtube(self, method_id: str):
+        """Cobra o custo de uma requisição (304 também consome cota)"""
+        cost = YOUTUBE_METHOD_COSTS.get(method_id, 1)
+        with self._lock:
+            self._roll_period()
+            self.youtube_used += cost
+            self.youtube_calls[method_id] = self.youtube_calls.get(method_id, 0) + 1
+            self._youtube_dirty = True
+
+    def mark_youtube_exhausted(self):
+        """A API respondeu quotaExceeded: nada mais será consultado até o reset"""
+        with self._lock:
+            self._roll_period()
+            if not self.youtube_exhausted:
+                logging.warning(
+                    f"Cota do YouTube esgotada; verificações suspensas até "
+                    f"{self.period_end.isoformat()}"
+                )
+            self.youtube_exhausted = True
+            self.youtube_used = max(self.youtube_used, self.youtube_daily_quota)
+            self._youtube_dirty = True
+
+    def restore_youtube(self, state: dict):
+        """Soma o consumo gravado antes de um reinício, se for do período atual.
+
+        Chamar uma única vez, antes da primeira persistência: o que já está em
+        memória foi cobrado depois do reinício e não está no estado gravado.
+        """
+        with self._lock:
+            self._roll_period()
+            if state.get('period') != self.period_key:
+                return
+            self.youtube_used += state.get('used', 0)
+            for method_id, count in state.get('calls', {}).items():
+                self.youtube_calls[method_id] = self.youtube_calls.get(method_id, 0) + count
+            self.youtube_exhausted = self.youtube_exhausted or state.get('exhausted', False)
+            self._youtube_dirty = True
+        logging.info(f"Consumo de cota do YouTube retomado: {self.youtube_used} unidades hoje")
+
+    def take_youtube_changes(self) -> Optional[dict]:
+        """Estado do período para persistir, se mudou desde a última chamada"""
+        with self._lock:
+            self._roll_period()
+            if not self._youtube_dirty:
+                return None
+            self._youtube_dirty = False
+            return {
+                'period': self.period_key,
+                'period_end': self.period_end,
+                'used': self.youtube_used,
+                'calls': dict(self.youtube_calls),
+                'exhausted': self.youtube_exhausted,
+            }
+
+    def mark_youtube_unsaved(self):
+        """A persistência falhou: tenta de novo na próxima chamada"""
+        with self._lock:
+            self._youtube_dirty = True
+
+    @property
+    def youtube_remaining(self) -> int:
+        with self._lock:
+            self._roll_period()
+            if self.youtube_exhausted:
+                return 0
+            return max(self.youtube_daily_quota - self.youtube_used, 0)
+
+    def youtube_available(self) -> bool:
+        """Há cota para verificações automáticas (descontada a reserva para comandos)?"""
+        return self.youtube_remaining > self.youtube_reserve
+
+    def seconds_until_youtube_reset(self) -> float:
+        return max((self.period_end - datetime.now(PACIFIC)).total_seconds(), 0.0)
+
+    def youtube_stretch(self) -> float:
+        """Fator (>= 1) para esticar intervalos de forma que a cota dure até o reset.
+
+        Projeta o ritmo médio de consumo do dia sobre o tempo que falta; se a
+        projeção ultrapassar a cota restante, os intervalos crescem na mesma
+        proporção. Sem cota disponível, retorna infinito.
+        """
+        if not self.youtube_available():
+            return float('inf')
+        now = datetime.now(PACIFIC)
+        elapsed = (now - self.period_start).total_seconds()
+        if elapsed < MIN_SAMPLE_SECONDS or not self.youtube_used:
+            return 1.0
+        rate = self.youtube_used / elapsed
+        projected = rate * self.seconds_until_youtube_reset()
+        budget = self.youtube_remaining - self.youtube_reserve
+        return max(projected / budget, 1.0)
+
+    # --- Twitch ---
+
+    def record_twitch_headers(self, headers):
+        """Lê os cabeçalhos de rate limit de uma resposta da API Helix"""
+        self.twitch_requests += 1
+        try:
+            if 'Ratelimit-Limit' in headers:
+                self.twitch_limit = int(headers['Ratelimit-Limit'])
+            if 'Ratelimit-Remaining' in headers:
+                self.twitch_remaining = int(headers['Ratelimit-Remaining'])
+            if 'Ratelimit-Reset' in headers:
+                self.twitch_reset_at = float(headers['Ratelimit-Reset'])
+        except (TypeError, ValueError):
+            logging.debug("Cabeçalhos de rate limit da Twitch inválidos")
+
+    def seconds_until_twitch_reset(self) -> float:
+        if self.twitch_reset_at is None:
+            return 0.0
+        return max(self.twitch_reset_at - time.time(), 0.0)
+
+    def twitch_stretch(self) -> float:
+        """Fator (>= 1) para esticar intervalos quando o bucket da Twitch está quase vazio"""
+        if not self.twitch_limit or self.twitch_remaining is None:
+            return 1.0
+        if self.seconds_until_twitch_reset() <= 0:
+            return 1.0  # o bucket já foi reabastecido
+        if self.twitch_remaining == 0:
+            return float('inf')
+        fraction = self.twitch_remaining / self.twitch_limit
+        if fraction >= TWITCH_LOW_WATERMARK:
+            return 1.0
+        return TWITCH_LOW_WATERMARK / fraction
+
+    def snapshot(self) -> dict:
+        """Estado atual da cota das duas APIs"""
+        remaining = self.youtube_remaining
+        return {
+            'youtube': {
+                'used': self.youtube_used,
+                'remaining': remaining,
+                'daily_quota': self.youtube_daily_quota,
+                'reserve': self.youtube_reserve,
+                'exhausted': self.youtube_exhausted,
+                'resets_in': round(self.seconds_until_youtube_reset()),
+                'stretch': round(self.youtube_stretch(), 2),
+                'calls': dict(self.youtube_calls),
+            },
+            'twitch': {
+                'limit': self.twitch_limit,
+                'remaining': self.twitch_remaining,
+                'resets_in': round(self.seconds_until_twitch_reset()),
+                'requests': self.twitch_requests,
+                'stretch': round(self.twitch_stretch(), 2),
+            },
+        }
+
+
+# Instância única: a cota pertence às credenciais, compartilhadas por todos os monitores
+quota_ledger = QuotaLedger()
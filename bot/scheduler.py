@@ -1,111 +1,382 @@
+import asyncio
+import heapq
 import logging
+import random
+import time
+from datetime import datetime, UTC
+from typing import Dict, List, Optional, Tuple
 import discord
 from discord.ext import tasks
 from config.settings import (
     NOTIFICATION_CHANNEL_ID,
     CHECK_YOUTUBE_INTERVAL,
-    CHECK_TWITCH_INTERVAL
+    CHECK_TWITCH_INTERVAL,
+    POLL_MIN_INTERVAL,
+    POLL_MAX_INTERVAL,
+    POLL_JITTER,
+    POLL_TICK_SECONDS,
+    TWITCH_MONITOR_MODE,
 )
 from db.database import db
+from db.models import MonitoredChannel
+from .eventsub import TwitchEventSub
 from .monitor import ChannelMonitor
+from .notifications import NotificationDispatcher
+from .outbox import OutboxWorker, outbox_entries
+
+# Intervalo base por plataforma, usado enquanto não há histórico suficiente
+BASE_INTERVALS = {
+    'youtube': CHECK_YOUTUBE_INTERVAL,
+    'twitch': CHECK_TWITCH_INTERVAL,
+}
+# Quantas verificações queremos, em média, entre dois uploads/lives do canal
+CHECKS_PER_GAP = 24
+# Uma mudança nesse período mantém o canal no intervalo base (ou menor)
+RECENT_CHANGE_WINDOW = 24 * 3600
+
+
+class ChannelSchedule:
+    """Fila de prioridade (heapq) com o próximo horário de verificação de cada canal.
+
+    Cada entrada é `(due_at, platform, channel_id, version)`; reagendar um canal
+    incrementa sua versão e as entradas antigas são descartadas ao sair do heap.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, str, str, int]] = []
+        self._versions: Dict[Tuple[str, str], int] = {}
+        self.intervals: Dict[Tuple[str, str], float] = {}  # último intervalo calculado
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    def _push(self, key: Tuple[str, str], due_at: float):
+        version = self._versions.get(key, 0) + 1
+        self._versions[key] = version
+        heapq.heappush(self._heap, (due_at, key[0], key[1], version))
+
+    def sync(self, keys, now: float):
+        """Adiciona canais novos (verificados já) e esquece os que foram removidos"""
+        keys = set(keys)
+        for key in keys - self._versions.keys():
+            self._push(key, now)
+        for key in self._versions.keys() - keys:
+            del self._versions[key]
+            self.intervals.pop(key, None)
+
+    def pop_due(self, now: float) -> List[Tuple[str, str]]:
+        """Remove do heap e retorna os canais cujo horário de verificação já chegou"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, platform, channel_id, version = heapq.heappop(self._heap)
+            key = (platform, channel_id)
+            if self._versions.get(key) == version:
+                due.append(key)
+        return due
+
+    def reschedule(self, key: Tuple[str, str], interval: float, now: float):
+        if key not in self._versions:
+            return
+        self.intervals[key] = interval
+        self._push(key, now + interval)
+
+    @staticmethod
+    def compute_interval(channel: MonitoredChannel, now: Optional[datetime] = None) -> float:
+        """Intervalo até a próxima verificação, a partir do histórico do canal.
+
+        - Sem histórico: intervalo base da plataforma.
+        - Com histórico: intervalo médio entre uploads/lives dividido por
+          CHECKS_PER_GAP (canais que postam pouco são consultados raramente).
+        - Mudança recente ou live em andamento: no máximo o intervalo base.
+        - Horário do dia: se as mudanças costumam acontecer perto da hora atual
+          (UTC), o intervalo encolhe proporcionalmente; fora dela, dobra.
+        - Limitado por POLL_MIN_INTERVAL/POLL_MAX_INTERVAL, com jitter.
+        """
+        now = now or datetime.now(UTC)
+        base = BASE_INTERVALS.get(channel.platform, CHECK_YOUTUBE_INTERVAL)
+        history = sorted(channel.change_history or [])
+
+        interval = base
+        if len(history) >= 2:
+            mean_gap = (history[-1] - history[0]).total_seconds() / (len(history) - 1)
+            interval = mean_gap / CHECKS_PER_GAP
+
+        recent = history and (now - history[-1]).total_seconds() < RECENT_CHANGE_WINDOW
+        if recent or channel.is_live:
+            interval = min(interval, base)
+
+        if len(history) >= 5:
+            # Fração das mudanças na hora atual ±1, comparada a uma distribuição uniforme
+            nearby = sum(1 for ts in history if (ts.hour - now.hour) % 24 in (0, 1, 23))
+            weight = (nearby / len(history)) / (3 / 24)
+            if weight > 1:
+                interval /= weight
+            elif nearby == 0:
+                interval *= 2
+
+        interval = min(max(interval, POLL_MIN_INTERVAL), POLL_MAX_INTERVAL)
+        return interval * random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER)
 
 
 class MonitorScheduler:
-    def __init__(self, bot):
+    def __init__(
+        self,
+        bot,
+        monitor: ChannelMonitor,
+        notifier: NotificationDispatcher,
+        outbox: Optional[OutboxWorker] = None,
+    ):
         self.bot = bot
-        self.monitor = ChannelMonitor()
-        self.youtube_task = None
-        self.twitch_task = None
+        self.monitor = monitor
+        # A varredura só grava as notificações no outbox; a entrega fica com o worker
+        self.notifier = notifier
+        self.outbox = outbox  # worker embutido (None quando a entrega roda em outro processo)
+        self.schedule = ChannelSchedule()
+        self.poll_task = None
+        # Modo push da Twitch; canais sem assinatura ativa continuam no polling
+        self.eventsub = (
+            TwitchEventSub(self.monitor, self._on_eventsub_update)
+            if TWITCH_MONITOR_MODE == 'eventsub'
+            else None
+        )
+        self._eventsub_sync_task = None
+        self._eventsub_retry_at = 0.0
 
     async def start(self):
-        """Inicializa o monitor e inicia as tasks de verificação"""
+        """Inicializa o monitor e inicia a agenda de verificação"""
         await self.monitor.initialize()
-        self.youtube_task = self.check_youtube_updates.start()
-        self.twitch_task = self.check_twitch_updates.start()
-        logging.info("Monitor inicializado e tarefas de verificação iniciadas")
+        if self.eventsub and not await self.eventsub.start():
+            self.eventsub = None
+        self.poll_task = self.poll_channels.start()
+        logging.info("Monitor inicializado e agenda de verificação iniciada")
 
     def stop(self):
         """Para todas as tasks de monitoramento"""
-        if self.youtube_task:
-            self.youtube_task.cancel()
-        if self.twitch_task:
-            self.twitch_task.cancel()
+        if self.poll_task:
+            self.poll_task.cancel()
         logging.info("Tarefas de monitoramento paradas")
 
-    @tasks.loop(seconds=CHECK_YOUTUBE_INTERVAL)
-    async def check_youtube_updates(self):
-        """Verifica atualizações dos canais do YouTube"""
+    async def close(self):
+        """Para as tasks e o receptor EventSub (o monitor compartilhado é fechado pelo bot)"""
+        self.stop()
+        if self.eventsub:
+            await self.eventsub.stop()
+
+    def _notifications_ready(self) -> bool:
+        """No modo de menções, o canal de notificações precisa existir"""
+        if self.notifier.mode == 'mention' and not self.bot.get_channel(NOTIFICATION_CHANNEL_ID):
+            logging.error(f"Canal de notificação {NOTIFICATION_CHANNEL_ID} não encontrado!")
+            return False
+        return True
+
+    def _notify(
+        self, channel: MonitoredChannel, item_id: str, embed: discord.Embed, notifications: List[dict]
+    ):
+        """Prepara as entradas do outbox de uma mudança (gravadas junto com o estado)"""
+        notifications.extend(outbox_entries(
+            self.notifier, NOTIFICATION_CHANNEL_ID, channel.platform,
+            channel.channel_id, item_id, channel.subscribers, embed,
+        ))
+
+    async def _record(self, notifications: List[dict], transitions: List[dict]):
+        """Grava outbox e estado dos canais e acorda o worker de entrega"""
+        if not notifications and not transitions:
+            return
+        recorded = await db.record_channel_changes(notifications, transitions)
+        # As ETags novas do YouTube só passam a valer depois que a mudança foi gravada
+        youtube_ids = [t['channel_id'] for t in transitions if t['platform'] == 'youtube']
+        if recorded:
+            self.monitor.confirm_youtube_updates(youtube_ids)
+            if notifications and self.outbox:
+                self.outbox.wake()
+            return
+        self.monitor.discard_youtube_updates(youtube_ids)
+        # Nada foi gravado de forma confiável: volta a consultar esses canais logo
+        now = time.time()
+        for transition in transitions:
+            self.schedule.reschedule(
+                (transition['platform'], transition['channel_id']), POLL_MIN_INTERVAL, now
+            )
+        logging.warning(
+            f"{len(transitions)} mudanças de estado não gravadas; canais reagendados para nova verificação"
+        )
+
+    @tasks.loop(seconds=POLL_TICK_SECONDS)
+    async def poll_channels(self):
+        """Verifica apenas os canais cujo horário na agenda já chegou"""
         if not self.bot.is_ready():
             return
 
-        notification_channel = self.bot.get_channel(NOTIFICATION_CHANNEL_ID)
-        if not notification_channel:
-            logging.error(f"Canal de notificação {NOTIFICATION_CHANNEL_ID} não encontrado!")
+        if not self._notifications_ready():
             return
 
         try:
-            profiles = await db.get_profiles_with_monitored_channels()
-            for profile in profiles:
-                youtube_channels = [c for c in profile.monitored_channels if c.platform == 'youtube']
-                for channel in youtube_channels:
-                    update = await self.monitor.check_youtube_updates(channel)
-                    if update:
-                        embed = discord.Embed(
-                            title=f"🎥 Novo vídeo em {channel.channel_name}!",
-                            description=update['title'],
-                            url=update['url'],
-                            color=0xff0000
-                        )
-                        embed.set_image(url=update['thumbnail'])
-                        await notification_channel.send(embed=embed)
-
-                        # Atualiza o último vídeo no banco
-                        await db.update_channel_last_video(
-                            profile.discord_id,
-                            channel.channel_id,
-                            update['video_id']
-                        )
+            # Cada canal aparece uma única vez na agenda, independentemente de subscribers
+            channels = {
+                (channel.platform, channel.channel_id): channel
+                for channel in await db.get_all_monitored_channels()
+            }
+            now = time.time()
+            self.schedule.sync(channels.keys(), now)
+            if self.eventsub:
+                self._sync_eventsub(
+                    [channel_id for platform, channel_id in channels if platform == 'twitch'], now
+                )
+            due = [channels[key] for key in self.schedule.pop_due(now)]
+            if not due:
+                return
+
+            youtube_due = [c for c in due if c.platform == 'youtube']
+            twitch_due = [c for c in due if c.platform == 'twitch']
+            # Notificações e mudanças de estado da varredura, gravadas juntas no final
+            notifications, transitions = [], []
+            try:
+                if youtube_due:
+                    await self.check_youtube_updates(youtube_due, notifications, transitions)
+                if twitch_due:
+                    await self.check_twitch_updates(twitch_due, notifications, transitions)
+            finally:
+                await self._record(notifications, transitions)
+                await self.monitor.persist_quota()
+            logging.debug(
+                f"Agenda: {len(youtube_due)} canais YouTube e {len(twitch_due)} Twitch "
+                f"verificados de {len(channels)}, {len(transitions)} mudanças de estado, "
+                f"{len(notifications)} notificações no outbox"
+            )
         except Exception as e:
-            logging.error(f"Erro ao verificar atualizações do YouTube: {str(e)}")
+            logging.error(f"Erro ao processar a agenda de monitoramento: {str(e)}")
 
-    @tasks.loop(seconds=CHECK_TWITCH_INTERVAL)
-    async def check_twitch_updates(self):
-        """Verifica atualizações dos canais da Twitch"""
-        if not self.bot.is_ready():
+    def _sync_eventsub(self, twitch_ids: List[str], now: float):
+        """Alinha as assinaturas EventSub em segundo plano (assinar aguarda a confirmação)"""
+        if self._eventsub_sync_task and not self._eventsub_sync_task.done():
             return
+        # Assinaturas que falharam são tentadas de novo de tempos em tempos
+        retry_failed = now >= self._eventsub_retry_at
+        if retry_failed:
+            self._eventsub_retry_at = now + POLL_MAX_INTERVAL
+        self._eventsub_sync_task = asyncio.create_task(
+            self.eventsub.sync(twitch_ids, retry_failed=retry_failed)
+        )
 
-        notification_channel = self.bot.get_channel(NOTIFICATION_CHANNEL_ID)
-        if not notification_channel:
-            logging.error(f"Canal de notificação {NOTIFICATION_CHANNEL_ID} não encontrado!")
-            return
+    def _reschedule(self, channel: MonitoredChannel):
+        interval = ChannelSchedule.compute_interval(channel)
+        if self.eventsub and self.eventsub.covers(channel.channel_id):
+            # Coberto por push: o polling vira só uma reconciliação ocasional
+            interval = max(interval, POLL_MAX_INTERVAL)
+        # Estica o intervalo para que a cota restante da API dure até o reset
+        quota = self.monitor.quota
+        if channel.platform == 'youtube':
+            stretch, reset_in = quota.youtube_stretch(), quota.seconds_until_youtube_reset()
+        else:
+            stretch, reset_in = quota.twitch_stretch(), quota.seconds_until_twitch_reset()
+        if stretch == float('inf'):
+            interval = max(interval, reset_in + POLL_TICK_SECONDS)
+        else:
+            interval *= stretch
+        self.schedule.reschedule(
+            (channel.platform, channel.channel_id), interval, time.time()
+        )
+
+    @staticmethod
+    def _transition(channel: MonitoredChannel, update: dict) -> dict:
+        """Mudança de estado a ser gravada em `monitored_channels`"""
+        return {
+            'platform': channel.platform,
+            'channel_id': channel.channel_id,
+            'type': update['type'],
+            'video_id': update.get('video_id'),
+            'stream_id': update.get('stream_id'),
+        }
+
+    async def check_youtube_updates(
+        self, channels: List[MonitoredChannel], notifications: List[dict], transitions: List[dict]
+    ):
+        """Verifica atualizações dos canais do YouTube"""
+        try:
+            updates = await self.monitor.check_youtube_batch(channels)
+            for channel in channels:
+                update = updates.get(channel.channel_id)
+                if update:
+                    embed = discord.Embed(
+                        title=f"🎥 Novo vídeo em {channel.channel_name}!",
+                        description=update['title'],
+                        url=update['url'],
+                        color=0xff0000
+                    )
+                    embed.set_image(url=update['thumbnail'])
+                    self._notify(channel, update['video_id'], embed, notifications)
+
+                    # O último vídeo é gravado no fim da varredura
+                    transitions.append(self._transition(channel, update))
+                    channel.change_history.append(datetime.now(UTC))
+        except Exception as e:
+            logging.error(f"Erro ao verificar atualizações do YouTube: {str(e)}")
+        finally:
+            for channel in channels:
+                self._reschedule(channel)
 
+    async def check_twitch_updates(
+        self, channels: List[MonitoredChannel], notifications: List[dict], transitions: List[dict]
+    ):
+        """Verifica atualizações dos canais da Twitch"""
         try:
-            profiles = await db.get_profiles_with_monitored_channels()
-            for profile in profiles:
-                twitch_channels = [c for c in profile.monitored_channels if c.platform == 'twitch']
-                for channel in twitch_channels:
-                    update = await self.monitor.check_twitch_updates(channel)
-                    if update:
-                        embed = discord.Embed(
-                            title=f"🔴 {channel.channel_name} está AO VIVO!",
-                            description=update['title'],
-                            url=update['url'],
-                            color=0x6441a5
-                        )
-                        embed.set_image(url=update['thumbnail'])
-                        await notification_channel.send(embed=embed)
-
-                        # Atualiza o status da live no banco
-                        await db.update_channel_stream_status(
-                            profile.discord_id,
-                            channel.channel_id,
-                            update['stream_id']
-                        )
+            # Os canais devidos são resolvidos em ceil(n/100) chamadas à API
+            updates = await self.monitor.check_twitch_batch(channels)
+            for channel in channels:
+                update = updates.get(channel.channel_id)
+                if update:
+                    self._apply_twitch_update(channel, update, notifications, transitions)
         except Exception as e:
             logging.error(f"Erro ao verificar atualizações da Twitch: {str(e)}")
+        finally:
+            for channel in channels:
+                self._reschedule(channel)
+
+    def _apply_twitch_update(
+        self,
+        channel: MonitoredChannel,
+        update: dict,
+        notifications: List[dict],
+        transitions: List[dict],
+    ):
+        """Notifica o início de uma live e registra o novo status do canal"""
+        if update['type'] == 'live':
+            embed = discord.Embed(
+                title=f"🔴 {channel.channel_name} está AO VIVO!",
+                description=update['title'],
+                url=update['url'],
+                color=0x6441a5
+            )
+            if update['thumbnail']:
+                embed.set_image(url=update['thumbnail'])
+            self._notify(channel, update['stream_id'], embed, notifications)
+            channel.change_history.append(datetime.now(UTC))
+
+        # Status da live (inclusive quando a live termina), gravado pelo chamador
+        transitions.append(self._transition(channel, update))
+        channel.is_live = update['type'] == 'live'
+
+    async def _on_eventsub_update(self, channel_id: str, update: dict):
+        """Evento push da Twitch (stream.online/stream.offline)"""
+        if not self._notifications_ready():
+            return
+        channel = await db.get_monitored_channel('twitch', channel_id)
+        if not channel:
+            return
+        # Mesma deduplicação do polling: a reconciliação pode ter visto a mudança antes
+        if update['type'] == 'live' and channel.is_live and update['stream_id'] == channel.last_stream_id:
+            return
+        if update['type'] == 'offline' and not channel.is_live:
+            return
+        notifications, transitions = [], []
+        try:
+            self._apply_twitch_update(channel, update, notifications, transitions)
+        except Exception as e:
+            logging.error(f"Erro ao processar evento EventSub da Twitch: {str(e)}")
+        finally:
+            await self._record(notifications, transitions)
 
-    @check_youtube_updates.before_loop
-    @check_twitch_updates.before_loop
+    @poll_channels.before_loop
     async def before_check(self):
         """Aguarda o bot estar pronto antes de iniciar as verificações"""
         await self.bot.wait_until_ready()
@@ -1,10 +1,19 @@
 import re
+import time
 import urllib.parse
 import logging
 import discord
-import asyncio
-import yt_dlp
-from config.settings import EQUALIZER_PRESETS
+from typing import Optional
+from config.settings import EQUALIZER_PRESETS, OPUS_PASSTHROUGH, STREAM_CACHE_SIZE, STREAM_CACHE_MARGIN
+from db.cache import LRUCache
+from .extraction import extraction_service, PRIORITY_PLAY
+
+# ID do vídeo -> URL direta do áudio, formato e título (expira junto com a URL do googlevideo)
+stream_cache = LRUCache(STREAM_CACHE_SIZE)
+
+# Campos do info do yt-dlp mantidos no cache (o dict completo tem centenas de KB)
+STREAM_INFO_FIELDS = ('id', 'title', 'webpage_url', 'duration', 'uploader', 'related_videos')
+VIDEO_ID_REGEX = re.compile(r'^[A-Za-z0-9_-]{11}$')
 
 def clean_youtube_url(url: str) -> str:
     """Remove parâmetros desnecessários da URL do YouTube."""
@@ -32,34 +41,95 @@ def is_youtube_url(url: str) -> bool:
         return False
     return True
 
-async def stream_musica(url: str, preset_name: str = "padrao"):
-    """Extrai o stream de áudio direto de uma URL do YouTube."""
+def youtube_video_id(url: str) -> Optional[str]:
+    """ID canônico do vídeo (watch?v=, youtu.be/, shorts/, embed/, live/ ou o próprio ID)."""
+    if VIDEO_ID_REGEX.match(url):
+        return url
+    parsed_url = urllib.parse.urlparse(url if '://' in url else f'https://{url}')
+    host = parsed_url.netloc.lower()
+    if host.endswith('youtu.be'):
+        candidate = parsed_url.path.lstrip('/').split('/')[0]
+    else:
+        candidate = urllib.parse.parse_qs(parsed_url.query).get('v', [''])[0]
+        if not candidate:
+            parts = parsed_url.path.strip('/').split('/')
+            if len(parts) >= 2 and parts[0] in ('shorts', 'embed', 'live', 'v'):
+                candidate = parts[1]
+    return candidate if VIDEO_ID_REGEX.match(candidate or '') else None
+
+def stream_expiry(url_audio: str) -> Optional[float]:
+    """Timestamp Unix do parâmetro `expire=` de uma URL do googlevideo (query ou caminho)."""
+    parsed_url = urllib.parse.urlparse(url_audio)
+    expire = urllib.parse.parse_qs(parsed_url.query).get('expire', [None])[0]
+    if expire is None:
+        match = re.search(r'/expire/(\d+)', parsed_url.path)
+        expire = match.group(1) if match else None
     try:
-        ydl_opts = {
-            'format': 'bestaudio/best',
-            'quiet': True,
-            'ignoreerrors': True,
-            'no_check_certificate': True,
-            'extract_flat': 'auto'
-        }
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = await asyncio.to_thread(ydl.extract_info, url, download=False)
+        return float(expire) if expire is not None else None
+    except ValueError:
+        return None
+
+def cache_stream(url: str, info: dict) -> Optional[dict]:
+    """Guarda no cache o stream de um info já extraído (formato `bestaudio/best`)."""
+    if not info or 'url' not in info:
+        return None
+    video_id = info.get('id') or youtube_video_id(url)
+    expires_at = stream_expiry(info['url'])
+    if not video_id or expires_at is None:
+        return None
+    entry = {
+        'url': info['url'],
+        'format_id': info.get('format_id'),
+        'acodec': info.get('acodec'),
+        'ext': info.get('ext'),
+        'title': info.get('title', 'Desconhecido'),
+        'info': {field: info[field] for field in STREAM_INFO_FIELDS if field in info},
+    }
+    # A folga garante que o ffmpeg ainda consiga (re)conectar durante a música
+    expires_at -= STREAM_CACHE_MARGIN + (info.get('duration') or 0)
+    if expires_at > time.time():
+        stream_cache.put(video_id, entry, expires_at=expires_at)
+    return entry
 
-            if not info or 'url' not in info:
-                logging.error(f'Falha ao obter URL de stream para {url}.')
-                return None, None, None
+async def resolve_stream(url: str, priority: int = PRIORITY_PLAY) -> Optional[dict]:
+    """URL direta do áudio de um vídeo, do cache quando possível."""
+    video_id = youtube_video_id(url)
+    if video_id:
+        entry = stream_cache.get(video_id)
+        if entry is not None:
+            logging.info(f"Stream de {video_id} obtido do cache (taxa de acerto {stream_cache.stats()['hit_rate']:.0%}).")
+            return entry
 
-            url_audio = info['url']
-            title = info.get('title', 'Desconhecido')
-            equalizer_args = EQUALIZER_PRESETS.get(preset_name, '')
-            ffmpeg_options = {
-                'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5',
-                'options': f'{equalizer_args} -loglevel warning'
-            }
+    info = await extraction_service.extract('stream', url, priority)
+    if not info or 'url' not in info:
+        return None
+    return cache_stream(url, info)
+
+async def stream_musica(url: str, preset_name: str = "padrao", priority: int = PRIORITY_PLAY):
+    """Extrai o stream de áudio direto de uma URL do YouTube."""
+    try:
+        stream = await resolve_stream(url, priority)
+        if not stream:
+            logging.error(f'Falha ao obter URL de stream para {url}.')
+            return None, None, None
+
+        url_audio = stream['url']
+        title = stream['title']
+        equalizer_args = EQUALIZER_PRESETS.get(preset_name, '')
+        ffmpeg_options = {
+            'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5',
+            'options': f'{equalizer_args} -loglevel warning'
+        }
 
+        if OPUS_PASSTHROUGH and not equalizer_args and stream.get('acodec') == 'opus':
+            # Sem filtro e já em Opus: o ffmpeg só remuxa para Ogg, sem decodificar para PCM
+            # nem recodificar no libopus do bot
+            source = discord.FFmpegOpusAudio(url_audio, codec='copy', **ffmpeg_options)
+            logging.info("Fonte FFmpeg (Opus repassado) criada com sucesso.")
+        else:
             source = discord.FFmpegPCMAudio(url_audio, **ffmpeg_options)
             logging.info("Fonte FFmpeg criada com sucesso.")
-            return source, title, info
+        return source, title, stream['info']
     except Exception as e:
         logging.error(f'Erro ao extrair stream da URL {url}: {e}')
         return None, None, None
@@ -14,18 +14,67 @@ NOTIFICATION_CHANNEL_ID = int(os.getenv('NOTIFICATION_CHANNEL_ID', 0))
 # MongoDB configs
 MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017')
 DATABASE_NAME = os.getenv('DATABASE_NAME', 'noobsquad_bot')
+# Driver do MongoDB: 'async' (cliente assíncrono nativo) ou 'thread' (driver síncrono em pool de threads)
+MONGODB_DRIVER = os.getenv('MONGODB_DRIVER', 'async').lower()
+MONGODB_OFFLOAD_WORKERS = int(os.getenv('MONGODB_OFFLOAD_WORKERS', 4))
+
+# Escrita em lote das sessões de atividade
+ACTIVITY_FLUSH_INTERVAL = float(os.getenv('ACTIVITY_FLUSH_INTERVAL', 5))  # segundos
+ACTIVITY_FLUSH_BATCH_SIZE = int(os.getenv('ACTIVITY_FLUSH_BATCH_SIZE', 500))
+# Quantidade máxima de atividades mantidas no cache LRU em memória
+ACTIVITY_CACHE_SIZE = int(os.getenv('ACTIVITY_CACHE_SIZE', 2048))
 
 # YouTube API
 YOUTUBE_API_KEY = os.getenv('YOUTUBE_API_KEY')
+# Cota diária (unidades, renovada à meia-noite do Pacífico) e quanto reservar para comandos
+YOUTUBE_DAILY_QUOTA = int(os.getenv('YOUTUBE_DAILY_QUOTA', 10000))
+YOUTUBE_QUOTA_RESERVE = int(os.getenv('YOUTUBE_QUOTA_RESERVE', 500))
+# Cache de resolução handle/usuário/URL -> canal (TTL em segundos e entradas em memória)
+YOUTUBE_RESOLUTION_TTL = int(os.getenv('YOUTUBE_RESOLUTION_TTL', 7 * 24 * 3600))  # 7 dias
+YOUTUBE_RESOLUTION_CACHE_SIZE = int(os.getenv('YOUTUBE_RESOLUTION_CACHE_SIZE', 1024))
+
+# Entrega das notificações: mention (menciona os subscribers no canal) ou dm (mensagem direta)
+NOTIFICATION_MODE = os.getenv('NOTIFICATION_MODE', 'mention').lower()
+# Envios por destino (canal/DM) a cada período, abaixo do limite do Discord
+NOTIFICATION_ROUTE_RATE = int(os.getenv('NOTIFICATION_ROUTE_RATE', 5))
+NOTIFICATION_ROUTE_PERIOD = float(os.getenv('NOTIFICATION_ROUTE_PERIOD', 5))  # segundos
+
+# Outbox de notificações (entrega durável)
+OUTBOX_WORKER_ENABLED = os.getenv('OUTBOX_WORKER_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 50))
+OUTBOX_LEASE_SECONDS = int(os.getenv('OUTBOX_LEASE_SECONDS', 120))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 5))
+OUTBOX_POLL_INTERVAL = float(os.getenv('OUTBOX_POLL_INTERVAL', 2))  # segundos
+OUTBOX_RETENTION = int(os.getenv('OUTBOX_RETENTION', 7 * 24 * 3600))  # entregues/falhas: 7 dias
 
 # Twitch API
 TWITCH_CLIENT_ID = os.getenv('TWITCH_CLIENT_ID')
 TWITCH_CLIENT_SECRET = os.getenv('TWITCH_CLIENT_SECRET')
+# Renova o token de app da Twitch quando faltar menos que isso para expirar (segundos)
+TWITCH_TOKEN_REFRESH_MARGIN = int(os.getenv('TWITCH_TOKEN_REFRESH_MARGIN', 600))
+# Modo de monitoramento da Twitch: polling (padrão) ou eventsub (webhook, notificações push)
+TWITCH_MONITOR_MODE = os.getenv('TWITCH_MONITOR_MODE', 'polling').lower()
+TWITCH_EVENTSUB_CALLBACK_URL = os.getenv('TWITCH_EVENTSUB_CALLBACK_URL')  # URL HTTPS pública
+TWITCH_EVENTSUB_PORT = int(os.getenv('TWITCH_EVENTSUB_PORT', 8080))
+TWITCH_EVENTSUB_SECRET = os.getenv('TWITCH_EVENTSUB_SECRET')  # aleatório se vazio
+# Servidor alternativo de assinaturas (twitch-cli ou bot/eventsub_fake.py)
+TWITCH_EVENTSUB_SUBSCRIPTION_URL = os.getenv('TWITCH_EVENTSUB_SUBSCRIPTION_URL') or None
 
 # Monitor intervals (em segundos)
 CHECK_YOUTUBE_INTERVAL = int(os.getenv('CHECK_YOUTUBE_INTERVAL', 300))  # 5 minutos
 CHECK_TWITCH_INTERVAL = int(os.getenv('CHECK_TWITCH_INTERVAL', 180))   # 3 minutos
 
+# Agenda adaptativa: cada canal tem seu próprio intervalo, derivado do histórico
+# de uploads/lives e limitado por POLL_MIN_INTERVAL e POLL_MAX_INTERVAL
+POLL_MIN_INTERVAL = int(os.getenv('POLL_MIN_INTERVAL', 60))      # 1 minuto
+POLL_MAX_INTERVAL = int(os.getenv('POLL_MAX_INTERVAL', 3600))    # 1 hora
+POLL_JITTER = float(os.getenv('POLL_JITTER', 0.15))              # ±15% do intervalo
+POLL_TICK_SECONDS = int(os.getenv('POLL_TICK_SECONDS', 15))      # resolução da agenda
+
+# Verificações de canais em paralelo e threads para as chamadas bloqueantes do googleapiclient
+MONITOR_MAX_CONCURRENCY = int(os.getenv('MONITOR_MAX_CONCURRENCY', 8))
+MONITOR_API_THREADS = int(os.getenv('MONITOR_API_THREADS', 8))
+
 # Sync de membros - Horário de execução (formato HH:MM em UTC)
 SYNC_MEMBERS_TIME = os.getenv('SYNC_MEMBERS_TIME', '03:00')  # Padrão: 03:00 UTC
 
@@ -39,9 +88,31 @@ def parse_sync_time(time_str: str) -> tuple[int, int]:
         return 3, 0
 
 SYNC_MEMBERS_HOUR, SYNC_MEMBERS_MINUTE = parse_sync_time(SYNC_MEMBERS_TIME)
+# Quantidade de membros gravados por bulk_write durante a sincronização
+SYNC_MEMBERS_CHUNK_SIZE = int(os.getenv('SYNC_MEMBERS_CHUNK_SIZE', 1000))
+
+# Cache de URLs de stream do yt-dlp (entradas em memória e folga antes do `expire=` da URL)
+STREAM_CACHE_SIZE = int(os.getenv('STREAM_CACHE_SIZE', 256))
+STREAM_CACHE_MARGIN = int(os.getenv('STREAM_CACHE_MARGIN', 600))  # segundos
+
+# Processos do yt-dlp (extração fora do event loop e do GIL do bot) e timeout por requisição
+EXTRACTION_WORKERS = int(os.getenv('EXTRACTION_WORKERS', min(4, os.cpu_count() or 1)))
+EXTRACTION_TIMEOUT = float(os.getenv('EXTRACTION_TIMEOUT', 30))  # segundos
+
+# Playlists entram na fila em páginas, buscadas conforme a fila anda
+PLAYLIST_PAGE_SIZE = int(os.getenv('PLAYLIST_PAGE_SIZE', 50))
+
+# Pré-carregamento: próximas entradas da fila resolvidas em segundo plano e quantos
+# segundos antes do fim da música atual a fonte FFmpeg da seguinte é aberta
+PREFETCH_DEPTH = int(os.getenv('PREFETCH_DEPTH', 2))
+PREFETCH_LEAD_SECONDS = int(os.getenv('PREFETCH_LEAD_SECONDS', 20))
+
+# Repassa o áudio Opus do YouTube sem recodificar quando nenhum filtro de equalização se aplica
+OPUS_PASSTHROUGH = os.getenv('OPUS_PASSTHROUGH', 'true').lower() in ('1', 'true', 'yes')
 
-# Equalizer presets
+# Equalizer presets ("original" não aplica filtro e permite o repasse direto do Opus)
 EQUALIZER_PRESETS = {
+    "original": '',
     "padrao": '-filter_complex "equalizer=f=5000:g=2:w=1,equalizer=f=8000:g=2:w=1"',
     "pop": '-filter_complex "equalizer=f=80:g=4:w=1:t=h,equalizer=f=8000:g=4:w=1:t=h"',
     "rock": '-filter_complex "equalizer=f=120:g=-2:w=1:t=h,equalizer=f=2000:g=3:w=1:t=h,equalizer=f=5000:g=4:w=1:t=h"',
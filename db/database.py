@@ -1,7 +1,24 @@
-from pymongo import MongoClient
-from datetime import datetime, UTC
+from pymongo import AsyncMongoClient, MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime, timedelta, UTC
 import logging
-from config.settings import MONGODB_URI, DATABASE_NAME
+from config.settings import (
+    MONGODB_URI,
+    DATABASE_NAME,
+    MONGODB_DRIVER,
+    MONGODB_OFFLOAD_WORKERS,
+    ACTIVITY_FLUSH_BATCH_SIZE,
+    ACTIVITY_FLUSH_INTERVAL,
+    ACTIVITY_CACHE_SIZE,
+    SYNC_MEMBERS_CHUNK_SIZE,
+    YOUTUBE_RESOLUTION_TTL,
+    YOUTUBE_RESOLUTION_CACHE_SIZE,
+    OUTBOX_RETENTION,
+)
+from .cache import LRUCache
+from .offload import OffloadedClient
+from .session_writer import ActivitySessionWriter
+from .session_registry import OpenSessionRegistry
 from .models import (
     UserProfile,
     Song,
@@ -10,7 +27,26 @@ from .models import (
     Activity,
     ActivityHistory,
 )
-from typing import List, Optional
+from itertools import islice
+from typing import Iterable, List, Optional
+
+
+# Campos dos canais monitorados usados pelo scheduler (sem _id / added_at)
+MONITORED_CHANNEL_FIELDS = {
+    "_id": 0,
+    "platform": 1,
+    "channel_id": 1,
+    "channel_name": 1,
+    "added_by": 1,
+    "last_video_id": 1,
+    "last_stream_id": 1,
+    "is_live": 1,
+    "subscribers": 1,
+    "change_history": 1,
+}
+
+# Quantos horários de upload/início de live são mantidos por canal
+CHANNEL_HISTORY_SIZE = 20
 
 
 class Database:
@@ -21,28 +57,73 @@ class Database:
         self.monitored_channels = None  # Nova coleção para canais monitorados
         self.activities = None
         self.activity_history = None
-
-    def connect(self):
-        """Estabelece conexão com o MongoDB"""
+        self.activity_rollups = None  # Totais materializados por (usuário, atividade)
+        self.youtube_resolutions = None  # handle/usuário/ID -> canal do YouTube (com TTL)
+        self.outbox = None  # Notificações pendentes de entrega (chave de idempotência no _id)
+        self.api_quota = None  # Consumo diário de cota das APIs (sobrevive a reinícios)
+        self.session_writer = None  # Escrita em lote das sessões de atividade
+        self.open_sessions = OpenSessionRegistry()  # Sessões abertas em memória
+        # Atividades conhecidas, indexadas pelo nome normalizado
+        self._activity_cache = LRUCache(ACTIVITY_CACHE_SIZE)
+        # Resoluções de canais do YouTube mais usadas, na frente da coleção persistente
+        self._resolution_cache = LRUCache(YOUTUBE_RESOLUTION_CACHE_SIZE)
+
+    def _collection(self, name: str):
+        """Retorna a coleção no formato aguardável do driver configurado"""
+        if isinstance(self.client, OffloadedClient):
+            return self.client.collection(DATABASE_NAME, name)
+        return self.db[name]
+
+    async def connect(self):
+        """Estabelece conexão com o MongoDB
+
+        Por padrão usa o cliente assíncrono nativo do PyMongo. Com
+        `MONGODB_DRIVER=thread` usa o driver síncrono com as chamadas
+        executadas em um pool de threads dedicado.
+        """
         try:
-            self.client = MongoClient(MONGODB_URI)
-            self.db = self.client[DATABASE_NAME]
+            if MONGODB_DRIVER == "thread":
+                self.client = OffloadedClient(
+                    MongoClient(MONGODB_URI, tz_aware=True),
+                    max_workers=MONGODB_OFFLOAD_WORKERS,
+                )
+            else:
+                self.client = AsyncMongoClient(MONGODB_URI, tz_aware=True)
+                self.db = self.client[DATABASE_NAME]
             # Inicializa as coleções
-            self.user_profiles = self.db.user_profiles
-            self.monitored_channels = self.db.monitored_channels
-            self.activities = self.db.activities
-            self.activity_history = self.db.activity_history
+            self.user_profiles = self._collection("user_profiles")
+            self.monitored_channels = self._collection("monitored_channels")
+            self.activities = self._collection("activities")
+            self.activity_history = self._collection("activity_history")
+            self.activity_rollups = self._collection("activity_rollups")
+            self.youtube_resolutions = self._collection("youtube_resolutions")
+            self.outbox = self._collection("outbox")
+            self.api_quota = self._collection("api_quota")
+            self.session_writer = ActivitySessionWriter(
+                self.activity_history,
+                self.user_profiles,
+                self.activity_rollups,
+                self.activities,
+                batch_size=ACTIVITY_FLUSH_BATCH_SIZE,
+                flush_interval=ACTIVITY_FLUSH_INTERVAL,
+            )
             # Testa a conexão
-            self.client.server_info()
-            logging.info("Conexão com MongoDB estabelecida com sucesso!")
+            await self.client.server_info()
+            self.session_writer.start()
+            logging.info(
+                f"Conexão com MongoDB estabelecida com sucesso! (driver: {MONGODB_DRIVER})"
+            )
         except Exception as e:
             logging.error(f"Erro ao conectar ao MongoDB: {str(e)}")
             raise e
 
-    def close(self):
-        """Fecha a conexão com o MongoDB"""
+    async def close(self):
+        """Grava as sessões pendentes e fecha a conexão com o MongoDB"""
+        if self.session_writer:
+            await self.session_writer.close()
         if self.client:
-            self.client.close()
+            await self.client.close()
+            self.client = None
             logging.info("Conexão com MongoDB fechada.")
 
     async def create_user_profile(
@@ -57,7 +138,7 @@ class Database:
                 display_name=display_name or username,
             )
 
-            result = self.db.user_profiles.update_one(
+            result = await self.user_profiles.update_one(
                 {"discord_id": discord_id},
                 {"$setOnInsert": profile.to_dict()},
                 upsert=True,
@@ -75,7 +156,7 @@ class Database:
         """Adiciona ou atualiza uma preferência musical"""
         try:
             now = datetime.now(UTC)
-            result = self.db.user_profiles.update_one(
+            result = await self.user_profiles.update_one(
                 {
                     "discord_id": discord_id,
                     "music_preferences": {
@@ -96,7 +177,7 @@ class Database:
 
             if result.modified_count == 0:
                 # Preferência já existe, incrementa o contador
-                self.db.user_profiles.update_one(
+                await self.user_profiles.update_one(
                     {
                         "discord_id": discord_id,
                         "music_preferences.name": name,
@@ -128,7 +209,7 @@ class Database:
             )
 
             # Adiciona ao histórico
-            result = self.db.user_profiles.update_one(
+            result = await self.user_profiles.update_one(
                 {"discord_id": discord_id},
                 {
                     "$push": {
@@ -173,7 +254,7 @@ class Database:
     async def get_user_profile(self, discord_id: str) -> UserProfile:
         """Recupera o perfil do usuário"""
         try:
-            data = self.db.user_profiles.find_one({"discord_id": discord_id})
+            data = await self.user_profiles.find_one({"discord_id": discord_id})
             if data:
                 return UserProfile.from_dict(data)
             return None
@@ -191,7 +272,7 @@ class Database:
         """
         try:
             # Tenta encontrar um documento existente pelo platform+channel_id
-            existing = self.monitored_channels.find_one(
+            existing = await self.monitored_channels.find_one(
                 {"platform": channel.platform, "channel_id": channel.channel_id}
             )
 
@@ -200,7 +281,7 @@ class Database:
                 if str(discord_id) in existing.get("subscribers", []):
                     return False
                 # Adiciona o subscriber ao documento do canal
-                result = self.monitored_channels.update_one(
+                result = await self.monitored_channels.update_one(
                     {"_id": existing["_id"]},
                     {"$addToSet": {"subscribers": str(discord_id)}},
                 )
@@ -208,7 +289,7 @@ class Database:
 
             # Cria novo documento de canal
             channel.subscribers = [str(discord_id)]
-            result = self.monitored_channels.insert_one(channel.to_dict())
+            result = await self.monitored_channels.insert_one(channel.to_dict())
             return result.acknowledged
         except Exception as e:
             logging.error(f"Erro ao adicionar canal monitorado: {str(e)}")
@@ -224,7 +305,7 @@ class Database:
         """
         try:
             # Tenta encontrar o canal pelo platform e channel_name
-            doc = self.monitored_channels.find_one(
+            doc = await self.monitored_channels.find_one(
                 {"platform": platform, "channel_name": channel_name}
             )
             if not doc:
@@ -236,136 +317,358 @@ class Database:
 
             # Se há mais de um subscriber, apenas remove o usuário
             if len(doc.get("subscribers", [])) > 1:
-                result = self.monitored_channels.update_one(
+                result = await self.monitored_channels.update_one(
                     {"_id": doc["_id"]}, {"$pull": {"subscribers": str(discord_id)}}
                 )
                 return result.modified_count > 0
 
             # Caso contrário, remove o documento do canal por completo
-            result = self.monitored_channels.delete_one({"_id": doc["_id"]})
+            result = await self.monitored_channels.delete_one({"_id": doc["_id"]})
             return result.deleted_count > 0
         except Exception as e:
             logging.error(f"Erro ao remover canal monitorado: {str(e)}")
             return False
 
-    async def update_channel_last_video(
-        self, discord_id: str, channel_id: str, video_id: str
-    ) -> bool:
-        """Atualiza o ID do último vídeo de um canal do YouTube (baseado na coleção de canais monitorados)"""
+    @staticmethod
+    def _channel_transition_op(transition: dict) -> UpdateOne:
+        """Operação que grava uma mudança de estado de canal.
+
+        `transition` tem `platform`, `channel_id`, `type` ('video', 'live' ou
+        'offline') e `video_id`/`stream_id`. Uploads e inícios de live também
+        entram no `change_history` usado pela agenda adaptativa.
+        """
+        history = {
+            "change_history": {
+                "$each": [datetime.now(UTC)],
+                "$slice": -CHANNEL_HISTORY_SIZE,
+            }
+        }
+        if transition["type"] == "video":
+            update = {"$set": {"last_video_id": transition["video_id"]}, "$push": history}
+        elif transition["type"] == "live":
+            update = {
+                "$set": {"last_stream_id": transition["stream_id"], "is_live": True},
+                "$push": history,
+            }
+        else:
+            # Ao encerrar a live mantém o último ID para evitar renotificação
+            update = {"$set": {"is_live": False}}
+        return UpdateOne(
+            {"platform": transition["platform"], "channel_id": transition["channel_id"]},
+            update,
+        )
+
+    async def apply_channel_transitions(self, transitions: List[dict]) -> int:
+        """Grava as mudanças de estado de uma varredura com um único bulk_write"""
+        if not transitions:
+            return 0
         try:
-            result = self.monitored_channels.update_one(
-                {"channel_id": channel_id, "platform": "youtube"},
-                {"$set": {"last_video_id": video_id}},
+            result = await self.monitored_channels.bulk_write(
+                [self._channel_transition_op(t) for t in transitions], ordered=False
             )
-            return result.modified_count > 0
+            return result.modified_count
         except Exception as e:
-            logging.error(f"Erro ao atualizar último vídeo: {str(e)}")
-            return False
+            logging.error(f"Erro ao gravar estado dos canais monitorados: {str(e)}")
+            return 0
 
-    async def update_channel_stream_status(
-        self, discord_id: str, channel_id: str, stream_id: str
+    async def record_channel_changes(
+        self, notifications: List[dict], transitions: List[dict]
     ) -> bool:
-        """Atualiza o status de live de um canal da Twitch (na coleção de canais monitorados)"""
+        """Grava as notificações no outbox e, só depois, o novo estado dos canais.
+
+        Cada notificação usa sua chave de idempotência como `_id` e é inserida
+        com `$setOnInsert`: se o processo cair antes de o estado ser gravado, a
+        próxima varredura detecta a mesma mudança sem duplicar a notificação.
+
+        Retorna False se o outbox ou o estado não puderem ser gravados. Nesse
+        caso quem chama precisa garantir que a mudança seja consultada de novo
+        (o estado salvo continua o anterior, mas caches como as ETags do
+        YouTube não podem avançar).
+        """
+        if notifications:
+            now = datetime.now(UTC)
+            ops = [
+                UpdateOne(
+                    {"_id": notification["_id"]},
+                    {
+                        "$setOnInsert": {
+                            **{k: v for k, v in notification.items() if k != "_id"},
+                            "status": "pending",
+                            "attempts": 0,
+                            "created_at": now,
+                            "next_attempt_at": now,
+                            "lease_owner": None,
+                            "lease_until": None,
+                        }
+                    },
+                    upsert=True,
+                )
+                for notification in notifications
+            ]
+            try:
+                await self.outbox.bulk_write(ops, ordered=False)
+            except Exception as e:
+                logging.error(f"Erro ao gravar notificações no outbox: {str(e)}")
+                return False
+        if transitions:
+            try:
+                await self.monitored_channels.bulk_write(
+                    [self._channel_transition_op(t) for t in transitions], ordered=False
+                )
+            except Exception as e:
+                logging.error(f"Erro ao gravar estado dos canais monitorados: {str(e)}")
+                return False
+        return True
+
+    async def claim_outbox(
+        self, owner: str, limit: int, lease_seconds: float
+    ) -> List[dict]:
+        """Reserva (lease) até `limit` notificações pendentes para o worker `owner`.
+
+        Vários workers podem drenar o outbox ao mesmo tempo: uma notificação
+        só é reservada se não houver lease válido de outro worker.
+        """
+        now = datetime.now(UTC)
+        available = {
+            "status": "pending",
+            "next_attempt_at": {"$lte": now},
+            "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}],
+        }
         try:
-            result = self.monitored_channels.update_one(
-                {"channel_id": channel_id, "platform": "twitch"},
-                {"$set": {"last_stream_id": stream_id, "is_live": bool(stream_id)}},
+            cursor = (
+                self.outbox.find(available, {"_id": 1})
+                .sort("created_at", 1)
+                .limit(limit)
             )
-            return result.modified_count > 0
+            ids = [doc["_id"] async for doc in cursor]
+            if not ids:
+                return []
+            lease_until = now + timedelta(seconds=lease_seconds)
+            await self.outbox.update_many(
+                {"_id": {"$in": ids}, **available},
+                {"$set": {"lease_owner": owner, "lease_until": lease_until}},
+            )
+            cursor = self.outbox.find(
+                {"_id": {"$in": ids}, "lease_owner": owner, "lease_until": lease_until}
+            ).sort("created_at", 1)
+            return [doc async for doc in cursor]
         except Exception as e:
-            logging.error(f"Erro ao atualizar status de live: {str(e)}")
-            return False
+            logging.error(f"Erro ao reservar notificações do outbox: {str(e)}")
+            return []
+
+    async def complete_outbox(self, owner: str, ids: List[str]):
+        """Marca notificações como entregues (mantidas até OUTBOX_RETENTION para deduplicação)"""
+        if not ids:
+            return
+        now = datetime.now(UTC)
+        try:
+            await self.outbox.update_many(
+                {"_id": {"$in": ids}, "lease_owner": owner},
+                {
+                    "$set": {
+                        "status": "delivered",
+                        "delivered_at": now,
+                        "expires_at": now + timedelta(seconds=OUTBOX_RETENTION),
+                        "lease_owner": None,
+                        "lease_until": None,
+                    }
+                },
+            )
+        except Exception as e:
+            logging.error(f"Erro ao confirmar notificações do outbox: {str(e)}")
+
+    async def retry_outbox(self, owner: str, docs: List[dict], max_attempts: int):
+        """Libera notificações que falharam, com backoff exponencial; desiste após `max_attempts`"""
+        if not docs:
+            return
+        now = datetime.now(UTC)
+        ops = []
+        for doc in docs:
+            attempts = doc.get("attempts", 0) + 1
+            update = {"attempts": attempts, "lease_owner": None, "lease_until": None}
+            if attempts >= max_attempts:
+                update.update(
+                    status="failed",
+                    expires_at=now + timedelta(seconds=OUTBOX_RETENTION),
+                )
+            else:
+                update["next_attempt_at"] = now + timedelta(seconds=5 * 2**attempts)
+            ops.append(
+                UpdateOne({"_id": doc["_id"], "lease_owner": owner}, {"$set": update})
+            )
+        try:
+            await self.outbox.bulk_write(ops, ordered=False)
+        except Exception as e:
+            logging.error(f"Erro ao reagendar notificações do outbox: {str(e)}")
+
+    async def update_channel_last_video(
+        self, discord_id: str, channel_id: str, video_id: str
+    ) -> bool:
+        """Atualiza o ID do último vídeo de um canal do YouTube (baseado na coleção de canais monitorados)"""
+        transition = {
+            "platform": "youtube",
+            "channel_id": channel_id,
+            "type": "video",
+            "video_id": video_id,
+        }
+        return await self.apply_channel_transitions([transition]) > 0
 
-    async def get_all_monitored_channels(self) -> List[MonitoredChannel]:
-        """Retorna todos os canais monitorados (cada documento contém subscribers)."""
+    async def update_channel_stream_status(
+        self, discord_id: str, channel_id: str, stream_id: str
+    ) -> bool:
+        """Atualiza o status de live de um canal da Twitch (na coleção de canais monitorados)"""
+        transition = {
+            "platform": "twitch",
+            "channel_id": channel_id,
+            "type": "live" if stream_id else "offline",
+            "stream_id": stream_id,
+        }
+        return await self.apply_channel_transitions([transition]) > 0
+
+    async def get_all_monitored_channels(
+        self, platform: Optional[str] = None
+    ) -> List[MonitoredChannel]:
+        """Retorna todos os canais monitorados (cada documento contém subscribers).
+
+        Cada canal aparece uma única vez, independentemente do número de subscribers.
+        """
         try:
             channels = []
-            cursor = self.monitored_channels.find({})
-            for doc in cursor:
+            cursor = self.monitored_channels.find(
+                {"platform": platform} if platform else {}, MONITORED_CHANNEL_FIELDS
+            )
+            async for doc in cursor:
                 channels.append(MonitoredChannel.from_dict(doc))
             return channels
         except Exception as e:
             logging.error(f"Erro ao buscar canais monitorados: {str(e)}")
             return []
 
-    async def get_profiles_with_monitored_channels(self) -> List[UserProfile]:
-        """Compat layer: Retorna perfis dos usuários que têm ao menos um canal monitorado.
+    async def get_monitored_channel(
+        self, platform: str, channel_id: str
+    ) -> Optional[MonitoredChannel]:
+        """Retorna um canal monitorado específico (ou None)"""
+        try:
+            doc = await self.monitored_channels.find_one(
+                {"platform": platform, "channel_id": channel_id}, MONITORED_CHANNEL_FIELDS
+            )
+            return MonitoredChannel.from_dict(doc) if doc else None
+        except Exception as e:
+            logging.error(f"Erro ao buscar canal monitorado: {str(e)}")
+            return None
 
-        Este método preserva a interface esperada pelo scheduler e outros módulos:
-        - Antes: retornava UserProfile com `monitored_channels` embutidos.
-        - Agora: retornará UserProfile com monitored_channels preenchidos a partir da coleção separada.
+    async def get_user_monitored_channels(self, discord_id: str) -> List[MonitoredChannel]:
+        """Retorna os canais monitorados em que o usuário é subscriber."""
+        try:
+            cursor = self.monitored_channels.find({"subscribers": str(discord_id)})
+            return [MonitoredChannel.from_dict(doc) async for doc in cursor]
+        except Exception as e:
+            logging.error(f"Erro ao buscar canais monitorados do usuário: {str(e)}")
+            return []
+
+    async def get_youtube_resolution(self, key: str) -> Optional[dict]:
+        """Canal já resolvido para a chave (`handle:`, `username:` ou `id:`), se não expirou.
+
+        Retorna {"channel_id", "title"}; consulta o LRU em memória antes do MongoDB.
         """
+        cached = self._resolution_cache.get(key)
+        if cached is not None:
+            return cached
         try:
-            profiles = []
-            # Obter todos os canais monitorados e agrupar por subscriber
-            cursor = self.monitored_channels.find({})
-
-            # mapa de discord_id -> list[MonitoredChannel]
-            grouped = {}
-            for doc in cursor:
-                channel = MonitoredChannel.from_dict(doc)
-                for sub in doc.get("subscribers", []):
-                    grouped.setdefault(str(sub), []).append(channel)
-
-            # Para cada subscriber, buscar o perfil e anexar a lista de canais
-            for discord_id, channels in grouped.items():
-                user_doc = self.user_profiles.find_one({"discord_id": discord_id})
-                if user_doc:
-                    profile = UserProfile.from_dict(user_doc)
-                else:
-                    # Cria um perfil mínimo caso não exista
-                    profile = UserProfile(
-                        discord_id=discord_id, username=str(discord_id)
-                    )
-                # Atribui a lista de canais para compatibilidade com o restante do código
-                # Observação: UserProfile não tem mais o campo monitored_channels, mas o resto do
-                # código espera que o objeto retornado tenha esse atributo; adicionamos dinamicamente.
-                setattr(profile, "monitored_channels", channels)
-                profiles.append(profile)
+            # O índice TTL remove documentos vencidos só a cada ~60s: filtra também aqui
+            doc = await self.youtube_resolutions.find_one(
+                {"_id": key, "expires_at": {"$gt": datetime.now(UTC)}},
+                {"_id": 0, "channel_id": 1, "title": 1, "expires_at": 1},
+            )
+        except Exception as e:
+            logging.error(f"Erro ao buscar resolução de canal do YouTube: {str(e)}")
+            return None
+        if not doc:
+            return None
+        expires_at = doc.pop("expires_at")
+        self._resolution_cache.put(key, doc, expires_at=expires_at.timestamp())
+        return doc
+
+    async def save_youtube_resolution(self, keys: Iterable[str], channel_id: str, title: str):
+        """Grava a resolução sob todas as chaves informadas (ex.: handle e ID do canal)"""
+        expires_at = datetime.now(UTC) + timedelta(seconds=YOUTUBE_RESOLUTION_TTL)
+        value = {"channel_id": channel_id, "title": title}
+        ops = []
+        for key in keys:
+            self._resolution_cache.put(key, dict(value), expires_at=expires_at.timestamp())
+            ops.append(
+                UpdateOne(
+                    {"_id": key},
+                    {"$set": {**value, "expires_at": expires_at}},
+                    upsert=True,
+                )
+            )
+        try:
+            if ops:
+                await self.youtube_resolutions.bulk_write(ops, ordered=False)
+        except Exception as e:
+            logging.error(f"Erro ao salvar resolução de canal do YouTube: {str(e)}")
 
-            return profiles
+    async def get_youtube_quota(self, period: str) -> Optional[dict]:
+        """Consumo de cota do YouTube gravado para o período (data do Pacífico)"""
+        try:
+            doc = await self.api_quota.find_one({"_id": f"youtube:{period}"})
         except Exception as e:
-            logging.error(f"Erro ao buscar perfis com canais monitorados: {str(e)}")
-            return []
+            logging.error(f"Erro ao buscar consumo de cota do YouTube: {str(e)}")
+            return None
+        if not doc:
+            return None
+        return {
+            "period": period,
+            "used": doc.get("used", 0),
+            # Nomes de método têm pontos: gravados como lista, não como chaves
+            "calls": {call["method"]: call["count"] for call in doc.get("calls", [])},
+            "exhausted": doc.get("exhausted", False),
+        }
+
+    async def save_youtube_quota(self, state: dict) -> bool:
+        """Grava o consumo do período; `$max` impede que um valor menor sobrescreva o atual"""
+        try:
+            await self.api_quota.update_one(
+                {"_id": f"youtube:{state['period']}"},
+                {
+                    "$max": {"used": state["used"], "exhausted": state["exhausted"]},
+                    "$set": {
+                        "calls": [
+                            {"method": method, "count": count}
+                            for method, count in state["calls"].items()
+                        ],
+                        # Mantido um dia além do reset só para consulta
+                        "expires_at": state["period_end"] + timedelta(days=1),
+                    },
+                },
+                upsert=True,
+            )
+            return True
+        except Exception as e:
+            logging.error(f"Erro ao salvar consumo de cota do YouTube: {str(e)}")
+            return False
 
     async def get_user_top_activities(
         self, user_id: str, limit: int = 10
     ) -> List[dict]:
-        """Retorna as atividades mais frequentes de um usuário calculando dinamicamente a partir do histórico"""
+        """Retorna as atividades mais frequentes de um usuário a partir dos totais materializados"""
         try:
-            # Usa agregação do MongoDB para calcular totais
-            pipeline = [
-                # Filtra apenas sessões do usuário que foram finalizadas
-                {"$match": {"user_id": user_id, "end_time": {"$ne": None}}},
-                # Agrupa por atividade e soma as durações
-                {
-                    "$group": {
-                        "_id": "$activity_name",
-                        "total_seconds": {
-                            "$sum": {
-                                "$divide": [
-                                    {"$subtract": ["$end_time", "$start_time"]},
-                                    1000,  # Converte milissegundos para segundos
-                                ]
-                            }
-                        },
-                        "last_seen": {"$max": "$end_time"},
-                    }
-                },
-                # Ordena por tempo total decrescente
-                {"$sort": {"total_seconds": -1}},
-                # Limita os resultados
-                {"$limit": limit},
-            ]
-
-            cursor = self.activity_history.aggregate(pipeline)
+            cursor = (
+                self.activity_rollups.find(
+                    {"user_id": user_id},
+                    {"_id": 0, "activity_name": 1, "total_seconds": 1, "last_seen": 1},
+                )
+                .sort("total_seconds", -1)
+                .limit(limit)
+            )
             results = []
-            for doc in cursor:
+            async for doc in cursor:
                 results.append(
                     {
-                        "activity_name": doc["_id"],
+                        "activity_name": doc["activity_name"],
                         "total_seconds": doc["total_seconds"],
-                        "last_seen": doc["last_seen"],
+                        "last_seen": doc.get("last_seen"),
                     }
                 )
             return results
@@ -373,18 +676,49 @@ class Database:
             logging.error(f"Erro ao buscar atividades do usuário: {str(e)}")
             return []
 
+    async def find_activity(self, name: str) -> Optional[Activity]:
+        """Busca uma atividade pelo nome (cache LRU e, se preciso, índice normalizado)"""
+        key = Activity.normalize_name(name)
+        activity = self._activity_cache.get(key)
+        if activity:
+            return activity
+        try:
+            doc = await self.activities.find_one({"normalized_name": key})
+            if not doc:
+                return None
+            activity = Activity.from_dict(doc)
+            self._activity_cache.put(key, activity)
+            return activity
+        except Exception as e:
+            logging.error(f"Erro ao buscar atividade: {str(e)}")
+            return None
+
     async def get_or_create_activity(self, name: str) -> Activity:
         """Retorna uma atividade existente ou cria uma nova"""
+        key = Activity.normalize_name(name)
+        activity = self._activity_cache.get(key)
+        if activity:
+            return activity
         try:
-            # Case insensitive search
-            doc = self.activities.find_one(
-                {"name": {"$regex": f"^{name}$", "$options": "i"}}
-            )
-            if doc:
-                return Activity.from_dict(doc)
+            # Busca/cria em uma única ida ao banco usando o índice de nome normalizado
+            new_activity = Activity(name=name, created_at=datetime.now(UTC))
+            try:
+                doc = await self.activities.find_one_and_update(
+                    {"normalized_name": key},
+                    {"$setOnInsert": new_activity.to_dict()},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER,
+                )
+            except DuplicateKeyError:
+                # Upsert concorrente ou documento antigo com o mesmo `name` sem normalized_name
+                doc = await self.activities.find_one(
+                    {"$or": [{"normalized_name": key}, {"name": name}]}
+                )
+            if not doc:
+                return None
 
-            activity = Activity(name=name, created_at=datetime.now(UTC))
-            self.activities.insert_one(activity.to_dict())
+            activity = Activity.from_dict(doc)
+            self._activity_cache.put(key, activity)
             return activity
         except Exception as e:
             logging.error(f"Erro ao buscar/criar atividade: {str(e)}")
@@ -393,146 +727,137 @@ class Database:
     async def start_activity_session(
         self, user_id: str, username: str, activity_name: str
     ) -> bool:
-        """Inicia uma sessão de atividade para o usuário"""
+        """Inicia uma sessão de atividade para o usuário
+
+        Sessões já abertas são detectadas pelo índice em memória; só as
+        transições reais são enfileiradas no `session_writer`, que garante o
+        perfil por upsert e grava a sessão em lote.
+        """
         try:
-            # Garante que o perfil do usuário existe
-            if not self.user_profiles.find_one({"discord_id": user_id}):
-                await self.create_user_profile(user_id, username)
+            if self.open_sessions.get(user_id, activity_name):
+                return True
 
             # Primeiro garante que a atividade existe
             activity = await self.get_or_create_activity(activity_name)
             if not activity:
                 return False
 
-            # Verifica se já existe uma sessão aberta para essa atividade e usuário
-            # Se existir, não faz nada (ou poderia fechar e abrir outra, mas vamos manter simples)
-            existing_session = self.activity_history.find_one(
-                {
-                    "user_id": user_id,
-                    "activity_name": activity.name,  # Usa o nome oficial da atividade
-                    "end_time": None,
-                }
+            profile = UserProfile(
+                discord_id=user_id, username=username, display_name=username
             )
-
-            if existing_session:
-                return True
-
             session = ActivityHistory(
                 user_id=user_id,
-                activity_name=activity.name,
+                activity_name=activity.name,  # Usa o nome oficial da atividade
                 start_time=datetime.now(UTC),
             )
 
-            result = self.activity_history.insert_one(session.to_dict())
-            return result.acknowledged
+            # Outro evento de presença pode ter aberto a sessão durante o await acima
+            if self.open_sessions.get(user_id, activity_name):
+                return True
+            self.open_sessions.open(session)
+            await self.session_writer.enqueue_start(profile.to_dict(), session.to_dict())
+            return True
         except Exception as e:
             logging.error(f"Erro ao iniciar sessão de atividade: {str(e)}")
             return False
 
     async def end_activity_session(self, user_id: str, activity_name: str) -> bool:
-        """Finaliza uma sessão de atividade aberta"""
+        """Finaliza uma sessão de atividade aberta (gravação em lote)"""
         try:
-            # Busca todas as sessões abertas do usuário
-            cursor = self.activity_history.find({"user_id": user_id, "end_time": None})
-
-            now = datetime.now(UTC)
-            modified = False
-
-            for doc in cursor:
-                # Compara nomes de forma case-insensitive
-                if doc["activity_name"].lower() == activity_name.lower():
-                    # Atualiza o histórico com o end_time
-                    self.activity_history.update_one(
-                        {"_id": doc["_id"]}, {"$set": {"end_time": now}}
-                    )
-                    modified = True
-                    logging.info(
-                        f"Sessão de atividade {activity_name} finalizada para usuário {user_id}"
-                    )
+            session = self.open_sessions.close(user_id, activity_name)
+            if not session:
+                return False
 
-            return modified
+            await self.session_writer.enqueue_end(
+                user_id,
+                session.activity_name,
+                Activity.normalize_name(session.activity_name),
+                session.start_time,
+                datetime.now(UTC),
+            )
+            logging.info(
+                f"Sessão de atividade {session.activity_name} finalizada para usuário {user_id}"
+            )
+            return True
         except Exception as e:
             logging.error(f"Erro ao finalizar sessão de atividade: {str(e)}")
             return False
 
-    async def sync_member_profiles(self, members_data: List[dict]) -> int:
-        """Sincroniza perfis de membros, criando se não existirem e atualizando display_name"""
-        count = 0
+    async def sync_member_profiles(
+        self, members_data: Iterable[dict], chunk_size: int = SYNC_MEMBERS_CHUNK_SIZE
+    ) -> dict:
+        """Sincroniza perfis de membros, criando se não existirem e atualizando display_name
+
+        Os membros são enviados em blocos de `chunk_size`, cada um com um único
+        `bulk_write` não ordenado de upserts. Retorna as contagens do resultado:
+        `{"created": novos perfis, "updated": perfis com nome alterado}`.
+        """
+        counts = {"created": 0, "updated": 0}
         try:
-            for member in members_data:
-                discord_id = str(member["id"])
-                username = member["name"]
-                display_name = member.get("display_name", username)
-
-                # Verifica se existe
-                existing = self.db.user_profiles.find_one({"discord_id": discord_id})
-
-                if not existing:
-                    # Cria novo perfil
-                    await self.create_user_profile(discord_id, username, display_name)
-                    count += 1
-                else:
-                    # Atualiza username e display_name se mudaram
-                    self.db.user_profiles.update_one(
-                        {"discord_id": discord_id},
-                        {"$set": {"username": username, "display_name": display_name}},
+            members = iter(members_data)
+            while chunk := list(islice(members, chunk_size)):
+                ops = []
+                for member in chunk:
+                    discord_id = str(member["id"])
+                    username = member["name"]
+                    display_name = member.get("display_name", username)
+
+                    # Valores padrão apenas para perfis novos; nomes sempre atualizados
+                    defaults = UserProfile(discord_id=discord_id, username=username).to_dict()
+                    for field in ("discord_id", "username", "display_name"):
+                        defaults.pop(field)
+
+                    ops.append(
+                        UpdateOne(
+                            {"discord_id": discord_id},
+                            {
+                                "$set": {"username": username, "display_name": display_name},
+                                "$setOnInsert": defaults,
+                            },
+                            upsert=True,
+                        )
                     )
 
-            if count > 0:
-                logging.info(f"Sincronização concluída: {count} novos perfis criados.")
-            return count
+                result = await self.user_profiles.bulk_write(ops, ordered=False)
+                counts["created"] += result.upserted_count
+                counts["updated"] += result.modified_count
+                # Progresso por bloco; o total da sincronização é logado por quem chama
+                logging.debug(
+                    f"Bloco de {len(chunk)} membros sincronizado "
+                    f"({result.upserted_count} novos, {result.modified_count} atualizados)"
+                )
+
+            return counts
         except Exception as e:
             logging.error(f"Erro ao sincronizar membros: {str(e)}")
-            return 0
+            return counts
 
     async def get_global_activity_rank(
         self, activity_name: str, limit: int = 10
     ) -> List[dict]:
-        """Retorna o ranking global de usuários para uma atividade específica calculando dinamicamente"""
+        """Retorna o ranking global de usuários para uma atividade específica"""
         try:
-            # Usa agregação do MongoDB para calcular rankings por usuário
-            pipeline = [
-                # Filtra apenas sessões da atividade específica que foram finalizadas (case-insensitive)
-                {
-                    "$match": {
-                        "activity_name": {
-                            "$regex": f"^{activity_name}$",
-                            "$options": "i",
-                        },
-                        "end_time": {"$ne": None},
-                    }
-                },
-                # Agrupa por usuário e soma as durações
-                {
-                    "$group": {
-                        "_id": "$user_id",
-                        "activity_name": {"$first": "$activity_name"},
-                        "total_seconds": {
-                            "$sum": {
-                                "$divide": [
-                                    {"$subtract": ["$end_time", "$start_time"]},
-                                    1000,  # Converte milissegundos para segundos
-                                ]
-                            }
-                        },
-                        "last_seen": {"$max": "$end_time"},
-                    }
-                },
-                # Ordena por tempo total decrescente
-                {"$sort": {"total_seconds": -1}},
-                # Limita os resultados
-                {"$limit": limit},
-            ]
+            # Resolve o nome oficial (case-insensitive) pelo cache/índice normalizado
+            activity = await self.find_activity(activity_name)
+            if not activity:
+                return []
 
-            cursor = self.activity_history.aggregate(pipeline)
+            cursor = (
+                self.activity_rollups.find(
+                    {"normalized_name": activity.normalized_name},
+                    {"_id": 0, "user_id": 1, "total_seconds": 1, "last_seen": 1},
+                )
+                .sort("total_seconds", -1)
+                .limit(limit)
+            )
             results = []
-            for doc in cursor:
+            async for doc in cursor:
                 results.append(
                     {
-                        "user_id": doc["_id"],
-                        "activity_name": doc["activity_name"],
+                        "user_id": doc["user_id"],
+                        "activity_name": activity.name,
                         "total_seconds": doc["total_seconds"],
-                        "last_seen": doc["last_seen"],
+                        "last_seen": doc.get("last_seen"),
                     }
                 )
             return results
@@ -543,53 +868,39 @@ class Database:
     async def get_top_activities_global(self, limit: int = 10) -> List[dict]:
         """Retorna as atividades mais realizadas globalmente, ranqueadas por tempo total"""
         try:
-            # Usa agregação do MongoDB para calcular totais por atividade
-            pipeline = [
-                # Filtra apenas sessões finalizadas
-                {"$match": {"end_time": {"$ne": None}}},
-                # Agrupa por atividade e soma as durações
-                {
-                    "$group": {
-                        "_id": "$activity_name",
-                        "total_seconds": {
-                            "$sum": {
-                                "$divide": [
-                                    {"$subtract": ["$end_time", "$start_time"]},
-                                    1000,  # Converte milissegundos para segundos
-                                ]
-                            }
-                        },
-                        "unique_players": {"$addToSet": "$user_id"},
-                        "session_count": {"$sum": 1},
-                    }
-                },
-                # Adiciona contagem de jogadores únicos
+            # Totais por atividade são mantidos no próprio documento da atividade
+            cursor = (
+                self.activities.find(
+                    {"total_seconds": {"$gt": 0}},
+                    {"_id": 0, "name": 1, "normalized_name": 1, "total_seconds": 1, "session_count": 1},
+                )
+                .sort("total_seconds", -1)
+                .limit(limit)
+            )
+            top = [doc async for doc in cursor]
+            if not top:
+                return []
+
+            # Jogadores únicos = documentos de rollup da atividade (consulta só do top N)
+            player_counts = {}
+            counts_cursor = await self.activity_rollups.aggregate(
+                [
+                    {"$match": {"normalized_name": {"$in": [d["normalized_name"] for d in top]}}},
+                    {"$group": {"_id": "$normalized_name", "players": {"$sum": 1}}},
+                ]
+            )
+            async for doc in counts_cursor:
+                player_counts[doc["_id"]] = doc["players"]
+
+            return [
                 {
-                    "$project": {
-                        "activity_name": "$_id",
-                        "total_seconds": 1,
-                        "player_count": {"$size": "$unique_players"},
-                        "session_count": 1,
-                    }
-                },
-                # Ordena por tempo total decrescente
-                {"$sort": {"total_seconds": -1}},
-                # Limita os resultados
-                {"$limit": limit},
+                    "activity_name": doc["name"],
+                    "total_seconds": doc["total_seconds"],
+                    "player_count": player_counts.get(doc["normalized_name"], 0),
+                    "session_count": doc.get("session_count", 0),
+                }
+                for doc in top
             ]
-
-            cursor = self.activity_history.aggregate(pipeline)
-            results = []
-            for doc in cursor:
-                results.append(
-                    {
-                        "activity_name": doc["activity_name"],
-                        "total_seconds": doc["total_seconds"],
-                        "player_count": doc["player_count"],
-                        "session_count": doc["session_count"],
-                    }
-                )
-            return results
         except Exception as e:
             logging.error(f"Erro ao buscar ranking global de atividades: {str(e)}")
             return []
@@ -597,89 +908,245 @@ class Database:
     async def get_top_members_by_activity_time(self, limit: int = 10) -> List[dict]:
         """Retorna os membros ranqueados por tempo total em atividades"""
         try:
-            # Usa agregação do MongoDB para calcular totais por usuário
-            pipeline = [
-                # Filtra apenas sessões finalizadas
-                {"$match": {"end_time": {"$ne": None}}},
-                # Agrupa por usuário e soma as durações
-                {
-                    "$group": {
-                        "_id": "$user_id",
-                        "total_seconds": {
-                            "$sum": {
-                                "$divide": [
-                                    {"$subtract": ["$end_time", "$start_time"]},
-                                    1000,  # Converte milissegundos para segundos
-                                ]
-                            }
-                        },
-                        "activities": {
-                            "$push": {
-                                "name": "$activity_name",
-                                "duration": {
-                                    "$divide": [
-                                        {"$subtract": ["$end_time", "$start_time"]},
-                                        1000,
-                                    ]
-                                },
-                            }
-                        },
-                    }
-                },
-                # Ordena por tempo total decrescente
-                {"$sort": {"total_seconds": -1}},
-                # Limita os resultados
-                {"$limit": limit},
-            ]
+            # Total por usuário é mantido no perfil (activity_total_seconds)
+            cursor = (
+                self.user_profiles.find(
+                    {"activity_total_seconds": {"$gt": 0}},
+                    {"_id": 0, "discord_id": 1, "activity_total_seconds": 1},
+                )
+                .sort("activity_total_seconds", -1)
+                .limit(limit)
+            )
+            top = [doc async for doc in cursor]
+            if not top:
+                return []
 
-            cursor = self.activity_history.aggregate(pipeline)
-            results = []
-            for doc in cursor:
-                # Agrupa e soma atividades duplicadas
-                activity_totals = {}
-                for activity in doc["activities"]:
-                    name = activity["name"]
-                    duration = activity["duration"]
-                    activity_totals[name] = activity_totals.get(name, 0) + duration
-
-                # Ordena atividades por duração e pega as top 3
-                top_activities = sorted(
-                    activity_totals.items(), key=lambda x: x[1], reverse=True
-                )[:3]
+            # Top 3 atividades de cada membro em uma única consulta aos rollups
+            top_activities = {doc["discord_id"]: [] for doc in top}
+            rollups = self.activity_rollups.find(
+                {"user_id": {"$in": list(top_activities)}},
+                {"_id": 0, "user_id": 1, "activity_name": 1, "total_seconds": 1},
+            ).sort([("user_id", 1), ("total_seconds", -1)])
+            async for doc in rollups:
+                activities = top_activities[doc["user_id"]]
+                if len(activities) < 3:
+                    activities.append(
+                        {"name": doc["activity_name"], "seconds": doc["total_seconds"]}
+                    )
 
-                results.append(
-                    {
-                        "user_id": doc["_id"],
-                        "total_seconds": doc["total_seconds"],
-                        "top_activities": [
-                            {"name": name, "seconds": seconds}
-                            for name, seconds in top_activities
-                        ],
-                    }
-                )
-            return results
+            return [
+                {
+                    "user_id": doc["discord_id"],
+                    "total_seconds": doc["activity_total_seconds"],
+                    "top_activities": top_activities[doc["discord_id"]],
+                }
+                for doc in top
+            ]
         except Exception as e:
             logging.error(f"Erro ao buscar ranking de membros por atividade: {str(e)}")
             return []
 
-    def initialize_collections(self):
+    async def rebuild_activity_rollups(self):
+        """Recalcula os totais materializados a partir de todo o `activity_history`.
+
+        Usado uma única vez para popular `activity_rollups` em bancos existentes;
+        depois disso os totais são mantidos com `$inc` a cada sessão finalizada.
+        """
+        pipeline = [
+            {"$match": {"end_time": {"$ne": None}}},
+            {
+                "$group": {
+                    "_id": {"user_id": "$user_id", "activity_name": "$activity_name"},
+                    "total_seconds": {
+                        "$sum": {
+                            "$divide": [
+                                {"$subtract": ["$end_time", "$start_time"]},
+                                1000,  # Converte milissegundos para segundos
+                            ]
+                        }
+                    },
+                    "session_count": {"$sum": 1},
+                    "last_seen": {"$max": "$end_time"},
+                }
+            },
+        ]
+
+        rollups = {}  # (user_id, normalized_name) -> totais
+        cursor = await self.activity_history.aggregate(pipeline)
+        async for doc in cursor:
+            user_id = doc["_id"]["user_id"]
+            name = doc["_id"]["activity_name"]
+            key = (user_id, Activity.normalize_name(name))
+            current = rollups.setdefault(
+                key,
+                {"activity_name": name, "total_seconds": 0.0, "session_count": 0, "last_seen": doc["last_seen"]},
+            )
+            current["total_seconds"] += doc["total_seconds"]
+            current["session_count"] += doc["session_count"]
+            current["last_seen"] = max(current["last_seen"], doc["last_seen"])
+
+        activity_totals = {}
+        user_totals = {}
+        for (user_id, normalized_name), totals in rollups.items():
+            activity = activity_totals.setdefault(
+                normalized_name,
+                {"name": totals["activity_name"], "total_seconds": 0.0, "session_count": 0},
+            )
+            activity["total_seconds"] += totals["total_seconds"]
+            activity["session_count"] += totals["session_count"]
+            user_totals[user_id] = user_totals.get(user_id, 0.0) + totals["total_seconds"]
+
+        if rollups:
+            await self.activity_rollups.bulk_write(
+                [
+                    UpdateOne(
+                        {"user_id": user_id, "normalized_name": normalized_name},
+                        {"$set": totals},
+                        upsert=True,
+                    )
+                    for (user_id, normalized_name), totals in rollups.items()
+                ],
+                ordered=False,
+            )
+            now = datetime.now(UTC)
+            await self.activities.bulk_write(
+                [
+                    UpdateOne(
+                        {"normalized_name": normalized_name},
+                        {
+                            "$set": {
+                                "total_seconds": totals["total_seconds"],
+                                "session_count": totals["session_count"],
+                            },
+                            "$setOnInsert": {"name": totals["name"], "created_at": now},
+                        },
+                        upsert=True,
+                    )
+                    for normalized_name, totals in activity_totals.items()
+                ],
+                ordered=False,
+            )
+            await self.user_profiles.bulk_write(
+                [
+                    UpdateOne(
+                        {"discord_id": user_id},
+                        {"$set": {"activity_total_seconds": seconds}},
+                    )
+                    for user_id, seconds in user_totals.items()
+                ],
+                ordered=False,
+            )
+        logging.info(
+            f"Totais de atividades recalculados: {len(rollups)} pares usuário/atividade"
+        )
+
+    async def _backfill_activity_normalized_names(self):
+        """Preenche `normalized_name` em atividades antigas que ainda não o têm.
+
+        Se dois nomes antigos colidirem após a normalização, só o primeiro
+        recebe a chave; os demais são fundidos nele (ver `_merge_duplicate_activity`).
+        """
+        taken = set()
+        pending = []
+        cursor = self.activities.find({}, {"name": 1, "normalized_name": 1})
+        async for doc in cursor:
+            if doc.get("normalized_name"):
+                taken.add(doc["normalized_name"])
+            else:
+                pending.append(doc)
+
+        ops = []
+        duplicates = []
+        for doc in pending:
+            key = Activity.normalize_name(doc["name"])
+            if key in taken:
+                duplicates.append((doc, key))
+                continue
+            taken.add(key)
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"normalized_name": key}}))
+
+        if ops:
+            await self.activities.bulk_write(ops, ordered=False)
+            logging.info(f"normalized_name preenchido em {len(ops)} atividades")
+        for doc, key in duplicates:
+            await self._merge_duplicate_activity(doc, key)
+
+    async def _merge_duplicate_activity(self, duplicate: dict, key: str):
+        """Funde uma atividade antiga na que já tem a mesma chave normalizada.
+
+        Deixada sem `normalized_name`, a duplicata não receberia os `$inc` dos
+        totais e o rollup deixaria de bater com o histórico. As sessões passam a
+        usar o nome oficial e a duplicata é removida; os totais não precisam ser
+        somados porque rollups e `$inc` já são agrupados pela chave normalizada.
+        """
+        canonical = await self.activities.find_one({"normalized_name": key}, {"name": 1})
+        if not canonical:
+            return
+        result = await self.activity_history.update_many(
+            {"activity_name": duplicate["name"]},
+            {"$set": {"activity_name": canonical["name"]}},
+        )
+        await self.activities.delete_one({"_id": duplicate["_id"]})
+        self._activity_cache.pop(key, None)
+        logging.warning(
+            f"Atividade duplicada '{duplicate['name']}' fundida em '{canonical['name']}' "
+            f"({result.modified_count} sessões renomeadas)"
+        )
+
+    async def initialize_collections(self):
         """Inicializa as coleções necessárias se não existirem"""
         try:
             # Cria índices necessários
-            self.user_profiles.create_index("discord_id", unique=True)
+            await self.user_profiles.create_index("discord_id", unique=True)
             # Índice para canais monitorados (evita duplicatas por platform+channel_id)
-            self.monitored_channels.create_index(
+            await self.monitored_channels.create_index(
                 [("platform", 1), ("channel_id", 1)], unique=True
             )
             # Índice para buscas por channel_name
-            self.monitored_channels.create_index("channel_name")
+            await self.monitored_channels.create_index("channel_name")
 
             # Índices para atividades
-            self.activities.create_index("name", unique=True)
-            self.activity_history.create_index(
+            await self.activities.create_index("name", unique=True)
+            await self._backfill_activity_normalized_names()
+            await self.activities.create_index(
+                "normalized_name", unique=True, sparse=True
+            )
+            await self.activity_history.create_index(
                 [("user_id", 1), ("activity_name", 1), ("end_time", 1)]
             )
-            self.activity_history.create_index("start_time")
+            await self.activity_history.create_index("start_time")
+
+            # Índices dos totais materializados usados pelos comandos de ranking
+            await self.activity_rollups.create_index(
+                [("user_id", 1), ("normalized_name", 1)], unique=True
+            )
+            await self.activity_rollups.create_index(
+                [("user_id", 1), ("total_seconds", -1)]
+            )
+            await self.activity_rollups.create_index(
+                [("normalized_name", 1), ("total_seconds", -1)]
+            )
+            await self.activities.create_index([("total_seconds", -1)])
+            await self.user_profiles.create_index(
+                [("activity_total_seconds", -1)], sparse=True
+            )
+            # Outbox: busca de pendentes por horário e limpeza das entregues
+            await self.outbox.create_index(
+                [("status", 1), ("next_attempt_at", 1)]
+            )
+            await self.outbox.create_index("expires_at", expireAfterSeconds=0)
+
+            # Resoluções de canais do YouTube expiram sozinhas
+            await self.youtube_resolutions.create_index(
+                "expires_at", expireAfterSeconds=0
+            )
+            # Consumo de cota de períodos passados
+            await self.api_quota.create_index("expires_at", expireAfterSeconds=0)
+            if not await self.activity_rollups.estimated_document_count():
+                await self.rebuild_activity_rollups()
+
+            # Reconstrói o índice de sessões abertas com uma única consulta
+            await self.open_sessions.rebuild(self.activity_history)
 
             logging.info("Índices do banco de dados criados/atualizados com sucesso!")
         except Exception as e:
@@ -33,17 +33,29 @@ class Activity:
 
     name: str
     created_at: datetime
+    normalized_name: Optional[str] = None  # Chave indexada para buscas por igualdade
+
+    def __post_init__(self):
+        if self.normalized_name is None:
+            self.normalized_name = self.normalize_name(self.name)
+
+    @staticmethod
+    def normalize_name(name: str) -> str:
+        """Chave de comparação do nome (sem diferenciar maiúsculas/minúsculas)"""
+        return " ".join(name.split()).casefold()
 
     @classmethod
     def from_dict(cls, data: Dict) -> "Activity":
         return cls(
             name=data["name"],
             created_at=data.get("created_at", datetime.now(UTC)),
+            normalized_name=data.get("normalized_name"),
         )
 
     def to_dict(self) -> Dict:
         return {
             "name": self.name,
+            "normalized_name": self.normalized_name,
             "created_at": self.created_at,
         }
 
@@ -99,10 +111,14 @@ class MonitoredChannel:
     is_live: bool = False
     added_at: datetime = datetime.now(UTC)  # Usando UTC de forma explícita
     subscribers: Optional[List[str]] = None
+    # Horários dos últimos uploads/inícios de live (mais recentes no fim)
+    change_history: Optional[List[datetime]] = None
 
     def __post_init__(self):
         if self.subscribers is None:
             self.subscribers = []
+        if self.change_history is None:
+            self.change_history = []
 
     @classmethod
     def from_dict(cls, data: Dict) -> "MonitoredChannel":
@@ -116,6 +132,7 @@ class MonitoredChannel:
             is_live=data.get("is_live", False),
             added_at=data.get("added_at", datetime.now(UTC)),
             subscribers=data.get("subscribers", []),
+            change_history=data.get("change_history", []),
         )
 
     def to_dict(self) -> Dict:
@@ -129,6 +146,7 @@ class MonitoredChannel:
             "is_live": self.is_live,
             "added_at": self.added_at,
             "subscribers": self.subscribers or [],
+            "change_history": self.change_history or [],
         }
 
 
@@ -0,0 +1,134 @@
+"""
+Modo de compatibilidade para o driver síncrono do PyMongo.
+
+Envolve coleções do `pymongo.MongoClient` expondo a mesma superfície assíncrona
+do `pymongo.AsyncMongoClient` (métodos aguardáveis e cursores com `async for` /
+`to_list`). Cada chamada bloqueante roda em um pool de threads dedicado, de modo
+que o event loop do discord.py nunca espera por uma ida ao MongoDB.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import Optional
+
+
+class OffloadedCursor:
+    """Cursor síncrono consumido de forma assíncrona em lotes via pool de threads"""
+
+    def __init__(self, cursor, executor: ThreadPoolExecutor, batch_size: int = 100):
+        self._cursor = cursor
+        self._executor = executor
+        self._batch_size = batch_size
+        self._buffer = []
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args))
+
+    def sort(self, *args, **kwargs) -> "OffloadedCursor":
+        self._cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, limit: int) -> "OffloadedCursor":
+        self._cursor.limit(limit)
+        return self
+
+    def _next_batch(self) -> list:
+        return list(islice(self._cursor, self._batch_size))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._buffer:
+            self._buffer = await self._run(self._next_batch)
+            if not self._buffer:
+                raise StopAsyncIteration
+        return self._buffer.pop(0)
+
+    async def to_list(self, length: Optional[int] = None) -> list:
+        if length is None:
+            return await self._run(list, self._cursor)
+        return await self._run(lambda: list(islice(self._cursor, length)))
+
+    async def close(self):
+        await self._run(self._cursor.close)
+
+
+class OffloadedCollection:
+    """Coleção síncrona com a mesma interface aguardável da coleção assíncrona"""
+
+    def __init__(self, collection, executor: ThreadPoolExecutor):
+        self._collection = collection
+        self._executor = executor
+
+    @property
+    def name(self) -> str:
+        return self._collection.name
+
+    async def _run(self, method: str, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        func = getattr(self._collection, method)
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    def find(self, *args, **kwargs) -> OffloadedCursor:
+        # Criar o cursor não faz I/O; a consulta só é enviada na primeira iteração
+        return OffloadedCursor(self._collection.find(*args, **kwargs), self._executor)
+
+    async def aggregate(self, *args, **kwargs) -> OffloadedCursor:
+        cursor = await self._run("aggregate", *args, **kwargs)
+        return OffloadedCursor(cursor, self._executor)
+
+    async def find_one(self, *args, **kwargs):
+        return await self._run("find_one", *args, **kwargs)
+
+    async def find_one_and_update(self, *args, **kwargs):
+        return await self._run("find_one_and_update", *args, **kwargs)
+
+    async def insert_one(self, *args, **kwargs):
+        return await self._run("insert_one", *args, **kwargs)
+
+    async def update_one(self, *args, **kwargs):
+        return await self._run("update_one", *args, **kwargs)
+
+    async def update_many(self, *args, **kwargs):
+        return await self._run("update_many", *args, **kwargs)
+
+    async def delete_one(self, *args, **kwargs):
+        return await self._run("delete_one", *args, **kwargs)
+
+    async def bulk_write(self, *args, **kwargs):
+        return await self._run("bulk_write", *args, **kwargs)
+
+    async def count_documents(self, *args, **kwargs):
+        return await self._run("count_documents", *args, **kwargs)
+
+    async def estimated_document_count(self, *args, **kwargs):
+        return await self._run("estimated_document_count", *args, **kwargs)
+
+    async def create_index(self, *args, **kwargs):
+        return await self._run("create_index", *args, **kwargs)
+
+
+class OffloadedClient:
+    """Envolve um `MongoClient` síncrono executando suas chamadas em threads"""
+
+    def __init__(self, client, max_workers: int = 4):
+        self._client = client
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="mongo-offload"
+        )
+
+    def collection(self, database_name: str, name: str) -> OffloadedCollection:
+        return OffloadedCollection(self._client[database_name][name], self._executor)
+
+    async def server_info(self) -> dict:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._client.server_info)
+
+    async def close(self):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._client.close)
+        self._executor.shutdown(wait=False)
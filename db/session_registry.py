@@ -0,0 +1,53 @@
+"""
+Índice em memória das sessões de atividade abertas.
+
+Responde em O(1) se um usuário já tem uma sessão aberta para uma atividade,
+evitando consultar `activity_history` a cada mudança de presença. É
+reconstruído com uma única consulta na inicialização.
+"""
+
+import logging
+from typing import Dict, Optional, Tuple
+
+from .models import Activity, ActivityHistory
+
+
+class OpenSessionRegistry:
+    """Sessões abertas indexadas por (user_id, nome normalizado da atividade)"""
+
+    def __init__(self):
+        self._sessions: Dict[Tuple[str, str], ActivityHistory] = {}
+
+    @staticmethod
+    def key(user_id: str, activity_name: str) -> Tuple[str, str]:
+        return str(user_id), Activity.normalize_name(activity_name)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, user_id: str, activity_name: str) -> Optional[ActivityHistory]:
+        return self._sessions.get(self.key(user_id, activity_name))
+
+    def open(self, session: ActivityHistory):
+        self._sessions[self.key(session.user_id, session.activity_name)] = session
+
+    def close(self, user_id: str, activity_name: str) -> Optional[ActivityHistory]:
+        """Remove e retorna a sessão aberta (None se não houver)"""
+        return self._sessions.pop(self.key(user_id, activity_name), None)
+
+    async def rebuild(self, activity_history):
+        """Recarrega o índice a partir das sessões sem end_time no banco"""
+        sessions = {}
+        cursor = activity_history.find(
+            {"end_time": None},
+            {"_id": 0, "user_id": 1, "activity_name": 1, "start_time": 1},
+        )
+        async for doc in cursor:
+            session = ActivityHistory.from_dict(doc)
+            key = self.key(session.user_id, session.activity_name)
+            # Em caso de duplicatas antigas, mantém a sessão mais antiga
+            current = sessions.get(key)
+            if current is None or session.start_time < current.start_time:
+                sessions[key] = session
+        self._sessions = sessions
+        logging.info(f"Índice de sessões abertas reconstruído: {len(sessions)} sessões")
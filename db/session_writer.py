@@ -0,0 +1,369 @@
+"""
+Escrita em lote (write-behind) das sessões de atividade.
+
+Os eventos de presença apenas enfileiram operações em memória; a task de
+flush (periódica, ou acordada ao atingir o tamanho máximo do lote) aplica tudo
+com um único `bulk_write` por coleção. Quem enfileira nunca espera o banco. Ao finalizar uma sessão, os totais materializados
+(`activity_rollups`, totais por atividade e por usuário) são incrementados
+com `$inc` no mesmo flush.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from typing import Optional
+
+from pymongo import UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError
+
+# Intervalo entre os resumos das métricas da fila no log (segundos)
+STATS_LOG_INTERVAL = 300
+
+
+def _merge_delta(target: dict, key, delta):
+    """Soma um incremento pendente ao que já estiver na fila para a mesma chave"""
+    if not isinstance(delta, dict):
+        target[key] = target.get(key, 0.0) + delta
+        return
+    current = target.get(key)
+    if current is None:
+        target[key] = delta
+        return
+    current["seconds"] += delta["seconds"]
+    current["sessions"] += delta["sessions"]
+    if "last_seen" in delta:
+        current["last_seen"] = max(current["last_seen"], delta["last_seen"])
+
+
+class ActivitySessionWriter:
+    """Acumula inícios/términos de sessões e grava em `activity_history` em lote"""
+
+    def __init__(
+        self,
+        activity_history,
+        user_profiles,
+        activity_rollups,
+        activities,
+        batch_size: int = 500,
+        flush_interval: float = 5.0,
+    ):
+        self.activity_history = activity_history
+        self.user_profiles = user_profiles
+        self.activity_rollups = activity_rollups
+        self.activities = activities
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._profile_ops = {}  # discord_id -> UpdateOne (upsert do perfil)
+        self._session_ops = []  # operações em ordem de chegada
+        # Incrementos agregados em memória até o próximo flush
+        self._rollup_deltas = {}  # (user_id, normalized_name) -> dict
+        self._activity_deltas = {}  # normalized_name -> dict
+        self._user_deltas = {}  # user_id -> segundos
+        # Lote de totais já montado (id, [(coleção, operações)]) aguardando confirmação
+        self._rollup_batch = None
+        self._lock = asyncio.Lock()
+        self._flush_requested = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        # Métricas
+        self.flush_count = 0
+        self.failed_flushes = 0
+        self.ops_written = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+        self._stats_logged_at = time.monotonic()
+        self._stats_logged_flushes = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return (
+            len(self._session_ops)
+            + len(self._profile_ops)
+            + len(self._rollup_deltas)
+            + len(self._activity_deltas)
+            + len(self._user_deltas)
+            + (sum(len(ops) for _, ops in self._rollup_batch[1]) if self._rollup_batch else 0)
+        )
+
+    def start(self):
+        """Inicia o flush periódico em segundo plano"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Para o flush periódico e grava o que ainda estiver pendente"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            await self.flush()
+            self._log_stats()
+
+    def _log_stats(self):
+        """Resumo periódico da fila de escrita (só quando houve flush desde o último)"""
+        now = time.monotonic()
+        if now - self._stats_logged_at < STATS_LOG_INTERVAL:
+            return
+        flushes = self.flush_count + self.failed_flushes
+        if flushes == self._stats_logged_flushes and not self.queue_depth:
+            return
+        self._stats_logged_at = now
+        self._stats_logged_flushes = flushes
+        stats = self.stats()
+        logging.info(
+            f"Fila de atividades: {stats['queue_depth']} pendentes, "
+            f"{stats['flush_count']} lotes gravados ({stats['failed_flushes']} falhas), "
+            f"flush médio {stats['avg_flush_ms']} ms, máximo {stats['max_flush_ms']} ms"
+        )
+
+    async def enqueue_start(self, profile: dict, session: dict):
+        """Enfileira o início de uma sessão (e a garantia de que o perfil existe)"""
+        self._profile_ops.setdefault(
+            profile["discord_id"],
+            UpdateOne(
+                {"discord_id": profile["discord_id"]},
+                {"$setOnInsert": profile},
+                upsert=True,
+            ),
+        )
+        # Upsert que casa com uma sessão já aberta ou com esta mesma sessão (pelo
+        # start_time), mesmo que já finalizada: repetir o lote nunca duplica a sessão
+        self._session_ops.append(
+            UpdateOne(
+                {
+                    "user_id": session["user_id"],
+                    "activity_name": session["activity_name"],
+                    "$or": [
+                        {"end_time": None},
+                        {"start_time": session["start_time"]},
+                    ],
+                },
+                {"$setOnInsert": session},
+                upsert=True,
+            )
+        )
+        self._maybe_flush()
+
+    async def enqueue_end(
+        self, user_id: str, activity_name: str, normalized_name: str, start_time, end_time
+    ):
+        """Enfileira o término de uma sessão e o incremento dos totais materializados"""
+        # Fecha esta sessão (e sessões abertas mais antigas), nunca uma iniciada depois:
+        # repetir o término após um novo início não encerra a sessão nova
+        self._session_ops.append(
+            UpdateMany(
+                {
+                    "user_id": user_id,
+                    "activity_name": activity_name,
+                    "end_time": None,
+                    "start_time": {"$lte": start_time},
+                },
+                {"$set": {"end_time": end_time}},
+            )
+        )
+
+        seconds = max((end_time - start_time).total_seconds(), 0.0)
+        _merge_delta(
+            self._rollup_deltas,
+            (user_id, normalized_name),
+            {
+                "activity_name": activity_name,
+                "seconds": seconds,
+                "sessions": 1,
+                "last_seen": end_time,
+            },
+        )
+        _merge_delta(
+            self._activity_deltas,
+            normalized_name,
+            {"seconds": seconds, "sessions": 1},
+        )
+        _merge_delta(self._user_deltas, user_id, seconds)
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        """Lote cheio: acorda a task de flush (a escrita nunca acontece no evento de presença)"""
+        if self.queue_depth >= self.batch_size:
+            self._flush_requested.set()
+
+    @staticmethod
+    def _rollup_ops(batch_id: str, rollup_deltas: dict, activity_deltas: dict, user_deltas: dict):
+        """Operações de `$inc` dos totais, marcadas com o id do lote.
+
+        Cada documento guarda em `last_rollup_batch` o último lote aplicado e o
+        filtro exige um lote diferente: repetir um lote que já foi aplicado não
+        casa com nada (nos rollups, o upsert esbarra no índice único e falha com
+        chave duplicada, que é tratada como "já aplicado").
+        """
+        not_applied = {"last_rollup_batch": {"$ne": batch_id}}
+        rollup_ops = [
+            UpdateOne(
+                {"user_id": user_id, "normalized_name": normalized_name, **not_applied},
+                {
+                    "$inc": {
+                        "total_seconds": delta["seconds"],
+                        "session_count": delta["sessions"],
+                    },
+                    "$max": {"last_seen": delta["last_seen"]},
+                    "$set": {"activity_name": delta["activity_name"], "last_rollup_batch": batch_id},
+                },
+                upsert=True,
+            )
+            for (user_id, normalized_name), delta in rollup_deltas.items()
+        ]
+        activity_ops = [
+            UpdateOne(
+                {"normalized_name": normalized_name, **not_applied},
+                {
+                    "$inc": {
+                        "total_seconds": delta["seconds"],
+                        "session_count": delta["sessions"],
+                    },
+                    "$set": {"last_rollup_batch": batch_id},
+                },
+            )
+            for normalized_name, delta in activity_deltas.items()
+        ]
+        user_ops = [
+            UpdateOne(
+                {"discord_id": user_id, **not_applied},
+                {"$inc": {"activity_total_seconds": seconds}, "$set": {"last_rollup_batch": batch_id}},
+            )
+            for user_id, seconds in user_deltas.items()
+        ]
+        return rollup_ops, activity_ops, user_ops
+
+    async def _write_rollup_batch(self) -> bool:
+        """Aplica o lote de totais pendente; o que não foi confirmado fica para a próxima vez"""
+        batch_id, writes = self._rollup_batch
+        remaining = []
+        for collection, ops in writes:
+            try:
+                await collection.bulk_write(ops, ordered=False)
+            except BulkWriteError as e:
+                # Chave duplicada = o upsert já tinha sido aplicado por este lote
+                failed = [
+                    ops[err["index"]]
+                    for err in e.details.get("writeErrors", [])
+                    if err.get("code") != 11000
+                ]
+                if failed or e.details.get("writeConcernErrors"):
+                    remaining.append((collection, failed or ops))
+                    logging.error(f"Erro ao atualizar totais de atividades: {str(e)}")
+            except Exception as e:
+                # Resultado incerto (rede, timeout): repetir é seguro graças ao id do lote
+                remaining.append((collection, ops))
+                logging.error(f"Erro ao atualizar totais de atividades: {str(e)}")
+        self._rollup_batch = (batch_id, remaining) if remaining else None
+        return not remaining
+
+    async def flush(self) -> bool:
+        """Grava as operações pendentes. Retorna False se algum lote falhar."""
+        async with self._lock:
+            if not self.queue_depth:
+                return True
+
+            pending_profiles = self._profile_ops
+            session_ops = self._session_ops
+            # Os totais são aplicados um lote por vez: enquanto um lote não for
+            # confirmado, os incrementos novos esperam em memória (um lote novo
+            # trocaria `last_rollup_batch` e a repetição do anterior contaria duas vezes)
+            take_deltas = self._rollup_batch is None
+            pending_deltas = (
+                (self._rollup_deltas, "_rollup_deltas"),
+                (self._activity_deltas, "_activity_deltas"),
+                (self._user_deltas, "_user_deltas"),
+            ) if take_deltas else ()
+            self._profile_ops = {}
+            self._session_ops = []
+            if take_deltas:
+                self._rollup_deltas = {}
+                self._activity_deltas = {}
+                self._user_deltas = {}
+
+            profile_ops = list(pending_profiles.values())
+            started = time.perf_counter()
+            try:
+                if profile_ops:
+                    await self.user_profiles.bulk_write(profile_ops, ordered=False)
+                if session_ops:
+                    # Ordenado: um término precisa ser aplicado depois do início correspondente
+                    await self.activity_history.bulk_write(session_ops, ordered=True)
+            except Exception as e:
+                # Lote ordenado: tudo antes do primeiro erro já foi aplicado e não volta à
+                # fila. Em falhas sem detalhe (rede, timeout) o lote inteiro volta; repetir é
+                # seguro porque inícios e términos são casados pelo start_time da sessão.
+                # Os totais só são aplicados depois que o histórico foi gravado.
+                if isinstance(e, BulkWriteError) and e.details.get("writeErrors"):
+                    session_ops = session_ops[e.details["writeErrors"][0]["index"]:]
+                self._session_ops = session_ops + self._session_ops
+                for discord_id, op in pending_profiles.items():
+                    self._profile_ops.setdefault(discord_id, op)
+                for deltas, attr in pending_deltas:
+                    for key, delta in deltas.items():
+                        _merge_delta(getattr(self, attr), key, delta)
+                self.failed_flushes += 1
+                logging.error(f"Erro ao gravar lote de sessões de atividade: {str(e)}")
+                return False
+
+            totals_written = 0
+            if take_deltas and any(deltas for deltas, _ in pending_deltas):
+                batch_id = uuid.uuid4().hex
+                ops = self._rollup_ops(batch_id, *(deltas for deltas, _ in pending_deltas))
+                writes = [
+                    (collection, collection_ops)
+                    for collection, collection_ops in zip(
+                        (self.activity_rollups, self.activities, self.user_profiles), ops
+                    )
+                    if collection_ops
+                ]
+                totals_written = sum(len(collection_ops) for collection_ops in ops)
+                self._rollup_batch = (batch_id, writes)
+            ok = True
+            if self._rollup_batch is not None:
+                ok = await self._write_rollup_batch()
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if not ok:
+                self.failed_flushes += 1
+                return False
+
+            self.flush_count += 1
+            self.ops_written += len(profile_ops) + len(session_ops) + totals_written
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self._total_flush_ms += elapsed_ms
+            logging.debug(
+                f"Lote de atividades gravado: {len(session_ops)} sessões, "
+                f"{totals_written} totais em {elapsed_ms:.1f} ms"
+            )
+            return True
+
+    def stats(self) -> dict:
+        """Métricas da fila de escrita"""
+        return {
+            "queue_depth": self.queue_depth,
+            "flush_count": self.flush_count,
+            "failed_flushes": self.failed_flushes,
+            "ops_written": self.ops_written,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "avg_flush_ms": round(self._total_flush_ms / self.flush_count, 2)
+            if self.flush_count
+            else 0.0,
+            "max_flush_ms": round(self.max_flush_ms, 2),
+        }
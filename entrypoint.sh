@@ -18,10 +18,10 @@ if [ $count -ge $MAX_RETRIES ]; then
   # não falha aqui - talvez o usuário queira rodar sem mongo
 fi
 
-# Executa o comando padrão (passado no CMD do Dockerfile) ou executa bot/main.py
+# Executa o comando padrão (passado no CMD do Dockerfile) ou executa o pacote bot
 if [ "$#" -gt 0 ]; then
   exec "$@"
 else
-  exec python -u bot/main.py
+  exec python -u -m bot
 fi
 
@@ -8,7 +8,7 @@ REM Ativa o ambiente virtual
 call .venv\Scripts\activate.bat
 
 REM Executa o bot
-python bot/main.py
+python -m bot
 
 REM Se o bot parar, aguarda 5 segundos e reinicia
 timeout /t 5
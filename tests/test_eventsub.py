@@ -0,0 +1,90 @@
+"""
+Modo push da Twitch de ponta a ponta contra o servidor EventSub falso:
+assinatura (com desafio de confirmação), entrega assinada de
+`stream.online`/`stream.offline` e repasse ao handler do agendador.
+"""
+
+import asyncio
+import socket
+
+import aiohttp
+
+import bot.eventsub as eventsub_module
+import bot.scheduler as scheduler_module
+from bot.eventsub_fake import FakeEventSubServer
+from bot.scheduler import MonitorScheduler
+
+CHANNEL_ID = '123'
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class FakeTwitch:
+    """Só o que o EventSubWebhook usa do cliente `Twitch` (token de app e timeout)"""
+    app_id = 'app-id'
+    base_url = 'https://api.twitch.tv/helix/'
+    session_timeout = aiohttp.ClientTimeout(total=10)
+
+    async def get_refreshed_app_token(self):
+        return 'app-token'
+
+
+class FakeMonitor:
+    def __init__(self):
+        self.twitch = FakeTwitch()
+
+    async def ensure_twitch_authenticated(self):
+        return True
+
+    async def get_live_update(self, channel_id):
+        return None  # força o evento montado a partir do próprio payload
+
+
+async def _wait_for(condition, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "evento não chegou ao agendador"
+        await asyncio.sleep(0.02)
+
+
+def test_stream_events_reach_scheduler(monkeypatch):
+    fake_port, webhook_port = _free_port(), _free_port()
+    monkeypatch.setattr(scheduler_module, 'TWITCH_MONITOR_MODE', 'eventsub')
+    monkeypatch.setattr(eventsub_module, 'TWITCH_EVENTSUB_CALLBACK_URL', 'https://exemplo.local')
+    monkeypatch.setattr(eventsub_module, 'TWITCH_EVENTSUB_PORT', webhook_port)
+    monkeypatch.setattr(eventsub_module, 'TWITCH_EVENTSUB_SECRET', 'segredo-de-teste')
+    monkeypatch.setattr(eventsub_module, 'TWITCH_EVENTSUB_SUBSCRIPTION_URL', f'http://127.0.0.1:{fake_port}/')
+
+    received = []
+
+    async def record_update(self, channel_id, update):
+        received.append((channel_id, update['type']))
+
+    monkeypatch.setattr(MonitorScheduler, '_on_eventsub_update', record_update)
+
+    async def scenario():
+        server = FakeEventSubServer(deliver_to=f'http://127.0.0.1:{webhook_port}')
+        await server.start(port=fake_port)
+        scheduler = MonitorScheduler(bot=None, monitor=FakeMonitor(), notifier=None)
+        try:
+            assert await scheduler.eventsub.start()
+            await scheduler.eventsub.sync([CHANNEL_ID])
+            assert scheduler.eventsub.covers(CHANNEL_ID)
+            assert {s['status'] for s in server.subscriptions.values()} == {'enabled'}
+
+            assert await server.trigger('stream.online', CHANNEL_ID) == 1
+            await _wait_for(lambda: len(received) == 1)
+            assert await server.trigger('stream.offline', CHANNEL_ID) == 1
+            await _wait_for(lambda: len(received) == 2)
+        finally:
+            await scheduler.eventsub.stop()
+            await server.stop()
+
+        assert received == [(CHANNEL_ID, 'live'), (CHANNEL_ID, 'offline')]
+        assert scheduler.eventsub.events_received == 2
+
+    asyncio.run(scenario())